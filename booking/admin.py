@@ -3,4 +3,7 @@ from booking.models import *
 
 # Register your models here.
 admin.site.register(Shop)
-admin.site.register(Appointment)
\ No newline at end of file
+admin.site.register(Appointment)
+admin.site.register(AppointmentSeries)
+admin.site.register(Job)
+admin.site.register(ArchivedAppointment)
@@ -0,0 +1,218 @@
+# booking/api.py
+import datetime
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from . import versions
+from .availability import afree_slots, parse_window, slot_clock, slots_payload
+from .filters import DEFAULT_SORT, SORTS, filter_appointments
+from .forms import AppointmentForm
+from .models import Appointment
+from .pagination import keyset_ordering, keyset_page
+from .services import BookingError, SlotTaken, book_appointment
+from .shop_cache import aget_shop_by_slug
+
+# column order of the rows in `GET /api/v1/appointments/`
+APPOINTMENT_FIELDS = ["id", "start", "minutes", "status", "client", "email", "phone", "note"]
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _json(data, status=200):
+    """@brief Compact JSON response (no whitespace), revalidated on every use."""
+    response = HttpResponse(
+        json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":")),
+        content_type="application/json",
+        status=status,
+    )
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _error(status, message, **extra):
+    return _json({"error": message, **extra}, status=status)
+
+
+def _not_modified(request, shop_id, state, *params):
+    """
+    @brief Compare the client's ETag/Last-Modified with the shop's counter before any real work.
+    @return tuple (304 response or None, validators for `_with_validators`)
+    """
+    etag, last_modified = versions.validators(shop_id, state, *params)
+    return versions.not_modified(request, etag, last_modified), (etag, last_modified)
+
+
+def _with_validators(response, validators):
+    patch_cache_control(response, private=True, no_cache=True)
+    return versions.set_validators(response, *validators)
+
+
+def _appointment(appt):
+    return {
+        "id": appt.pk,
+        "start": timezone.localtime(appt.start_time).isoformat(),
+        "minutes": int(appt.duration.total_seconds() // 60),
+        "status": appt.status,
+        "client": appt.client.name,
+        "note": appt.note,
+    }
+
+
+class ShopDetailAPI(View):
+    """@brief `GET /api/v1/shops/<slug>/`: public profile and booking hours of a shop."""
+    query_budget = 2
+
+    async def get(self, request, slug):
+        """@brief Return the shop, or 304 if unchanged. @return HttpResponse"""
+        try:
+            shop = await aget_shop_by_slug(slug)
+        except Http404:
+            return _error(404, "shop not found")
+        cached, validators = _not_modified(request, shop.pk, await versions.acurrent(shop.pk), "shop")
+        return _with_validators(cached or _json({"shop": {
+            "slug": shop.slug,
+            "name": shop.name,
+            "description": shop.description,
+            "address": shop.address,
+            "phone": shop.phone,
+            "opening_day": shop.opening_day,
+            "closing_day": shop.closing_day,
+            "opening_hours": shop.opening_hours.strftime("%H:%M"),
+            "closing_hours": shop.closing_hours.strftime("%H:%M"),
+        }}), validators)
+
+
+class ShopAvailabilityAPI(View):
+    """
+    @brief `GET /api/v1/shops/<slug>/availability/?start=&days=`: free start times per duration.
+    @details Same payload as the booking page's availability endpoint. The
+             validator covers the shop's counter, the window and the slot
+             grid step we're in, since passed slots drop out.
+    """
+    max_days = 31
+    query_budget = 3
+
+    async def get(self, request, slug):
+        """@brief Return free slots for the window, or 304 if unchanged. @return HttpResponse"""
+        try:
+            shop = await aget_shop_by_slug(slug)
+        except Http404:
+            return _error(404, "shop not found")
+        start, days = parse_window(request.GET, max_days=self.max_days)
+        cached, validators = _not_modified(
+            request, shop.pk, await versions.acurrent(shop.pk),
+            "availability", start, days, timezone.localdate(), slot_clock(shop),
+        )
+        if cached is None:
+            slots = await afree_slots(shop, start, start + datetime.timedelta(days=days - 1))
+            cached = _json(slots_payload(shop, slots))
+        return _with_validators(cached, validators)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class ShopBookingAPI(View):
+    """
+    @brief `POST /api/v1/shops/<slug>/appointments/`: book a slot (public, like the booking page).
+    @details JSON body: `name`, `email`, `phone`, `start_time` (ISO, shop
+             time), `duration` (minutes: 30/45/60/120), optional `note`.
+             Validation is `AppointmentForm`'s; the booking goes through
+             `services.book_appointment`.
+    @return 201 with the appointment, 400 with `errors` per field, 409 if the slot is taken.
+    """
+    query_budget = 14                       # as the booking page (ShopAppointment)
+
+    async def post(self, request, slug):
+        """@brief Create the appointment. @return HttpResponse"""
+        try:
+            shop = await aget_shop_by_slug(slug)
+        except Http404:
+            return _error(404, "shop not found")
+        try:
+            body = json.loads(request.body or b"{}")
+        except ValueError:
+            return _error(400, "body must be JSON")
+        if not isinstance(body, dict):
+            return _error(400, "body must be a JSON object")
+
+        form = AppointmentForm({"note": "-", **body}, shop=shop)
+        if not form.is_valid():
+            errors = {field: [e["message"] for e in errs] for field, errs in form.errors.get_json_data().items()}
+            return _error(400, "invalid booking", errors=errors)
+
+        data = form.cleaned_data
+        try:
+            appt = await sync_to_async(book_appointment)(
+                shop,
+                {"name": data["name"], "email": data["email"], "phone": data["phone"]},
+                data["start_time"],
+                data["duration"],
+                note=data["note"],
+            )
+        except SlotTaken as exc:
+            return _error(409, exc.message)
+        except BookingError as exc:
+            return _error(400, "invalid booking", errors={exc.field or "__all__": [exc.message]})
+        return _json({"appointment": _appointment(appt)}, status=201)
+
+
+class AppointmentListAPI(View):
+    """
+    @brief `GET /api/v1/appointments/`: the logged-in shop's appointments.
+    @details
+      Same filters and order as the manage page (`q`, `status`, `range`,
+      `sort`, see `filters.filter_appointments`), keyset pages of `limit`
+      rows (default 50, max 200) with `next` as the `cursor` of the next
+      page. Rows are lists in `fields` order.
+    """
+    query_budget = 5
+
+    def get(self, request):
+        """@brief Return one page, or 304 if the shop hasn't changed. @return HttpResponse"""
+        if not request.user.is_authenticated:
+            return _error(401, "authentication required")
+        shop = getattr(request.user, "shop", None)
+        if shop is None:
+            return _error(404, "no shop linked to this account")
+        try:
+            limit = max(1, min(int(request.GET.get("limit", PAGE_SIZE)), MAX_PAGE_SIZE))
+        except ValueError:
+            limit = PAGE_SIZE
+
+        # date ranges move with the clock: today's date / this minute are part of the validator
+        rng = request.GET.get("range")
+        clock = timezone.now().replace(second=0, microsecond=0) if rng == "upcoming" else timezone.localdate()
+        params = sorted((key, tuple(values)) for key, values in request.GET.lists())
+        cached, validators = _not_modified(
+            request, shop.pk, versions.current(shop.pk), "appointments", limit, clock, params,
+        )
+        if cached is not None:
+            return _with_validators(cached, validators)
+
+        qs = filter_appointments(Appointment.objects.filter(shop=shop).select_related("client"), request.GET)
+        ordering = keyset_ordering(SORTS.get(request.GET.get("sort", DEFAULT_SORT), SORTS[DEFAULT_SORT]))
+        page = keyset_page(qs, ordering, request.GET.get("cursor"), limit)
+        rows = [
+            [
+                appt.pk,
+                timezone.localtime(appt.start_time).isoformat(),
+                int(appt.duration.total_seconds() // 60),
+                appt.status,
+                appt.client.name,
+                appt.client.email,
+                appt.client.phone,
+                appt.note,
+            ]
+            for appt in page
+        ]
+        return _with_validators(
+            _json({"fields": APPOINTMENT_FIELDS, "results": rows, "next": page.next_cursor}),
+            validators,
+        )
@@ -0,0 +1,129 @@
+# booking/archive.py
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from . import versions
+from .models import Appointment, ArchivedAppointment, ArchiveTotals, ShopEvent
+from .services import write_transaction
+
+# only finished appointments leave the hot table
+ARCHIVED_STATUSES = ["Completed", "Cancelled"]
+# the "this week" badges and the dashboards' date ranges (up to a month back) never reach the archive
+MIN_ARCHIVE_DAYS = 32
+
+
+def cutoff(days=None, now=None):
+    """
+    @brief Appointments that ended before this moment may be archived.
+    @param days int Horizon; defaults to `settings.ARCHIVE_AFTER_DAYS`.
+    @return datetime
+    @exception ValueError if the horizon is shorter than `MIN_ARCHIVE_DAYS`.
+    """
+    days = getattr(settings, "ARCHIVE_AFTER_DAYS", 365) if days is None else days
+    if days < MIN_ARCHIVE_DAYS:
+        raise ValueError(f"archive horizon must be at least {MIN_ARCHIVE_DAYS} days")
+    return (now or timezone.now()) - datetime.timedelta(days=days)
+
+
+def archive_batch(before, batch_size=None):
+    """
+    @brief Move one batch of finished appointments that ended before `before` to the archive.
+    @details
+      One transaction: copy the rows into `ArchivedAppointment` (keeping
+      their ids), add them to each shop's `ArchiveTotals`, drop their
+      dashboard events, delete them from the hot table and bump the shops'
+      versions once. A run that stops half way loses nothing: every batch
+      commits on its own and the next run picks up what is still in the
+      hot table.
+    @param before datetime From `cutoff()`.
+    @param batch_size int Rows per batch; defaults to `settings.ARCHIVE_BATCH_SIZE`.
+    @return int Rows moved; 0 when nothing is left to archive.
+    """
+    batch_size = batch_size or getattr(settings, "ARCHIVE_BATCH_SIZE", 500)
+
+    def run():
+        rows = list(
+            Appointment.objects
+            .filter(status__in=ARCHIVED_STATUSES, end_time__lt=before)
+            .order_by("pk")[:batch_size]
+        )
+        if not rows:
+            return 0
+        ids = [appt.pk for appt in rows]
+        ArchivedAppointment.objects.bulk_create(
+            [
+                ArchivedAppointment(
+                    id=appt.pk, client_id=appt.client_id, shop_id=appt.shop_id,
+                    start_time=appt.start_time, end_time=appt.end_time, duration=appt.duration,
+                    status=appt.status, note=appt.note,
+                )
+                for appt in rows
+            ],
+            ignore_conflicts=True,
+        )
+        shop_ids = _add_totals(rows)
+        ShopEvent.objects.filter(appointment_id__in=ids).delete()
+        _delete_appointments(ids)
+        for shop_id in shop_ids:
+            versions.bump(shop_id)
+        return len(rows)
+
+    return write_transaction(run)
+
+
+def _delete_appointments(ids):
+    """
+    @brief One plain DELETE of the archived rows from the hot table.
+    @details Deliberately skips the ORM's collector and the post_delete
+             signals, so what they would do is handled here by hand:
+               - `ShopEvent` is the only FK to `Appointment`; its rows are
+                 deleted by the caller just before;
+               - the daily rollups are left as they are (an archived
+                 appointment still counts, see `signals.drop_from_rollups`);
+               - the shop versions are bumped once per shop by the caller,
+                 not once per row.
+             A new FK to `Appointment` must be cleared here too.
+    @param ids list[int] At most one batch, well within SQLite's variable limit.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {connection.ops.quote_name(Appointment._meta.db_table)} "
+            f"WHERE id IN ({', '.join(['%s'] * len(ids))})",
+            ids,
+        )
+
+
+def _add_totals(rows):
+    """@brief Add a batch to the shops' archive totals (one UPDATE per shop). @return set[int] The shops."""
+    totals = defaultdict(lambda: {"appointments": 0, "Completed": 0, "Cancelled": 0, "until": None})
+    for appt in rows:
+        if appt.shop_id is None:
+            continue
+        shop = totals[appt.shop_id]
+        shop["appointments"] += 1
+        shop[appt.status] += 1
+        shop["until"] = max(shop["until"] or appt.end_time, appt.end_time)
+
+    ArchiveTotals.objects.bulk_create(
+        [ArchiveTotals(shop_id=shop_id) for shop_id in totals], ignore_conflicts=True,
+    )
+    for shop_id, shop in totals.items():
+        ArchiveTotals.objects.filter(shop_id=shop_id).update(
+            appointments=F("appointments") + shop["appointments"],
+            completed=F("completed") + shop["Completed"],
+            cancelled=F("cancelled") + shop["Cancelled"],
+            archived_until=Greatest(Coalesce("archived_until", Value(shop["until"])), Value(shop["until"])),
+        )
+    return set(totals)
+
+
+def totals(shop):
+    """@brief (appointments, completed, cancelled) archived for a shop; zeros if none. @return tuple"""
+    row = ArchiveTotals.objects.filter(shop=shop).values_list("appointments", "completed", "cancelled").first()
+    return row or (0, 0, 0)
@@ -0,0 +1,194 @@
+# booking/availability.py
+import bisect
+import datetime
+
+from django.utils import timezone
+
+from .forms import AppointmentForm
+from .models import Appointment
+from .services import BLOCKING_STATUSES, aseries_intervals, is_open_day, series_intervals
+
+# candidate start times are offered on this grid (aligned to opening time)
+SLOT_STEP = datetime.timedelta(minutes=15)
+
+
+def _blocking_qs(shop, range_start, range_end):
+    return (
+        Appointment.objects
+        .filter(
+            shop=shop,
+            status__in=BLOCKING_STATUSES,
+            start_time__lt=range_end,
+            end_time__gt=range_start,
+        )
+        .order_by("start_time")
+        .values_list("start_time", "end_time")
+    )
+
+
+def blocking_intervals(shop, range_start, range_end):
+    """
+    @brief Load everything blocking a time range: appointments and recurring-series occurrences.
+    @details Two queries (appointments, series); the series are expanded
+             only inside the range and merged into the sorted list.
+    @param shop Shop The shop to look up.
+    @param range_start datetime Aware start of the window.
+    @param range_end datetime Aware end of the window.
+    @return list[tuple[datetime, datetime]] (start, end) pairs sorted by start.
+    """
+    return sorted(list(_blocking_qs(shop, range_start, range_end)) + series_intervals(shop, range_start, range_end))
+
+
+async def ablocking_intervals(shop, range_start, range_end):
+    """@brief Async `blocking_intervals` (async queryset iteration). @return list[tuple]"""
+    appointments = [row async for row in _blocking_qs(shop, range_start, range_end)]
+    return sorted(appointments + await aseries_intervals(shop, range_start, range_end))
+
+
+def _free_gaps(day_open, day_close, busy, lo, hi):
+    """
+    @brief Sweep the sorted busy intervals busy[lo:hi] and yield the free gaps.
+    @return generator of (gap_start, gap_end) inside [day_open, day_close].
+    """
+    cursor = day_open
+    for start, end in busy[lo:hi]:
+        if end <= cursor:
+            continue
+        if start > cursor:
+            yield cursor, min(start, day_close)
+        cursor = max(cursor, end)
+        if cursor >= day_close:
+            return
+    if cursor < day_close:
+        yield cursor, day_close
+
+
+def _open_days(shop, start_date, end_date):
+    """@brief (day, open, close) for every open weekday in the range. @return list[tuple]"""
+    tz = timezone.get_current_timezone()
+    days = []
+    day = start_date
+    while day <= end_date:
+        if is_open_day(shop, day):
+            day_open = timezone.make_aware(datetime.datetime.combine(day, shop.opening_hours), tz)
+            day_close = timezone.make_aware(datetime.datetime.combine(day, shop.closing_hours), tz)
+            if day_open < day_close:
+                days.append((day, day_open, day_close))
+        day += datetime.timedelta(days=1)
+    return days
+
+
+def _slots(days, busy, durations, now):
+    """@brief Sweep the sorted busy intervals day by day (see `free_slots`). @return dict"""
+    if durations is None:
+        durations = [minutes for minutes, _ in AppointmentForm.DURATION_CHOICES]
+    lengths = [(m, datetime.timedelta(minutes=m)) for m in durations]
+    now = now or timezone.now()
+
+    starts = [start for start, _ in busy]
+    longest = max((end - start for start, end in busy), default=datetime.timedelta(0))
+
+    result = {}
+    for day, day_open, day_close in days:
+        # only intervals that can reach into this day's opening hours
+        lo = bisect.bisect_left(starts, day_open - longest)
+        hi = bisect.bisect_left(starts, day_close)
+
+        slots = {m: [] for m, _ in lengths}
+        for gap_start, gap_end in _free_gaps(day_open, day_close, busy, lo, hi):
+            earliest = max(gap_start, now)
+            if earliest >= gap_end:
+                continue
+            # first grid point at or after `earliest`
+            steps = -(-(earliest - day_open) // SLOT_STEP)
+            first = day_open + steps * SLOT_STEP
+            for m, length in lengths:
+                t = first
+                while t + length <= gap_end:
+                    slots[m].append(t)
+                    t += SLOT_STEP
+        result[day] = slots
+
+    return result
+
+
+def free_slots(shop, start_date, end_date, durations=None, now=None):
+    """
+    @brief Compute bookable start times for every duration over a date range.
+    @details
+      Loads everything blocking the range up front (`blocking_intervals`:
+      appointments and series occurrences), then sweeps the sorted
+      intervals day by day. A slot is bookable when it
+      starts on the `SLOT_STEP` grid, lies inside opening/closing hours on an
+      open weekday, is not in the past and does not overlap a Pending or
+      Confirmed appointment - the same rules `services.book_appointment` enforces.
+    @param shop Shop The shop to compute availability for.
+    @param start_date datetime.date First day (inclusive).
+    @param end_date datetime.date Last day (inclusive).
+    @param durations list[int] Lengths in minutes; defaults to `AppointmentForm.DURATION_CHOICES`.
+    @param now datetime Reference "now" used to drop past slots (mainly for tests).
+    @return dict {date: {minutes: [aware datetime, ...]}} for each open day.
+    """
+    days = _open_days(shop, start_date, end_date)
+    if not days:
+        return {}
+    return _slots(days, blocking_intervals(shop, days[0][1], days[-1][2]), durations, now)
+
+
+async def afree_slots(shop, start_date, end_date, durations=None, now=None):
+    """@brief Async `free_slots`: same result, the queries run on the async ORM. @return dict"""
+    days = _open_days(shop, start_date, end_date)
+    if not days:
+        return {}
+    return _slots(days, await ablocking_intervals(shop, days[0][1], days[-1][2]), durations, now)
+
+
+def parse_window(params, default_days=7, max_days=31):
+    """
+    @brief Read a `start` (YYYY-MM-DD, default today) + `days` window from request parameters.
+    @details Garbage falls back to the defaults; `days` is clamped to 1..max_days.
+    @return tuple[datetime.date, int]
+    """
+    try:
+        start = datetime.date.fromisoformat(params.get("start", ""))
+    except ValueError:
+        start = timezone.localdate()
+    try:
+        days = int(params.get("days", default_days))
+    except ValueError:
+        days = default_days
+    return start, max(1, min(days, max_days))
+
+
+def slot_clock(shop, now=None):
+    """
+    @brief Which `SLOT_STEP` of today `now` falls in (on the shop's grid).
+    @details `free_slots` only depends on the time of day through which grid
+             points have passed, so this number plus the shop's data fully
+             determines a result: a cheap validator for conditional GETs.
+    @return int
+    """
+    now = now or timezone.now()
+    tz = timezone.get_current_timezone()
+    grid_origin = timezone.make_aware(datetime.datetime.combine(timezone.localdate(now), shop.opening_hours), tz)
+    return (now - grid_origin) // SLOT_STEP
+
+
+def slots_payload(shop, slots):
+    """
+    @brief JSON shape of `free_slots` output (booking page and API).
+    @return dict {"shop": slug, "days": [{"date", "slots": {minutes: ["HH:MM", ...]}}]}
+    """
+    return {
+        "shop": shop.slug,
+        "days": [
+            {
+                "date": day.isoformat(),
+                "slots": {
+                    str(minutes): [timezone.localtime(t).strftime("%H:%M") for t in times]
+                    for minutes, times in by_length.items()
+                },
+            }
+            for day, by_length in slots.items()
+        ],
+    }
@@ -0,0 +1,196 @@
+# booking/benchmark.py
+import datetime
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import Appointment, Client, Shop
+
+
+@contextmanager
+def scratch_database(verbosity=0):
+    """
+    @brief Run a block against a throwaway copy of the schema.
+    @details Creates the test database the same way `manage.py test` does and
+             destroys it afterwards, so benchmarks never touch `db.sqlite3`.
+    @return connection The default connection, pointed at the scratch DB.
+    """
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+@contextmanager
+def scratch_sqlite_file(prefix="easybook-bench-"):
+    """
+    @brief Run a block against a freshly migrated SQLite file in a temp directory.
+    @details The test database is in-memory on SQLite, which forked worker
+             processes can't share; a file can. All connections are closed on
+             entry and exit so forked children open their own.
+    @return str Path of the database file.
+    """
+    tmpdir = tempfile.mkdtemp(prefix=prefix)
+    db = settings.DATABASES["default"]
+    old_name = db["NAME"]
+    connections.close_all()
+    db["NAME"] = connections["default"].settings_dict["NAME"] = os.path.join(tmpdir, "db.sqlite3")
+    try:
+        call_command("migrate", verbosity=0)
+        yield db["NAME"]
+    finally:
+        connections.close_all()
+        db["NAME"] = connections["default"].settings_dict["NAME"] = old_name
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def seed_shop(name):
+    """
+    @brief Create an owner + shop that is open every day, all day.
+    @param name str Unique shop name (also used for the owner's username).
+    @return Shop
+    """
+    owner = User.objects.create_user(name.lower().replace(" ", "_"), password="bench-pass")
+    return Shop.objects.create(
+        owner=owner,
+        name=name,
+        opening_hours=datetime.time(0, 0),
+        closing_hours=datetime.time(23, 59),
+        opening_day="mon",
+        closing_day="sun",
+    )
+
+
+def seed_appointments(shop, count, clients=500, rng=None, batch_size=5000):
+    """
+    @brief Bulk-insert `count` back-to-back historical appointments for a shop.
+    @details
+      Appointments end "now" and walk backwards; older ones are mostly
+      Completed/Cancelled, about 5% stay Confirmed so they still block.
+    @param shop Shop Target shop.
+    @param count int Number of appointments to create.
+    @param clients int Size of the client pool the appointments are spread over.
+    @param rng random.Random Source of randomness (seeded for repeatable runs).
+    @return tuple[datetime, datetime] (first start, last end) of the seeded span.
+    """
+    rng = rng or random.Random(0)
+    pool = Client.objects.bulk_create(
+        Client(name=f"Client {i}", email=f"client{i}@{shop.slug}.example", phone=f"555{i:07d}")
+        for i in range(clients)
+    )
+    durations = [datetime.timedelta(minutes=m) for m in (30, 45, 60, 120)]
+    end = timezone.now().replace(second=0, microsecond=0)
+    last_end = end
+
+    batch = []
+    for _ in range(count):
+        duration = rng.choice(durations)
+        start = end - duration
+        roll = rng.random()
+        status = "Confirmed" if roll < 0.05 else "Cancelled" if roll < 0.15 else "Completed"
+        batch.append(Appointment(
+            client=rng.choice(pool),
+            shop=shop,
+            start_time=start,
+            duration=duration,
+            end_time=start + duration,
+            status=status,
+        ))
+        end = start - datetime.timedelta(minutes=rng.choice((0, 15, 30)))
+        if len(batch) >= batch_size:
+            Appointment.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Appointment.objects.bulk_create(batch)
+    return end, last_end
+
+
+def summarize(samples):
+    """
+    @brief Latency summary in milliseconds.
+    @param samples list[float] Durations in seconds.
+    @return dict with count/mean/p50/p95/p99/max.
+    """
+    ms = sorted(s * 1000 for s in samples)
+    if not ms:
+        return {"count": 0}
+
+    def pct(p):
+        return ms[min(len(ms) - 1, int(round(p / 100 * (len(ms) - 1))))]
+
+    return {
+        "count": len(ms),
+        "mean": round(statistics.fmean(ms), 3),
+        "p50": round(pct(50), 3),
+        "p95": round(pct(95), 3),
+        "p99": round(pct(99), 3),
+        "max": round(ms[-1], 3),
+    }
+
+
+def measure(send, repeat, warmup=1, before=None):
+    """
+    @brief Call `send()` `repeat` times, timing each call and counting its queries.
+    @param send callable Issues one request (returns the response).
+    @param repeat int Number of timed calls.
+    @param warmup int Untimed calls first (fills caches, compiles templates).
+    @param before callable Run, untimed, before each timed call (e.g. to
+           invalidate a page cache the warm-up filled).
+    @return dict `summarize()` latency stats plus query counts, errors and throughput.
+    """
+    for _ in range(warmup):
+        send()
+
+    samples, queries, errors = [], [], 0
+    began = time.perf_counter()
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        with CaptureQueriesContext(connections["default"]) as ctx:
+            t0 = time.perf_counter()
+            response = send()
+            samples.append(time.perf_counter() - t0)
+        queries.append(len(ctx.captured_queries))
+        if response.status_code >= 400:
+            errors += 1
+    elapsed = time.perf_counter() - began
+
+    stats = summarize(samples)
+    stats.update({
+        "queries_mean": round(statistics.fmean(queries), 2) if queries else 0,
+        "queries_max": max(queries, default=0),
+        "errors": errors,
+        "rps": round(repeat / elapsed, 1) if elapsed else 0,
+    })
+    return stats
+
+
+def compare(current, baseline, threshold=1.25):
+    """
+    @brief Diff two benchmark results (as written by `manage.py benchmark --out`).
+    @param threshold float p95 ratio above which a scenario counts as a regression.
+    @return list[tuple] (scenario, old p95, new p95, ratio, query delta, regressed)
+    """
+    rows = []
+    for name, new in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old or not old.get("p95"):
+            continue
+        ratio = new["p95"] / old["p95"]
+        query_delta = new["queries_max"] - old["queries_max"]
+        rows.append((name, old["p95"], new["p95"], round(ratio, 2), query_delta,
+                     ratio > threshold or query_delta > 0))
+    return rows
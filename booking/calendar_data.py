@@ -0,0 +1,68 @@
+# booking/calendar_data.py
+import datetime
+
+from django.utils import timezone
+
+from .models import Appointment, AppointmentSeries
+from .services import BLOCKING_STATUSES
+
+# column order of every row in the payload
+FIELDS = ["id", "start", "minutes", "status", "client"]
+# one request never covers more than a 6-week month grid
+MAX_DAYS = 42
+
+
+def window_bounds(start_date, days):
+    """@brief Aware [start, end) of `days` local calendar days from `start_date`. @return tuple"""
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.datetime.combine(start_date, datetime.time.min), tz)
+    end = timezone.make_aware(
+        datetime.datetime.combine(start_date + datetime.timedelta(days=days), datetime.time.min), tz,
+    )
+    return start, end
+
+
+def calendar_window(shop, start_date, days):
+    """
+    @brief Everything a calendar grid shows for a window, as compact JSON-ready rows.
+    @details
+      One range query (client name joined in) returns the appointments of
+      every status that overlap the window; a second, over the shop's few
+      recurring series, adds the occurrences inside it. Rows are lists in
+      `FIELDS` order (`[id, start, minutes, status, client]`) so a month of
+      bookings stays a few kilobytes; the front end lays them out.
+    @param shop Shop
+    @param start_date datetime.date First local day of the window.
+    @param days int Number of days (1 to `MAX_DAYS`).
+    @return dict {"start", "days", "fields", "appointments", "series"}
+    """
+    start, end = window_bounds(start_date, days)
+    rows = (
+        Appointment.objects
+        .filter(shop=shop, start_time__lt=end, end_time__gt=start)
+        .order_by("start_time", "pk")
+        .values_list("pk", "start_time", "duration", "status", "client__name")
+    )
+    series = (
+        AppointmentSeries.objects
+        .filter(shop=shop, status__in=BLOCKING_STATUSES, start_time__lt=end, last_end__gt=start)
+        .select_related("client")
+    )
+    return {
+        "start": start_date.isoformat(),
+        "days": days,
+        "fields": FIELDS,
+        "appointments": [_row(pk, at, length, status, name) for pk, at, length, status, name in rows],
+        "series": sorted(
+            (
+                _row(s.pk, at, s.duration, s.status, s.client.name)
+                for s in series
+                for at, _ in s.occurrences(start, end)
+            ),
+            key=lambda row: row[1],
+        ),
+    }
+
+
+def _row(pk, start, duration, status, name):
+    return [pk, timezone.localtime(start).isoformat(), int(duration.total_seconds() // 60), status, name]
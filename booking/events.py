@@ -0,0 +1,162 @@
+# booking/events.py
+import asyncio
+import datetime
+import json
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.middleware.csrf import get_token
+from django.utils import timezone
+
+from .fragments import render_rows
+from .models import ShopEvent
+
+# events sent per round trip; a longer backlog is drained without sleeping
+BATCH_SIZE = 100
+# comment line sent on quiet streams so proxies don't drop the connection
+HEARTBEAT_SECONDS = 15
+
+
+def publish(appointment, kind):
+    """
+    @brief Record an appointment change for the shop's live dashboard.
+    @details Call it inside the transaction that makes the change: open
+             streams only see the event once that transaction commits, and
+             a rolled back change publishes nothing.
+    @param appointment Appointment Already saved.
+    @param kind str `ShopEvent.CREATED` or `ShopEvent.STATUS`.
+    @return None
+    """
+    if appointment.shop_id is None:
+        return
+    ShopEvent.objects.create(shop_id=appointment.shop_id, appointment=appointment, kind=kind)
+
+
+def publish_many(shop_id, appointment_ids, kind):
+    """@brief `publish` for a bulk change of one shop's appointments, in a single INSERT."""
+    ShopEvent.objects.bulk_create(
+        ShopEvent(shop_id=shop_id, appointment_id=pk, kind=kind) for pk in appointment_ids
+    )
+
+
+async def alast_event_id(shop_id):
+    """@brief Id of the newest event of a shop (0 if none), the start point of a fresh stream."""
+    last = await (
+        ShopEvent.objects.filter(shop_id=shop_id)
+        .order_by("-pk").values_list("pk", flat=True).afirst()
+    )
+    return last or 0
+
+
+def last_event_id(shop_id):
+    """@brief Sync twin of `alast_event_id`, for the page that opens the stream."""
+    last = ShopEvent.objects.filter(shop_id=shop_id).order_by("-pk").values_list("pk", flat=True).first()
+    return last or 0
+
+
+def prune(now=None):
+    """
+    @brief Delete events older than `EVENT_RETENTION_SECONDS`.
+    @details A browser away for longer just misses them; it reloads the
+             page (and the full list) anyway.
+    @return int Number of events deleted.
+    """
+    now = now or timezone.now()
+    keep = datetime.timedelta(seconds=getattr(settings, "EVENT_RETENTION_SECONDS", 3600))
+    deleted, _ = ShopEvent.objects.filter(created_at__lt=now - keep).delete()
+    return deleted
+
+
+def streams(request):
+    """
+    @brief Can the live feed be pushed over SSE to this request?
+    @details Under ASGI an open stream only holds a coroutine. Under WSGI
+             Django reads an async stream to the end before sending
+             anything, and every open tab would hold a worker, so the page
+             polls `poll` instead unless `EVENT_STREAM_SSE` is set.
+    @return bool
+    """
+    return isinstance(request, ASGIRequest) or getattr(settings, "EVENT_STREAM_SSE", False)
+
+
+def _payload(event, request):
+    """@brief The appointment as it is now, with its rendered dashboard row. @return dict"""
+    appt = event.appointment
+    return {
+        "id": appt.pk,
+        "status": appt.status,
+        "start": appt.start_time.isoformat(),
+        "html": render_rows([appt], get_token(request)),
+    }
+
+
+def _frame(event, request):
+    """@brief One SSE message of an event."""
+    return f"id: {event.pk}\nevent: {event.kind}\ndata: {json.dumps(_payload(event, request))}\n\n"
+
+
+def poll(request, shop_id, since):
+    """
+    @brief The events of a shop after `since`, for pages that can't open a stream.
+    @details One indexed query, as a single round of `stream`.
+    @param request HttpRequest Used to render the rows.
+    @param shop_id int
+    @param since int Last event id the client already has.
+    @return dict `last`: id to poll after next time, `more`: whether a full
+            batch was returned (poll again right away), `events`: list of
+            `{"id", "kind", "data"}`, `data` as in the SSE messages.
+    """
+    batch = list(
+        ShopEvent.objects
+        .filter(shop_id=shop_id, pk__gt=since)
+        .select_related("appointment__client")
+        .order_by("pk")[:BATCH_SIZE]
+    )
+    return {
+        "last": batch[-1].pk if batch else since,
+        "more": len(batch) == BATCH_SIZE,
+        "events": [{"id": event.pk, "kind": event.kind, "data": _payload(event, request)} for event in batch],
+    }
+
+
+async def stream(request, shop_id, since):
+    """
+    @brief Async generator of SSE messages for every event of a shop after `since`.
+    @details
+      Tails `ShopEvent` with one indexed query per `EVENT_POLL_SECONDS`
+      (appointment and client joined in), so each open dashboard costs a
+      single cheap read per second instead of re-running its filtered list.
+      After `EVENT_STREAM_SECONDS` the stream ends; the browser reconnects
+      on its own and resumes from the last id it saw.
+    @param request HttpRequest Used to render the rows (CSRF tokens of the action forms).
+    @param shop_id int
+    @param since int Last event id the client already has.
+    """
+    loop = asyncio.get_running_loop()
+    poll = getattr(settings, "EVENT_POLL_SECONDS", 1.0)
+    deadline = loop.time() + getattr(settings, "EVENT_STREAM_SECONDS", 300)
+    quiet_since = loop.time()
+
+    yield "retry: 2000\n\n"                 # reconnect delay for the browser
+    while True:
+        batch = [
+            event async for event in
+            ShopEvent.objects
+            .filter(shop_id=shop_id, pk__gt=since)
+            .select_related("appointment__client")
+            .order_by("pk")[:BATCH_SIZE]
+        ]
+        for event in batch:
+            since = event.pk
+            yield _frame(event, request)
+
+        if batch:
+            quiet_since = loop.time()
+        elif loop.time() - quiet_since >= HEARTBEAT_SECONDS:
+            quiet_since = loop.time()
+            yield ": keep-alive\n\n"
+
+        if loop.time() >= deadline:
+            return
+        if len(batch) < BATCH_SIZE:
+            await asyncio.sleep(poll)
@@ -0,0 +1,53 @@
+# booking/filters.py
+from datetime import date, timedelta
+
+from django.utils import timezone
+
+from . import search
+
+# ?sort= → ordering; always ends in start_time, pk so pages have a stable cursor
+SORTS = {
+    "date_asc":  ("start_time", "pk"),
+    "date_desc": ("-start_time", "-pk"),
+    "customer":  ("client__name", "start_time", "pk"),
+    "status":    ("status", "start_time", "pk"),
+}
+DEFAULT_SORT = "date_desc"
+
+
+def filter_appointments(qs, params):
+    """
+    @brief The manage page's filters: `q`, `status`, `range` and `sort`.
+    @details Shared by the dashboard (`shopAppointmentsManage`) and the JSON
+             API so both list exactly the same rows in the same order.
+    @param qs QuerySet Appointments of one shop.
+    @param params QueryDict|dict Request parameters.
+    @return QuerySet Filtered and ordered.
+    """
+    # --- search text (prefix match on name words, email parts, phone digits) ---
+    q = params.get("q")
+    if q:
+        qs = search.filter_by_client(qs, q)
+
+    # --- status filter ---
+    status = params.get("status")
+    if status:
+        qs = qs.filter(status__iexact=status)
+
+    # --- date range filter ---
+    rng = params.get("range")
+    if rng == "today":
+        qs = qs.filter(start_time__date=date.today())
+    elif rng == "week":
+        start = date.today() - timedelta(days=date.today().weekday())
+        end   = start + timedelta(days=7)
+        qs = qs.filter(start_time__date__gte=start, start_time__date__lt=end)
+    elif rng == "month":
+        start = date.today().replace(day=1)
+        end   = (start + timedelta(days=32)).replace(day=1)
+        qs = qs.filter(start_time__date__gte=start, start_time__date__lt=end)
+    elif rng == "upcoming":
+        qs = qs.filter(start_time__gte=timezone.now())
+
+    # --- sorting ---
+    return qs.order_by(*SORTS.get(params.get("sort", DEFAULT_SORT), SORTS[DEFAULT_SORT]))
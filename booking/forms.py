@@ -3,14 +3,14 @@
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.forms import UserCreationForm # use django builtin usercreation form for user authentications
 from django.contrib.auth.models import User
-from django.db.models import F, ExpressionWrapper
-from django.db.models import DateTimeField
 from django import forms
 from django.db import transaction, IntegrityError
 import datetime
 
-from .models import Appointment, Client, Shop
+from .models import Shop
 from .models import DAYS_OF_WEEK
+from .recurrence import FREQUENCY_CHOICES, MAX_OCCURRENCES
+from .services import BookingError, book_appointment, book_series, validate_booking
 
 class AppointmentForm(forms.Form):
     """
@@ -46,74 +46,109 @@ class AppointmentForm(forms.Form):
 
     note = forms.CharField(widget=forms.Textarea)
 
+    def __init__(self, *args, shop=None, **kwargs):
+        """
+        @brief Optionally bind the form to a known shop.
+        @param shop Shop When given (e.g. the `book/<slug>/` page) the `shop`
+                    field is dropped and this instance is used as-is, so no
+                    extra query is needed to look it up again.
+        """
+        super().__init__(*args, **kwargs)
+        self.shop = shop
+        if shop is not None:
+            del self.fields["shop"]
+
 
     def clean(self):
         """
-        @brief Cross-field validations for appointment time and conflicts.
-        @exception forms.ValidationError on overlaps, closed days, or past times.
+        @brief Cross-field validations for appointment day and business hours.
+        @details Uses `services.validate_booking`, which runs no queries; the
+                 overlap check happens once, under the booking lock, in
+                 `services.book_appointment`.
+        @exception forms.ValidationError on closed days or times outside business hours.
         @return dict Cleaned data.
         """
         cleaned = super().clean()
+        if self.shop is not None:
+            cleaned["shop"] = self.shop
         shop = cleaned.get("shop")
         start_dt = cleaned.get("start_time")
         duration  = cleaned.get("duration")
 
         if shop and start_dt:
-            # map codes (e.g. 'mon') → weekday ints (Mon=0 … Sun=6)
-            code_to_int = { code: idx for idx, (code, _) in enumerate(DAYS_OF_WEEK) }
-            open_day = code_to_int[shop.opening_day]
-            close_day = code_to_int[shop.closing_day]
-            wd = start_dt.weekday()
-
-            # Day‐of‐week check 
-            if open_day <= close_day:
-                valid_day = (open_day <= wd <= close_day)
-            else:
-                valid_day = (wd >= open_day or wd <= close_day)
-
-            if not valid_day:
-                raise forms.ValidationError(
-                    "⚠ The shop is closed on that day. Please pick another date."
-                )
+            try:
+                validate_booking(shop, start_dt, duration)
+            except BookingError as exc:
+                raise forms.ValidationError(exc.message)
 
-            # Time‐of‐day check
-            t = start_dt.time()
-            if t < shop.opening_hours or t > shop.closing_hours:
-                raise forms.ValidationError(
-                    "⚠ The shop is closed at that time. Please pick a time between "
-                    f"{shop.opening_hours:%H:%M} and {shop.closing_hours:%H:%M}."
-                )
-        
-        if shop and start_dt and duration:
-            end_dt = start_dt + duration
-
-            # keep appointment within business hours (same-day case)
-            if start_dt.time() < shop.opening_hours or end_dt.time() > shop.closing_hours:
-                raise forms.ValidationError(
-                    "⚠ Time must be within business hours "
-                    f"({shop.opening_hours:%H:%M}–{shop.closing_hours:%H:%M})."
-                )
+        return cleaned
 
-            # Block overlaps with Pending/Confirmed (cancelled/completed don't block)
-            blocking_statuses = ["Pending", "Confirmed"]
-            conflict_qs = (
-                Appointment.objects
-                .filter(shop=shop, status__in=blocking_statuses)
-                .annotate(existing_end=ExpressionWrapper(
-                    F("start_time") + F("duration"),
-                    output_field=DateTimeField()
-                ))
-                .filter(
-                    start_time__lt=end_dt,   # existing starts before new ends
-                    existing_end__gt=start_dt  # existing ends after new starts
-                )
+    def book(self):
+        """
+        @brief Book the validated slot via `services.book_appointment`.
+        @details Call after `is_valid()`. A conflict found under the booking
+                 lock is added to the form as an error instead of raising.
+        @return Appointment|None The new appointment, or None if booking failed.
+        """
+        data = self.cleaned_data
+        try:
+            return book_appointment(
+                data["shop"],
+                {"name": data["name"], "email": data["email"], "phone": data["phone"]},
+                data["start_time"],
+                data["duration"],
+                note=data["note"],
             )
-            if conflict_qs.exists():
-                raise forms.ValidationError("⚠ That time overlaps another booking for this shop, please pick another time.")
+        except BookingError as exc:
+            self.add_error(exc.field, exc.message)
+            return None
+
 
+class RecurringAppointmentForm(AppointmentForm):
+    """
+    @brief Books a recurring series for a regular client (shop dashboard).
+    @details Same client/time/duration fields as `AppointmentForm`, plus the
+             rule. `start_time` is the first visit; the series ends after
+             `count` visits or on `until`, whichever comes first.
+    @param shop Shop Required: the logged-in owner's shop.
+    """
+    frequency = forms.ChoiceField(choices=FREQUENCY_CHOICES, widget=forms.Select(attrs={"class": "form-select"}))
+    count     = forms.IntegerField(label="Number of visits", min_value=1, max_value=MAX_OCCURRENCES, required=False)
+    until     = forms.DateField(label="Ends on", required=False, widget=forms.DateInput(attrs={"type": "date"}))
+    note      = forms.CharField(widget=forms.Textarea, required=False)
+
+    def clean(self):
+        """
+        @brief First-visit checks from `AppointmentForm`, plus an end for the rule.
+        @details Every later visit is checked (hours, conflicts) by
+                 `services.book_series` under the booking lock.
+        @return dict Cleaned data.
+        """
+        cleaned = super().clean()
+        if not cleaned.get("count") and not cleaned.get("until"):
+            raise forms.ValidationError("⚠ Give the series a number of visits or an end date.")
         return cleaned
-        
 
+    def book(self):
+        """
+        @brief Book the validated series via `services.book_series`.
+        @return AppointmentSeries|None The new series, or None if booking failed.
+        """
+        data = self.cleaned_data
+        try:
+            return book_series(
+                self.shop,
+                {"name": data["name"], "email": data["email"], "phone": data["phone"]},
+                data["start_time"],
+                data["duration"],
+                data["frequency"],
+                count=data["count"],
+                until=data["until"],
+                note=data["note"] or "-",
+            )
+        except BookingError as exc:
+            self.add_error(exc.field, exc.message)
+            return None
 
 
 class ShopRegisterForm(UserCreationForm):
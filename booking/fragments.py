@@ -0,0 +1,61 @@
+# booking/fragments.py
+import hashlib
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+ROW_TEMPLATE = "shops/_appointment_row.html"
+# bump when _appointment_row.html changes so old cached rows aren't served after a deploy
+ROW_TEMPLATE_VERSION = 1
+ROW_CACHE_TIMEOUT = 24 * 60 * 60
+# stands in for the request's CSRF token in cached rows; swapped in on every render
+CSRF_PLACEHOLDER = "__csrf_token__"
+
+
+def row_key(appt):
+    """
+    @brief Cache key of an appointment's rendered dashboard row.
+    @details The appointment's `version` is bumped by every save. The
+             fields the row shows, its client's contact details and the time
+             zone are digested in as well, which also covers `update()`s
+             that forget the version and ids reused after a delete.
+    @param appt Appointment With `client` loaded (`select_related`).
+    @return str
+    """
+    client = appt.client
+    shown = (
+        appt.status, appt.start_time.isoformat(), appt.duration, appt.note,
+        client.name, client.email, client.phone, timezone.get_current_timezone_name(),
+    )
+    digest = hashlib.md5(repr(shown).encode()).hexdigest()[:12]
+    return f"booking:row:{ROW_TEMPLATE_VERSION}:{appt.pk}:{appt.version}:{digest}"
+
+
+def render_rows(appointments, csrf_token):
+    """
+    @brief The dashboard rows of `appointments`, rendered once per appointment version.
+    @details
+      One `get_many` for the page; only the misses are rendered (without
+      a request, so a row can't pick up per-user state) and stored with
+      one `set_many`. The CSRF token of the row's action forms is never
+      cached: rows hold a placeholder that is replaced with `csrf_token`.
+    @param appointments iterable[Appointment] With `client` loaded.
+    @param csrf_token str The current request's token (`get_token` / template `csrf_token`).
+    @return str Safe HTML, rows in the given order.
+    """
+    appointments = list(appointments)
+    keys = [row_key(appt) for appt in appointments]
+    cached = cache.get_many(keys)
+
+    missing = {}
+    for key, appt in zip(keys, appointments):
+        if key not in cached:
+            missing[key] = render_to_string(ROW_TEMPLATE, {"appt": appt, "csrf_token": CSRF_PLACEHOLDER})
+    if missing:
+        cache.set_many(missing, ROW_CACHE_TIMEOUT)
+        cached.update(missing)
+
+    html = "".join(cached[key] for key in keys)
+    return mark_safe(html.replace(CSRF_PLACEHOLDER, str(csrf_token)))
@@ -0,0 +1,197 @@
+# booking/instrumentation.py
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger("booking.perf")
+
+# transaction bookkeeping: not counted (tests wrap every view in savepoints where
+# production begins a transaction), so a view costs the same in both
+_BOOKKEEPING = ("BEGIN", "SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+# stats of the request being handled; copied into sync_to_async threads, so async views count too
+_current = ContextVar("booking_request_stats", default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """@brief A view ran more queries than its `query_budget` (raised under the test runner only)."""
+
+
+class RequestStats:
+    """@brief What one request cost: queries, SQL and template time, repeated statements."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.statements = Counter()
+
+    def duplicates(self):
+        """@brief Statements run more than once (same SQL, any params): the N+1 suspects. @return list[tuple[str, int]]"""
+        return [(sql, n) for sql, n in self.statements.most_common() if n > 1]
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    @brief Execute wrapper: time and count a statement for the current request.
+    @details Installed on every connection when it opens (see
+             `booking.signals.instrument_connection`); outside a request
+             (workers, management commands) it only passes through.
+    """
+    stats = _current.get()
+    if stats is None or sql.startswith(_BOOKKEEPING):
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_seconds += time.perf_counter() - start
+        stats.queries += 1
+        stats.statements[sql] += 1
+
+
+def install(connection):
+    """@brief Add `record_query` to a connection's execute wrappers (once)."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def query_budget(limit):
+    """
+    @brief Decorator for function views: at most `limit` queries per request.
+    @details Class-based views set a `query_budget` attribute instead.
+    """
+    def decorate(view):
+        view.query_budget = limit
+        return view
+    return decorate
+
+
+class TimedTemplate:
+    """@brief A backend template whose outermost `render` is timed for the current request."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return self.template.render(context, request)
+        stats.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:        # rows rendered by a tag are inside the page's time
+                stats.template_seconds += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """@brief The Django template backend, with render time recorded per request (`TEMPLATES["BACKEND"]`)."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class RequestMetricsMiddleware:
+    """
+    @brief Per-request cost: query count, SQL time, template time, duplicate statements.
+    @details
+      Adds a `Server-Timing` header (`db`, `tpl`, `app`; visible in the
+      browser's network panel) and logs one JSON line per request on
+      `booking.perf`. Statements repeated `PERF_DUPLICATE_THRESHOLD` times
+      or more are logged as a likely N+1. Views may declare a
+      `query_budget`, set from their worst legitimate path; going over it
+      is logged. Under the test runner (`QUERY_BUDGET_MODE` "raise", see
+      `booking.test_runner`) it raises `QueryBudgetExceeded` instead, so a
+      query regression fails the test that hits it; a live request is
+      never failed after its view has run. Put it first in `MIDDLEWARE` so
+      session and user lookups are counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "view_class", None)
+        request.query_budget = getattr(view_class or view_func, "query_budget", None)
+        request.view_name = f"{view_func.__module__}.{getattr(view_class or view_func, '__qualname__', view_func)}"
+
+    def finish(self, request, response, stats):
+        total_ms = (time.perf_counter() - stats.started) * 1000
+        sql_ms = stats.sql_seconds * 1000
+        template_ms = stats.template_seconds * 1000
+        duplicates = stats.duplicates()
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={sql_ms:.1f};desc="{stats.queries} queries"',
+            f"tpl;dur={template_ms:.1f}",
+            f"app;dur={total_ms:.1f}",
+        ])
+
+        view = getattr(request, "view_name", None)
+        budget = getattr(request, "query_budget", None)
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "view": view,
+            "status": response.status_code,
+            "queries": stats.queries,
+            "sql_ms": round(sql_ms, 1),
+            "template_ms": round(template_ms, 1),
+            "total_ms": round(total_ms, 1),
+            "duplicates": sum(n - 1 for _, n in duplicates),
+        }))
+
+        threshold = getattr(settings, "PERF_DUPLICATE_THRESHOLD", 5)
+        if duplicates and duplicates[0][1] >= threshold:
+            sql, n = duplicates[0]
+            logger.warning(json.dumps({"event": "duplicate_queries", "view": view, "count": n, "sql": sql[:500]}))
+
+        if budget is not None and stats.queries > budget:
+            message = f"{view} ran {stats.queries} queries, budget is {budget}"
+            if getattr(settings, "QUERY_BUDGET_MODE", "log") == "raise":
+                raise QueryBudgetExceeded(message)
+            logger.warning(json.dumps({"event": "query_budget_exceeded", "view": view,
+                                       "queries": stats.queries, "budget": budget}))
+        return response
@@ -0,0 +1,139 @@
+# booking/jobs.py
+import datetime
+import random
+import traceback
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+from .services import write_transaction
+
+# kind → handler(jobs) yielding (job, error|None); filled by `handler()`
+HANDLERS = {}
+
+
+def handler(kind):
+    """
+    @brief Register the function that runs every claimed job of `kind`.
+    @details The handler gets the whole batch of that kind at once (so it can
+             load related rows and open one mail connection) and yields
+             `(job, None)` on success or `(job, exception)` per failed job.
+    """
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(kind, payload, key, delay=None):
+    """
+    @brief Add a job unless one with the same idempotency key already exists.
+    @details One `INSERT ... ON CONFLICT DO NOTHING`; call it inside the
+             transaction that makes the change so the job is stored if and
+             only if the change commits.
+    @param kind str Handler name (see `HANDLERS`).
+    @param payload dict JSON-serializable arguments.
+    @param key str Idempotency key, e.g. "appointment:42:created".
+    @param delay timedelta Optional wait before the job may run.
+    @return None
+    """
+    enqueue_many(kind, [(payload, key)], delay)
+
+
+def enqueue_many(kind, items, delay=None):
+    """
+    @brief `enqueue` for a batch of jobs of one kind, in a single INSERT.
+    @param items list[tuple[dict, str]] (payload, key) pairs.
+    @return None
+    """
+    run_after = timezone.now() + (delay or datetime.timedelta())
+    Job.objects.bulk_create(
+        [Job(kind=kind, key=key, payload=payload, run_after=run_after) for payload, key in items],
+        ignore_conflicts=True,
+    )
+
+
+def claim(batch_size, now=None):
+    """
+    @brief Atomically take up to `batch_size` due jobs for this worker.
+    @details
+      Due means pending with `run_after` reached, or running but claimed
+      longer than `JOB_LOCK_TIMEOUT` ago (a worker died mid-batch). The
+      select and the status flip run in one write transaction, with
+      `SKIP LOCKED` where the backend has it, so two workers never get the
+      same job.
+    @return list[Job] The claimed jobs, `attempts` already incremented.
+    """
+    now = now or timezone.now()
+    stale = now - datetime.timedelta(seconds=getattr(settings, "JOB_LOCK_TIMEOUT", 300))
+
+    def take():
+        ids = list(
+            Job.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status=Job.PENDING, run_after__lte=now) | Q(status=Job.RUNNING, locked_at__lt=stale))
+            .order_by("run_after", "pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if ids:
+            Job.objects.filter(pk__in=ids).update(status=Job.RUNNING, locked_at=now, attempts=F("attempts") + 1)
+        return ids
+
+    ids = write_transaction(take)
+    return list(Job.objects.filter(pk__in=ids).order_by("pk")) if ids else []
+
+
+def retry_delay(attempts):
+    """
+    @brief Exponential backoff with jitter for the next try.
+    @param attempts int Tries made so far (>= 1).
+    @return timedelta
+    """
+    base = getattr(settings, "JOB_RETRY_BASE_SECONDS", 30)
+    delay = min(base * 2 ** (attempts - 1), 3600)
+    return datetime.timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def run_batch(batch_size=50, now=None):
+    """
+    @brief Claim one batch, run it through the handlers, record the outcome.
+    @return tuple[int, int] (succeeded, failed) jobs in this batch.
+    """
+    jobs = claim(batch_size, now)
+    by_kind = {}
+    for job in jobs:
+        by_kind.setdefault(job.kind, []).append(job)
+
+    done, failed = [], []
+    for kind, batch in by_kind.items():
+        fn = HANDLERS.get(kind)
+        if fn is None:
+            failed.extend((job, LookupError(f"no handler for job kind {kind!r}")) for job in batch)
+            continue
+        try:
+            for job, error in fn(batch):
+                if error is None:
+                    done.append(job)
+                else:
+                    failed.append((job, error))
+        except Exception as exc:                # the handler itself blew up
+            seen = {job.pk for job in done} | {job.pk for job, _ in failed}
+            failed.extend((job, exc) for job in batch if job.pk not in seen)
+
+    finished = timezone.now()
+    if done:
+        Job.objects.filter(pk__in=[job.pk for job in done]).update(
+            status=Job.DONE, finished_at=finished, last_error="",
+        )
+    max_attempts = getattr(settings, "JOB_MAX_ATTEMPTS", 5)
+    for job, error in failed:
+        message = "".join(traceback.format_exception_only(type(error), error)).strip()
+        if job.attempts >= max_attempts:
+            Job.objects.filter(pk=job.pk).update(status=Job.FAILED, finished_at=finished, last_error=message)
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.PENDING, run_after=finished + retry_delay(job.attempts), last_error=message,
+            )
+    return len(done), len(failed)
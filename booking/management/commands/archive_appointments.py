@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import archive
+
+
+class Command(BaseCommand):
+    help = ("Move Completed/Cancelled appointments that ended more than --days ago "
+            "(default ARCHIVE_AFTER_DAYS) from the hot table into the archive, one "
+            "transaction per batch. Safe to stop and re-run: it resumes where it left off.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None,
+                            help="archive horizon in days (default: ARCHIVE_AFTER_DAYS)")
+        parser.add_argument("--batch-size", type=int, default=None,
+                            help="rows per transaction (default: ARCHIVE_BATCH_SIZE)")
+        parser.add_argument("--max-batches", type=int, default=None,
+                            help="stop after this many batches")
+        parser.add_argument("--pause", type=float, default=0.0,
+                            help="seconds to sleep between batches, leaving the write lock to bookings")
+
+    def handle(self, *args, **opts):
+        try:
+            before = archive.cutoff(opts["days"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        moved = batches = 0
+        while opts["max_batches"] is None or batches < opts["max_batches"]:
+            count = archive.archive_batch(before, opts["batch_size"])
+            if not count:
+                break
+            moved += count
+            batches += 1
+            self.stdout.write(f"batch {batches}: {count} archived")
+            time.sleep(opts["pause"])
+        self.stdout.write(f"{moved} appointments archived (ended before {before:%Y-%m-%d %H:%M})")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import rollups
+from booking.models import Shop
+
+
+class Command(BaseCommand):
+    help = ("Recompute the daily analytics rollups from the appointments (archived "
+            "ones included). Run it once after deploying the rollups, or to repair "
+            "a shop's counts. One transaction per shop.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("shops", nargs="*", metavar="slug",
+                            help="shops to rebuild (default: all)")
+
+    def handle(self, *args, **opts):
+        shops = Shop.objects.order_by("pk")
+        if opts["shops"]:
+            shops = shops.filter(slug__in=opts["shops"])
+            missing = set(opts["shops"]) - set(shops.values_list("slug", flat=True))
+            if missing:
+                raise CommandError(f"no such shop: {', '.join(sorted(missing))}")
+
+        total = 0
+        for shop in shops.iterator():
+            written = rollups.rebuild(shop)
+            total += written
+            self.stdout.write(f"{shop.slug}: {written} rollup rows")
+        self.stdout.write(f"{total} rollup rows written")
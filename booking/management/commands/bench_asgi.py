@@ -0,0 +1,189 @@
+import asyncio
+import datetime
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import socketserver
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import reverse
+from django.utils import timezone
+
+from booking.benchmark import scratch_sqlite_file, seed_appointments, seed_shop, summarize
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class _PooledWSGIServer(WSGIServer):
+    """
+    @brief WSGI server with a fixed pool of worker threads (like `gunicorn --threads N`).
+    @details Each connection is handed to a pool thread that reads the request,
+             runs Django and writes the response, so a client that sends slowly
+             holds that thread the whole time.
+    """
+
+    def __init__(self, address, threads):
+        super().__init__(address, _QuietHandler)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            connections.close_all()
+
+
+def _serve_wsgi(port, threads):
+    from django.core.wsgi import get_wsgi_application
+    socketserver.TCPServer.allow_reuse_address = True
+    server = _PooledWSGIServer(("127.0.0.1", port), threads)
+    server.set_app(get_wsgi_application())
+    server.serve_forever()
+
+
+def _serve_asgi(port):
+    import uvicorn
+    from django.core.asgi import get_asgi_application
+    uvicorn.Server(uvicorn.Config(
+        get_asgi_application(), host="127.0.0.1", port=port,
+        log_level="warning", lifespan="off",
+    )).run()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _request(port, path, slow=0.0, timeout=60):
+    """One HTTP/1.1 GET; with `slow` the last header line arrives `slow` seconds late."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), timeout)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n".encode())
+        await writer.drain()
+        if slow:
+            await asyncio.sleep(slow)
+        writer.write(b"Connection: close\r\n\r\n")
+        await writer.drain()
+        data = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    return int(data.split(b" ", 2)[1]) if data.startswith(b"HTTP/") else 0
+
+
+class Command(BaseCommand):
+    help = ("Compare how the threaded WSGI path and uvicorn (ASGI) cope with many slow "
+            "concurrent connections while normal clients keep requesting availability.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--servers", nargs="+", default=["wsgi", "asgi"], choices=["wsgi", "asgi"])
+        parser.add_argument("--threads", type=int, default=8, help="WSGI worker threads")
+        parser.add_argument("--slow-clients", type=int, default=64,
+                            help="connections that trickle their request in")
+        parser.add_argument("--slow-seconds", type=float, default=2.0)
+        parser.add_argument("--fast-clients", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=20, help="requests per fast client")
+        parser.add_argument("--appointments", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        if "asgi" in opts["servers"]:
+            try:
+                import uvicorn  # noqa: F401
+            except ImportError:
+                raise CommandError("the asgi run needs uvicorn: pip install uvicorn")
+        if connections["default"].vendor != "sqlite":
+            raise CommandError("bench_asgi runs against a scratch SQLite file")
+
+        with scratch_sqlite_file(prefix="easybook-asgi-"):
+            shop = seed_shop("Bench Shop")
+            seed_appointments(shop, opts["appointments"], rng=random.Random(opts["seed"]))
+            day = timezone.localdate() + datetime.timedelta(days=1)
+            path = reverse("booking:book-shop-availability", args=[shop.slug]) + f"?start={day}&days=1"
+            connections.close_all()             # the server process opens its own
+
+            for kind in opts["servers"]:
+                self.report(kind, opts, self.run(kind, path, opts))
+
+    def run(self, kind, path, opts):
+        port = _free_port()
+        ctx = multiprocessing.get_context("fork")
+        target, args = (_serve_wsgi, (port, opts["threads"])) if kind == "wsgi" else (_serve_asgi, (port,))
+        server = ctx.Process(target=target, args=args, daemon=True)
+        server.start()
+        try:
+            self.wait_for(port)
+            return asyncio.run(self.load(port, path, opts))
+        finally:
+            os.kill(server.pid, signal.SIGTERM)
+            server.join(5)
+
+    def wait_for(self, port, timeout=15):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                return
+            except OSError:
+                time.sleep(0.05)
+        raise CommandError(f"server on port {port} did not start")
+
+    async def load(self, port, path, opts):
+        await _request(port, path)               # warm-up: caches, templates, connection
+
+        slow = [
+            asyncio.create_task(_request(port, path, slow=opts["slow_seconds"]))
+            for _ in range(opts["slow_clients"])
+        ]
+        await asyncio.sleep(0.1)                 # let the slow connections get accepted
+
+        samples, errors = [], 0
+
+        async def fast_client():
+            nonlocal errors
+            for _ in range(opts["requests"]):
+                t0 = time.perf_counter()
+                try:
+                    status = await _request(port, path)
+                except (OSError, asyncio.TimeoutError):
+                    status = 0
+                samples.append(time.perf_counter() - t0)
+                if status != 200:
+                    errors += 1
+
+        began = time.perf_counter()
+        await asyncio.gather(*(fast_client() for _ in range(opts["fast_clients"])))
+        elapsed = time.perf_counter() - began
+
+        slow_results = await asyncio.gather(*slow, return_exceptions=True)
+        return {
+            "fast": summarize(samples),
+            "rps": len(samples) / elapsed,
+            "errors": errors,
+            "slow_ok": sum(1 for r in slow_results if r == 200),
+        }
+
+    def report(self, kind, opts, result):
+        fast = result["fast"]
+        label = f"wsgi ({opts['threads']} threads)" if kind == "wsgi" else "asgi (uvicorn)"
+        self.stdout.write(
+            f"{label:<20} fast: {result['rps']:7.1f} req/s p50={fast['p50']:8.1f}ms "
+            f"p95={fast['p95']:8.1f}ms errors={result['errors']}  "
+            f"slow: {result['slow_ok']}/{opts['slow_clients']} ok"
+        )
@@ -0,0 +1,120 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F, ExpressionWrapper, DateTimeField
+from django.test import Client as TestClient
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from booking.benchmark import scratch_database, seed_shop, seed_appointments, summarize
+from booking.models import Appointment
+
+BLOCKING_STATUSES = ["Pending", "Confirmed"]
+
+
+def legacy_conflict(shop, start_dt, end_dt):
+    """@brief The pre-`end_time` overlap check (computed end, no usable index)."""
+    return (
+        Appointment.objects
+        .filter(shop=shop, status__in=BLOCKING_STATUSES)
+        .annotate(existing_end=ExpressionWrapper(
+            F("start_time") + F("duration"),
+            output_field=DateTimeField()
+        ))
+        .filter(start_time__lt=end_dt, existing_end__gt=start_dt)
+    )
+
+
+def indexed_conflict(shop, start_dt, end_dt):
+    """@brief The current overlap check (materialized `end_time`, composite index)."""
+    return Appointment.objects.filter(
+        shop=shop,
+        status__in=BLOCKING_STATUSES,
+        start_time__lt=end_dt,
+        end_time__gt=start_dt,
+    )
+
+
+class Command(BaseCommand):
+    help = ("Compare overlap-check latency before/after the end_time index on a scratch database: "
+            "the overlap query and the booking POST, first with the composite index, then on the "
+            "same data with the index dropped (the schema before it was added).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--appointments", type=int, default=100_000,
+                            help="historical appointments to seed for the shop")
+        parser.add_argument("--probes", type=int, default=500,
+                            help="overlap checks (and booking POSTs) to time for each schema")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts["seed"])
+
+        setup_test_environment()
+        try:
+            with scratch_database():
+                self.run(rng, opts)
+        finally:
+            teardown_test_environment()
+
+    def run(self, rng, opts):
+        # a second, busy shop makes sure the shop filter matters too
+        shop = seed_shop("Bench Shop")
+        seed_appointments(seed_shop("Other Shop"), opts["appointments"] // 10, rng=rng)
+        first, last = seed_appointments(shop, opts["appointments"], rng=rng)
+        self.stdout.write(f"seeded {Appointment.objects.count()} appointments")
+
+        # random booking attempts spread over the shop's history
+        probes = []
+        for _ in range(opts["probes"]):
+            start = first + (last - first) * rng.random()
+            probes.append((start, start + datetime.timedelta(minutes=rng.choice((30, 45, 60, 120)))))
+
+        self.time_query("indexed", indexed_conflict, shop, probes)
+        self.time_booking("indexed", shop, probes)
+
+        # the schema before end_time was indexed
+        index = next(i for i in Appointment._meta.indexes if i.name == "appt_shop_status_time_idx")
+        with connection.schema_editor() as editor:
+            editor.remove_index(Appointment, index)
+
+        self.time_query("legacy", legacy_conflict, shop, probes)
+        self.time_booking("no index", shop, probes)
+
+    def time_query(self, label, query, shop, probes):
+        plan = query(shop, *probes[0]).explain()
+        samples = []
+        for start, end in probes:
+            t0 = time.perf_counter()
+            query(shop, start, end).exists()
+            samples.append(time.perf_counter() - t0)
+        self.report(f"{label} query", samples)
+        self.stdout.write(f"{'':22} plan: {' | '.join(plan.splitlines())}")
+
+    def time_booking(self, label, shop, probes):
+        """@brief Time the booking page POST for every probe; the bookings are rolled back afterwards."""
+        client = TestClient()
+        url = reverse("booking:book-shop", args=[shop.slug])
+        samples = []
+        with transaction.atomic():
+            for i, (start, end) in enumerate(probes):
+                data = {
+                    "name": "Bench Client", "email": f"bench{i}@example.com", "phone": "5550000",
+                    "start_time": start.strftime("%Y-%m-%dT%H:%M"),
+                    "duration": int((end - start).total_seconds() // 60), "note": "benchmark",
+                }
+                t0 = time.perf_counter()
+                client.post(url, data)
+                samples.append(time.perf_counter() - t0)
+            transaction.set_rollback(True)      # both schemas see the same data
+        self.report(f"{label} booking POST", samples)
+
+    def report(self, label, samples):
+        stats = summarize(samples)
+        self.stdout.write(
+            f"{label:22} p50={stats['p50']}ms p95={stats['p95']}ms "
+            f"p99={stats['p99']}ms mean={stats['mean']}ms"
+        )
@@ -0,0 +1,123 @@
+import datetime
+import multiprocessing
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client as TestClient
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from booking.benchmark import scratch_sqlite_file, seed_appointments, seed_shop, summarize
+
+
+def _worker(args):
+    worker_id, slug, requests, write_ratio, days, seed = args
+    rng = random.Random(seed)
+    book_url = reverse("booking:book-shop", args=[slug])
+    avail_url = reverse("booking:book-shop-availability", args=[slug])
+    today = timezone.localdate()
+    client = TestClient()
+
+    reads, writes, errors = [], [], 0
+    for i in range(requests):
+        day = today + datetime.timedelta(days=rng.randrange(1, days + 1))
+        t0 = time.perf_counter()
+        if rng.random() < write_ratio:
+            minute = 15 * rng.randrange(9 * 4, 17 * 4)
+            response = client.post(book_url, {
+                "name": f"Worker {worker_id}",
+                "email": f"w{worker_id}-{i % 20}@bench.example",
+                "phone": "0",
+                "start_time": f"{day:%Y-%m-%d}T{minute // 60:02d}:{minute % 60:02d}",
+                "duration": 30,
+                "note": "bench",
+            })
+            writes.append(time.perf_counter() - t0)
+        else:
+            response = client.get(avail_url, {"start": day.isoformat(), "days": 1})
+            reads.append(time.perf_counter() - t0)
+        # 200 on a POST is the form re-rendered for a taken slot, which is fine
+        if response.status_code >= 400:
+            errors += 1
+    connections.close_all()
+    return reads, writes, errors
+
+
+class Command(BaseCommand):
+    help = ("Compare mixed read/write booking throughput across worker processes "
+            "for each SQLite profile in settings.SQLITE_PROFILES.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", nargs="+", default=["default", "production"])
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=200, help="requests per worker")
+        parser.add_argument("--write-ratio", type=float, default=0.2,
+                            help="share of requests that are booking POSTs")
+        parser.add_argument("--appointments", type=int, default=20000, help="seeded history")
+        parser.add_argument("--days", type=int, default=30, help="booking window in days")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        if connections["default"].vendor != "sqlite":
+            raise CommandError("bench_sqlite only makes sense on the SQLite backend")
+        unknown = set(opts["profiles"]) - set(settings.SQLITE_PROFILES)
+        if unknown:
+            raise CommandError(f"unknown profile(s): {', '.join(sorted(unknown))}")
+
+        db = settings.DATABASES["default"]
+        old = settings.SQLITE_PRAGMAS, db["CONN_MAX_AGE"], db["CONN_HEALTH_CHECKS"]
+        setup_test_environment()
+        try:
+            for profile in opts["profiles"]:
+                pragmas = settings.SQLITE_PROFILES[profile]
+                # same switch as DJANGO_SQLITE_PROFILE; forked workers inherit it
+                settings.SQLITE_PRAGMAS = pragmas
+                db["CONN_MAX_AGE"] = 600 if pragmas else 0
+                db["CONN_HEALTH_CHECKS"] = bool(pragmas)
+                with scratch_sqlite_file(prefix=f"easybook-{profile}-"):
+                    self.report(profile, self.run(opts))
+        finally:
+            teardown_test_environment()
+            settings.SQLITE_PRAGMAS, db["CONN_MAX_AGE"], db["CONN_HEALTH_CHECKS"] = old
+
+    def run(self, opts):
+        rng = random.Random(opts["seed"])
+        shop = seed_shop("Bench Shop")
+        seed_appointments(shop, opts["appointments"], rng=rng)
+        connections.close_all()                 # children must not share the parent's connection
+
+        jobs = [
+            (i, shop.slug, opts["requests"], opts["write_ratio"], opts["days"], opts["seed"] * 1000 + i)
+            for i in range(opts["workers"])
+        ]
+        began = time.perf_counter()
+        with multiprocessing.get_context("fork").Pool(opts["workers"]) as pool:
+            results = pool.map(_worker, jobs)
+        elapsed = time.perf_counter() - began
+
+        reads = [s for r in results for s in r[0]]
+        writes = [s for r in results for s in r[1]]
+        return {
+            "elapsed": elapsed,
+            "rps": (len(reads) + len(writes)) / elapsed,
+            "errors": sum(r[2] for r in results),
+            "read": summarize(reads),
+            "write": summarize(writes),
+        }
+
+    def report(self, profile, result):
+        self.stdout.write(
+            f"{profile:<12} {result['rps']:8.1f} req/s  errors={result['errors']}  "
+            f"({result['elapsed']:.2f}s)"
+        )
+        for kind in ("read", "write"):
+            stats = result[kind]
+            if stats["count"]:
+                self.stdout.write(
+                    f"  {kind:<5} n={stats['count']:<6} p50={stats['p50']:7.2f}ms "
+                    f"p95={stats['p95']:7.2f}ms max={stats['max']:7.2f}ms"
+                )
@@ -0,0 +1,160 @@
+import datetime
+import itertools
+import json
+import random
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client as TestClient
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from booking import versions
+from booking.benchmark import compare, measure, scratch_database, seed_appointments, seed_shop
+
+MANAGE_FILTERS = {
+    "q":      ["", "client 1"],
+    "status": ["", "confirmed", "pending", "completed", "cancelled"],
+    "range":  ["all", "today", "week", "month", "upcoming"],
+    "sort":   ["date_asc", "date_desc", "customer", "status"],
+}
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Seed a scratch database and benchmark the booking flow and the shop "
+            "dashboard through Django's test client. Dashboard scenarios render "
+            "every page (the shop's version is bumped before each timed request); "
+            "the ones marked [cached] measure page-cache hits.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shops", type=int, default=3)
+        parser.add_argument("--appointments", type=int, default=5000, help="per shop")
+        parser.add_argument("--clients", type=int, default=300, help="per shop")
+        parser.add_argument("--requests", type=int, default=50,
+                            help="requests per scenario")
+        parser.add_argument("--filter-requests", type=int, default=3,
+                            help="requests per appointments_manage filter/sort combination")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--out", help="write results as JSON (baseline for --compare)")
+        parser.add_argument("--compare", help="baseline JSON to diff against")
+        parser.add_argument("--threshold", type=float, default=1.25,
+                            help="p95 ratio counted as a regression in --compare")
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts["seed"])
+        setup_test_environment()
+        try:
+            with scratch_database():
+                results = self.run(rng, opts)
+        finally:
+            teardown_test_environment()
+
+        self.report(results)
+
+        if opts["out"]:
+            with open(opts["out"], "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            self.stdout.write(f"wrote {opts['out']}")
+
+        if opts["compare"]:
+            with open(opts["compare"]) as f:
+                baseline = json.load(f)
+            regressed = self.report_compare(compare(results, baseline, opts["threshold"]))
+            if regressed and opts["fail_on_regression"]:
+                raise CommandError(f"{regressed} scenario(s) regressed against {opts['compare']}")
+
+    # ------------------------------------------------------------------
+    def run(self, rng, opts):
+        shops = []
+        for i in range(opts["shops"]):
+            shop = seed_shop(f"Bench Shop {i}")
+            seed_appointments(shop, opts["appointments"], clients=opts["clients"], rng=rng)
+            shops.append(shop)
+        self.stdout.write(f"seeded {len(shops)} shops x {opts['appointments']} appointments")
+
+        public = TestClient()
+        owner = TestClient()
+        owner.force_login(shops[0].owner)
+        slug = shops[0].slug
+        n = opts["requests"]
+        today = timezone.localdate()
+
+        def book():
+            # random future slot, some of them collide on purpose
+            day = today + datetime.timedelta(days=rng.randint(1, 60))
+            minute = rng.randrange(0, 23 * 60, 15)
+            return public.post(reverse("booking:book-shop", args=[slug]), {
+                "name": "Bench Client",
+                "email": f"bench{rng.randint(0, 999)}@example.com",
+                "phone": "5550000",
+                "start_time": f"{day}T{minute // 60:02d}:{minute % 60:02d}",
+                "duration": rng.choice([30, 45, 60, 120]),
+                "note": "benchmark",
+            })
+
+        def invalidate():
+            # a write elsewhere: the dashboard's page cache (and ETag) no longer applies
+            versions.bump(shops[0].pk)
+
+        scenarios = {
+            "book_get": (lambda: public.get(reverse("booking:book-shop", args=[slug])), None),
+            "book_post": (book, None),
+            "availability": (lambda: public.get(
+                reverse("booking:book-shop-availability", args=[slug]), {"days": 7}), None),
+            "shop_homepage": (lambda: owner.get(reverse("booking:shop_homepage")), invalidate),
+            "shop_homepage[cached]": (lambda: owner.get(reverse("booking:shop_homepage")), None),
+        }
+
+        results = {
+            "meta": {
+                "revision": _git_revision(),
+                "created": timezone.now().isoformat(),
+                "params": {k: opts[k] for k in ("shops", "appointments", "clients", "requests",
+                                                "filter_requests", "seed")},
+            },
+            "scenarios": {},
+        }
+        for name, (send, before) in scenarios.items():
+            results["scenarios"][name] = measure(send, n, before=before)
+
+        url = reverse("booking:appointments_manage")
+        results["scenarios"]["manage[cached]"] = measure(lambda: owner.get(url), n)
+        for combo in itertools.product(*MANAGE_FILTERS.values()):
+            params = dict(zip(MANAGE_FILTERS, combo))
+            name = "manage[" + ",".join(f"{k}={v}" for k, v in params.items() if v) + "]"
+            results["scenarios"][name] = measure(lambda: owner.get(url, params), opts["filter_requests"],
+                                                 before=invalidate)
+
+        return results
+
+    # ------------------------------------------------------------------
+    def report(self, results):
+        self.stdout.write(f"{'scenario':68} {'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>6} {'req/s':>7}")
+        for name, s in results["scenarios"].items():
+            self.stdout.write(
+                f"{name:68} {s['p50']:8.2f} {s['p95']:8.2f} {s['p99']:8.2f} "
+                f"{s['queries_mean']:6.1f} {s['rps']:7.1f}"
+                + (f"  ({s['errors']} errors)" if s["errors"] else "")
+            )
+
+    def report_compare(self, rows):
+        regressed = 0
+        self.stdout.write(f"{'scenario':68} {'old p95':>8} {'new p95':>8} {'ratio':>6} {'Δq':>4}")
+        for name, old, new, ratio, dq, bad in rows:
+            regressed += bad
+            line = f"{name:68} {old:8.2f} {new:8.2f} {ratio:6.2f} {dq:+4d}"
+            self.stdout.write(self.style.ERROR(line) if bad else line)
+        return regressed
@@ -0,0 +1,46 @@
+from itertools import chain
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.models import Appointment, ArchivedAppointment, Shop
+from booking.transfer import appointment_rows, write_csv, write_jsonl
+
+
+class Command(BaseCommand):
+    help = ("Stream a shop's clients and appointments to CSV or JSONL. Appointments "
+            "moved out by archive_appointments are left out unless --include-archived "
+            "is given.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("shop", help="shop slug")
+        parser.add_argument("--output", "-o", default="-", help="file to write, '-' for stdout")
+        parser.add_argument("--format", choices=["csv", "jsonl"],
+                            help="defaults to the output file extension, else csv")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument("--include-archived", action="store_true",
+                            help="also export archived appointments (written first, oldest history)")
+
+    def handle(self, *args, **opts):
+        try:
+            shop = Shop.objects.get(slug=opts["shop"])
+        except Shop.DoesNotExist:
+            raise CommandError(f"no shop with slug {opts['shop']!r}")
+
+        path = opts["output"]
+        fmt = opts["format"] or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+        writer = write_jsonl if fmt == "jsonl" else write_csv
+
+        models = [ArchivedAppointment, Appointment] if opts["include_archived"] else [Appointment]
+        rows = chain.from_iterable(
+            appointment_rows(model.objects.filter(shop=shop).order_by("start_time", "pk"),
+                             chunk_size=opts["chunk_size"])
+            for model in models
+        )
+        if path == "-":
+            self.stdout.ending = ""              # rows carry their own newlines
+            count = writer(rows, self.stdout)
+        else:
+            with open(path, "w", newline="", encoding="utf-8") as out:
+                count = writer(rows, out)
+
+        self.stderr.write(f"exported {count} appointments for {shop.name}")
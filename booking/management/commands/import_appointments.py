@@ -0,0 +1,57 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.models import Shop
+from booking.transfer import FIELDS, import_appointments, read_rows
+
+
+class Command(BaseCommand):
+    help = ("Import clients and appointments for a shop from CSV or JSONL, "
+            "in batches, rejecting rows that overlap existing bookings.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("shop", help="shop slug")
+        parser.add_argument("path", help="file to read, '-' for stdin")
+        parser.add_argument("--format", choices=["csv", "jsonl"],
+                            help="defaults to the file extension, else csv")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--rejects", help="write rejected rows (+ reason) to this CSV file")
+
+    def handle(self, *args, **opts):
+        try:
+            shop = Shop.objects.get(slug=opts["shop"])
+        except Shop.DoesNotExist:
+            raise CommandError(f"no shop with slug {opts['shop']!r}")
+
+        path = opts["path"]
+        fmt = opts["format"] or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+
+        rejects_file = open(opts["rejects"], "w", newline="", encoding="utf-8") if opts["rejects"] else None
+        rejects = None
+        if rejects_file:
+            rejects = csv.DictWriter(rejects_file, fieldnames=["line", "reason"] + FIELDS, extrasaction="ignore")
+            rejects.writeheader()
+
+        def on_reject(line_no, row, reason):
+            if rejects:
+                rejects.writerow({"line": line_no, "reason": reason, **(row or {})})
+            else:
+                self.stderr.write(f"line {line_no}: {reason}")
+
+        stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        try:
+            imported, rejected = import_appointments(
+                shop,
+                read_rows(stream, fmt),
+                batch_size=opts["batch_size"],
+                on_reject=on_reject,
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if rejects_file:
+                rejects_file.close()
+
+        self.stdout.write(f"imported {imported} appointments for {shop.name}, rejected {rejected}")
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from booking import events
+from booking import notifications  # noqa: F401  (registers the email handlers)
+from booking.jobs import run_batch
+
+
+class Command(BaseCommand):
+    help = ("Background worker: claim due jobs in batches and run them (booking and "
+            "status-change emails), and prune old dashboard events. Run one or more of "
+            "these next to the web server.")
+    prune_every = 60                        # seconds between dashboard event prunes
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--poll", type=float, default=2.0,
+                            help="seconds to sleep when the queue is empty")
+        parser.add_argument("--once", action="store_true",
+                            help="drain the due jobs and exit instead of polling forever")
+
+    def handle(self, *args, **opts):
+        total_ok = total_failed = 0
+        next_prune = 0
+        try:
+            while True:
+                close_old_connections()         # honour CONN_MAX_AGE between batches
+                if time.monotonic() >= next_prune:
+                    events.prune()
+                    next_prune = time.monotonic() + self.prune_every
+                ok, failed = run_batch(opts["batch_size"])
+                total_ok += ok
+                total_failed += failed
+                if ok or failed:
+                    self.stdout.write(f"batch: {ok} done, {failed} failed/retrying")
+                    continue
+                if opts["once"]:
+                    break
+                time.sleep(opts["poll"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"{total_ok} jobs done, {total_failed} failed/retrying")
@@ -0,0 +1,108 @@
+import datetime
+import multiprocessing
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from booking.benchmark import scratch_sqlite_file, seed_shop
+from booking.models import Appointment, Client, Shop
+from booking.services import BLOCKING_STATUSES, SlotTaken, claim_slot
+
+
+def _naive_claim(shop, start_dt, duration, create):
+    # the old ShopAppointment.post: check in a deferred transaction, create afterwards
+    end_dt = start_dt + duration
+    with transaction.atomic():
+        if Appointment.objects.filter(
+            shop=shop, status__in=BLOCKING_STATUSES,
+            start_time__lt=end_dt, end_time__gt=start_dt,
+        ).exists():
+            raise SlotTaken()
+    return create()
+
+
+def _worker(args):
+    worker_id, shop_pk, day, attempts, slots, naive, seed = args
+    rng = random.Random(seed)
+    claim = _naive_claim if naive else claim_slot
+
+    shop = Shop.objects.get(pk=shop_pk)
+    client = Client.objects.create(name=f"Worker {worker_id}", email=f"w{worker_id}@stress.example", phone="0")
+    booked = taken = locked = 0
+    for _ in range(attempts):
+        # small slot pool + mixed durations, so attempts collide constantly
+        start = day + datetime.timedelta(minutes=15 * rng.randrange(slots))
+        duration = datetime.timedelta(minutes=rng.choice((15, 30, 60)))
+        try:
+            claim(shop, start, duration, lambda: Appointment.objects.create(
+                client=client, shop=shop, start_time=start, duration=duration, status="Confirmed",
+            ))
+            booked += 1
+        except SlotTaken:
+            taken += 1
+        except OperationalError:
+            locked += 1
+    connections.close_all()
+    return booked, taken, locked
+
+
+class Command(BaseCommand):
+    help = ("Hammer one shop's slots from several processes against a scratch SQLite "
+            "file and verify that no two blocking appointments overlap.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--attempts", type=int, default=100, help="booking attempts per worker")
+        parser.add_argument("--slots", type=int, default=32, help="15-minute start slots to fight over")
+        parser.add_argument("--naive", action="store_true",
+                            help="use the old check-then-create flow (shows the double bookings)")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        if connections["default"].vendor != "sqlite":
+            raise CommandError("stress_booking runs against a scratch SQLite file")
+
+        with scratch_sqlite_file(prefix="easybook-stress-"):
+            self.run(opts)
+
+    def run(self, opts):
+        shop = seed_shop("Stress Shop")
+        day = timezone.make_aware(datetime.datetime.combine(
+            timezone.localdate() + datetime.timedelta(days=1), datetime.time(9, 0)))
+        connections.close_all()                 # children must not share the parent's connection
+
+        jobs = [
+            (i, shop.pk, day, opts["attempts"], opts["slots"], opts["naive"], opts["seed"] * 1000 + i)
+            for i in range(opts["workers"])
+        ]
+        began = time.perf_counter()
+        with multiprocessing.get_context("fork").Pool(opts["workers"]) as pool:
+            results = pool.map(_worker, jobs)
+        elapsed = time.perf_counter() - began
+
+        booked = sum(r[0] for r in results)
+        taken = sum(r[1] for r in results)
+        locked = sum(r[2] for r in results)
+        total = opts["workers"] * opts["attempts"]
+
+        blocking = Appointment.objects.filter(shop=shop, status__in=BLOCKING_STATUSES)
+        overlapping = blocking.filter(Exists(
+            blocking.filter(
+                start_time__lt=OuterRef("end_time"),
+                end_time__gt=OuterRef("start_time"),
+            ).exclude(pk=OuterRef("pk"))
+        )).count()
+
+        mode = "naive check-then-create" if opts["naive"] else "claim_slot"
+        self.stdout.write(
+            f"{mode}: {opts['workers']} processes x {opts['attempts']} attempts in {elapsed:.2f}s\n"
+            f"  booked={booked} slot_taken={taken} lock_errors={locked}\n"
+            f"  throughput={total / elapsed:.0f} attempts/s, {booked / elapsed:.1f} bookings/s\n"
+            f"  overlapping appointments: {overlapping}"
+        )
+        if overlapping:
+            raise CommandError(f"{overlapping} appointments overlap another booking")
@@ -0,0 +1,29 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from booking.routers import REPLICA_ALIAS, replica_configured
+
+
+class Command(BaseCommand):
+    help = ("Copy the primary SQLite database onto the replica file (DJANGO_REPLICA_DB), "
+            "standing in for real replication when trying the read router locally.")
+
+    def handle(self, *args, **opts):
+        if not replica_configured():
+            raise CommandError("no 'replica' database configured; set DJANGO_REPLICA_DB")
+        primary, replica = connections["default"], connections[REPLICA_ALIAS]
+        if primary.vendor != "sqlite" or replica.vendor != "sqlite":
+            raise CommandError("sync_replica only copies SQLite files")
+
+        replica.close()                          # the backup replaces the file's pages
+        src = sqlite3.connect(primary.settings_dict["NAME"])
+        dst = sqlite3.connect(replica.settings_dict["NAME"])
+        try:
+            # online backup API: consistent snapshot even while the primary takes writes
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+        self.stdout.write(f"copied {primary.settings_dict['NAME']} → {replica.settings_dict['NAME']}")
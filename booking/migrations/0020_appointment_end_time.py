@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2025-08-12 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0019_alter_shop_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='end_time',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def fill_end_time(apps, schema_editor):
+    Appointment = apps.get_model('booking', 'Appointment')
+
+    # small batches so big tables don't load into memory at once
+    while True:
+        batch = list(
+            Appointment.objects.filter(end_time__isnull=True)
+            .only('start_time', 'duration')
+            .order_by('pk')[:2000]
+        )
+        if not batch:
+            break
+        for appt in batch:
+            appt.end_time = appt.start_time + appt.duration
+        Appointment.objects.bulk_update(batch, ['end_time'])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('booking', '0020_appointment_end_time'),
+    ]
+    operations = [
+        migrations.RunPython(fill_end_time, migrations.RunPython.noop),
+    ]
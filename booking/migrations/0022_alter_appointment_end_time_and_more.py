@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2025-08-12 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0021_fill_appointment_end_time'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointment',
+            name='end_time',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['shop', 'status', 'start_time', 'end_time'], name='appt_shop_status_time_idx'),
+        ),
+    ]
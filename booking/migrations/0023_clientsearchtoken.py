@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0022_alter_appointment_end_time_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=254)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='booking.client')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'client'], name='client_search_token_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def fill_tokens(apps, schema_editor):
+    Client = apps.get_model('booking', 'Client')
+    ClientSearchToken = apps.get_model('booking', 'ClientSearchToken')
+    from booking.search import client_tokens
+
+    last_pk = 0
+    while True:
+        batch = list(Client.objects.filter(pk__gt=last_pk).order_by('pk')[:2000])
+        if not batch:
+            break
+        ClientSearchToken.objects.bulk_create(
+            ClientSearchToken(client=c, token=token)
+            for c in batch
+            for token in client_tokens(c.name, c.email, c.phone)
+        )
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('booking', '0023_clientsearchtoken'),
+    ]
+    operations = [
+        migrations.RunPython(fill_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0025_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('status', 'Status changed')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='booking.appointment')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='booking.shop')),
+            ],
+        ),
+    ]
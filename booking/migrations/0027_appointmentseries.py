@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:12
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0026_shopevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.DateTimeField()),
+                ('duration', models.DurationField(default=datetime.timedelta(seconds=1800))),
+                ('frequency', models.CharField(choices=[('weekly', 'Every week'), ('biweekly', 'Every 2 weeks'), ('monthly', 'Every month')], max_length=10)),
+                ('count', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('until', models.DateField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('Confirmed', 'Confirmed'), ('Cancelled', 'Cancelled')], default='Confirmed', max_length=10)),
+                ('note', models.TextField(default='-', max_length=666)),
+                ('last_end', models.DateTimeField(editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='booking.client')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series', to='booking.shop')),
+            ],
+            options={
+                'verbose_name_plural': 'appointment series',
+                'indexes': [models.Index(fields=['shop', 'status', 'start_time', 'last_end'], name='series_shop_status_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    Shop = apps.get_model('booking', 'Shop')
+    ShopVersion = apps.get_model('booking', 'ShopVersion')
+    # new shops get theirs from the post_save signal
+    ShopVersion.objects.bulk_create(
+        ShopVersion(shop_id=pk) for pk in Shop.objects.values_list('pk', flat=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0027_appointmentseries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopVersion',
+            fields=[
+                ('shop', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='version', serialize=False, to='booking.shop')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
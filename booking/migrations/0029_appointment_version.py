@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0028_shopversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
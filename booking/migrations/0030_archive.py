@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:31
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0029_appointment_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveTotals',
+            fields=[
+                ('shop', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive_totals', serialize=False, to='booking.shop')),
+                ('appointments', models.PositiveBigIntegerField(default=0)),
+                ('completed', models.PositiveBigIntegerField(default=0)),
+                ('cancelled', models.PositiveBigIntegerField(default=0)),
+                ('archived_until', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedAppointment',
+            fields=[
+                ('id', models.PositiveBigIntegerField(primary_key=True, serialize=False)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('duration', models.DurationField()),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Confirmed', 'Confirmed'), ('Cancelled', 'Cancelled'), ('Completed', 'Completed')], max_length=10)),
+                ('note', models.TextField(default='-', max_length=666)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='booking.client')),
+                ('shop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='booking.shop')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['shop', 'start_time'], name='archived_shop_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0030_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Confirmed', 'Confirmed'), ('Cancelled', 'Cancelled'), ('Completed', 'Completed')], max_length=10)),
+                ('minutes', models.PositiveIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='booking.shop')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('shop', 'day', 'status', 'minutes'), name='rollup_shop_day_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0031_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shopevent',
+            index=models.Index(fields=['created_at'], name='shop_event_created_idx'),
+        ),
+    ]
@@ -3,8 +3,11 @@ import datetime
 from django.contrib.auth.models import User
 from django.db import models
 from django.db.models.functions import Lower
+from django.utils import timezone
 from django.utils.text import slugify
 
+from . import recurrence
+
 DAYS_OF_WEEK = [
     ('mon', 'Monday'),
     ('tue', 'Tuesday'),
@@ -95,6 +98,27 @@ class Client(models.Model):
         """@brief Human-readable identifier used in admin and templates."""
         return f"{self.name} ({self.email})"
 
+
+class ClientSearchToken(models.Model):
+    """
+    @brief One prefix-searchable token of a Client (name word, email part, phone digits).
+    @details
+      Rebuilt by `booking.search.index_client` whenever a Client is saved.
+      Lookups are `token >= term AND token < term + U+10FFFF`, a plain range
+      scan on the (token, client) index, unlike `icontains`.
+    """
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="search_tokens")
+    token  = models.CharField(max_length=254)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["token", "client"], name="client_search_token_idx"),
+        ]
+
+    def __str__(self):
+        """@brief Human-readable identifier used in admin and templates."""
+        return self.token
+
 class Appointment(models.Model):
     """
     @brief A scheduled service between a Client and a Shop.
@@ -102,7 +126,11 @@ class Appointment(models.Model):
       - `start_time`: timezone-aware datetime for the appointment start
       - `duration`: `datetime.timedelta`, defaults to 30 minutes
       - `status`: one of {"Confirmed","Completed","Cancelled"}
+      - `end_time`: materialized `start_time + duration`, kept in sync by `save()`
+      - `version`: bumped by every save; keys the dashboard's cached row (see `booking.fragments`)
     @invariant duration.total_seconds() > 0
+    @warning `bulk_create()`/`update()` skip `save()`, set `end_time` yourself
+             there and bump `version` with `F("version") + 1` on updates.
     """
 
     STATUS_CHOICES = [
@@ -122,9 +150,278 @@ class Appointment(models.Model):
         default="Confirmed",
     )
     duration   = models.DurationField(default=datetime.timedelta(minutes=30))
+    end_time   = models.DateTimeField(editable=False)
     note       = models.TextField(max_length=666, default="-")
+    version    = models.PositiveIntegerField(default=1, editable=False)
 
+    # overlap checks probe (shop, status, start_time < new_end, end_time > new_start)
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["shop", "status", "start_time", "end_time"],
+                name="appt_shop_status_time_idx",
+            )
+        ]
+
+
+    def __str__(self):
+        """@brief Human-readable identifier used in admin and templates."""
+        return f"{self.client.name} @ {self.start_time}"
+
+    def save(self, *args, **kwargs):
+        """
+        @brief Keep `end_time` in sync with `start_time` and `duration`, and bump `version`.
+        @return None
+        """
+        self.end_time = self.start_time + self.duration
+        if not self._state.adding:
+            self.version += 1
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = set(update_fields) | {"version"}
+            if {"start_time", "duration"} & update_fields:
+                update_fields.add("end_time")
+            kwargs["update_fields"] = update_fields
+        super().save(*args, **kwargs)
+
+class AppointmentSeries(models.Model):
+    """
+    @brief A recurring booking stored as one rule, expanded on demand.
+    @details
+      - `start_time`: start of the first occurrence; later ones keep its wall-clock time
+      - `frequency`: weekly, biweekly or monthly (see `booking.recurrence`)
+      - `count` / `until`: the series ends after `count` visits or on `until`, whichever is first
+      - `last_end`: materialized end of the final occurrence, kept in sync by `save()`,
+        so window queries can skip series that are over
+      - `status`: "Confirmed" blocks its occurrences, "Cancelled" frees them
+    @note No Appointment rows are created for occurrences; `occurrences()`
+          computes the ones inside any window.
+    """
+    STATUS_CHOICES = [
+        ("Confirmed", "Confirmed"),
+        ("Cancelled", "Cancelled"),
+    ]
+
+    client     = models.ForeignKey(Client, on_delete=models.CASCADE)
+    shop       = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name="series")
+    start_time = models.DateTimeField()
+    duration   = models.DurationField(default=datetime.timedelta(minutes=30))
+    frequency  = models.CharField(max_length=10, choices=recurrence.FREQUENCY_CHOICES)
+    count      = models.PositiveSmallIntegerField(null=True, blank=True)
+    until      = models.DateField(null=True, blank=True)
+    status     = models.CharField(max_length=10, choices=STATUS_CHOICES, default="Confirmed")
+    note       = models.TextField(max_length=666, default="-")
+    last_end   = models.DateTimeField(editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # overlap checks probe (shop, status, start_time < window_end, last_end > window_start)
+    class Meta:
+        verbose_name_plural = "appointment series"
+        indexes = [
+            models.Index(
+                fields=["shop", "status", "start_time", "last_end"],
+                name="series_shop_status_time_idx",
+            )
+        ]
+
+    def __str__(self):
+        """@brief Human-readable identifier used in admin and templates."""
+        return f"{self.client.name} {self.get_frequency_display().lower()} from {self.start_time}"
+
+    @property
+    def last_index(self):
+        """@brief Index of the final occurrence (`occurrence_count - 1`). @return int"""
+        return recurrence.last_index(self.start_time, self.frequency, self.count, self.until)
+
+    @property
+    def occurrence_count(self):
+        """@brief Number of visits in the series. @return int"""
+        return self.last_index + 1
+
+    def occurrences(self, window_start, window_end):
+        """
+        @brief Occurrences overlapping [window_start, window_end), computed lazily.
+        @return list[tuple[datetime, datetime]] (start, end) pairs sorted by start.
+        """
+        return recurrence.occurrences(
+            self.start_time, self.duration, self.frequency, self.last_index, window_start, window_end,
+        )
+
+    def next_occurrence(self, after):
+        """@brief Start of the first occurrence ending after `after`, or None when the series is over."""
+        found = self.occurrences(after, self.last_end)
+        return found[0][0] if found else None
+
+    def save(self, *args, **kwargs):
+        """
+        @brief Keep `last_end` in sync with the rule.
+        @exception ValueError if the rule has no occurrence at all.
+        @return None
+        """
+        last = self.last_index
+        if last < 0:
+            raise ValueError("series ends before its first occurrence")
+        self.last_end = recurrence.nth_start(self.start_time, self.frequency, last) + self.duration
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"start_time", "duration", "frequency", "count", "until"} & set(update_fields):
+            kwargs["update_fields"] = set(update_fields) | {"last_end"}
+        super().save(*args, **kwargs)
+
+class ShopVersion(models.Model):
+    """
+    @brief Per-shop change counter: the validator behind ETag/Last-Modified (see `booking.versions`).
+    @details Bumped in the same transaction as every write to the shop, its
+             appointments or its series. It lives in its own row so that
+             saving a Shop (e.g. the settings form) can never write back a
+             stale count.
+    """
+    shop       = models.OneToOneField(Shop, on_delete=models.CASCADE, primary_key=True, related_name="version")
+    version    = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        """@brief Human-readable identifier used in admin and templates."""
+        return f"shop {self.shop_id} v{self.version}"
+
+class Job(models.Model):
+    """
+    @brief One unit of background work in the database-backed queue (see `booking.jobs`).
+    @details
+      - `key`: idempotency key; enqueueing the same key twice is a no-op
+      - `run_after`: not claimed before this time (retry backoff)
+      - `locked_at`: when a worker claimed it; stale claims are picked up again
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE    = "done"
+    FAILED  = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE,    "Done"),
+        (FAILED,  "Failed"),
+    ]
+
+    kind        = models.CharField(max_length=50)
+    key         = models.CharField(max_length=200, unique=True)
+    payload     = models.JSONField(default=dict)
+    status      = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts    = models.PositiveSmallIntegerField(default=0)
+    run_after   = models.DateTimeField(default=timezone.now)
+    locked_at   = models.DateTimeField(null=True, blank=True)
+    last_error  = models.TextField(blank=True)
+    created_at  = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    # workers poll (status, run_after) for due jobs
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="job_status_run_after_idx"),
+        ]
+
+    def __str__(self):
+        """@brief Human-readable identifier used in admin and templates."""
+        return f"{self.kind} [{self.status}] {self.key}"
+
+
+class ShopEvent(models.Model):
+    """
+    @brief Append-only feed of appointment changes per shop (see `booking.events`).
+    @details Written in the same transaction as the change, so an event is
+             visible exactly when the change has committed. The dashboard's
+             event stream tails it by primary key (the SSE `Last-Event-ID`).
+    """
+    CREATED = "created"
+    STATUS  = "status"
+    KIND_CHOICES = [
+        (CREATED, "Created"),
+        (STATUS,  "Status changed"),
+    ]
+
+    # the FK index on shop_id also covers (shop, id): streams read shop=?, id > ?
+    shop        = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name="events")
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name="+")
+    kind        = models.CharField(max_length=10, choices=KIND_CHOICES)
+    created_at  = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # `events.prune` deletes by age; without it every prune scans the table
+            models.Index(fields=["created_at"], name="shop_event_created_idx"),
+        ]
+
+    def __str__(self):
+        """@brief Human-readable identifier used in admin and templates."""
+        return f"#{self.pk} {self.kind} appointment {self.appointment_id}"
+
+
+class ArchivedAppointment(models.Model):
+    """
+    @brief A finished (Completed/Cancelled) appointment moved out of the hot table (see `booking.archive`).
+    @details Same columns as `Appointment`; `id` is the original primary key,
+             so a batch that is copied twice is a no-op.
+    """
+    id          = models.PositiveBigIntegerField(primary_key=True)
+    client      = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="+")
+    shop        = models.ForeignKey(Shop, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    start_time  = models.DateTimeField()
+    end_time    = models.DateTimeField()
+    duration    = models.DurationField()
+    status      = models.CharField(max_length=10, choices=Appointment.STATUS_CHOICES)
+    note        = models.TextField(max_length=666, default="-")
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["shop", "start_time"], name="archived_shop_time_idx"),
+        ]
+
+    def __str__(self):
+        """@brief Human-readable identifier used in admin and templates."""
+        return f"archived #{self.pk} @ {self.start_time}"
+
+
+class ArchiveTotals(models.Model):
+    """
+    @brief Running counts of a shop's archived appointments.
+    @details Incremented in the same transaction that moves rows into
+             `ArchivedAppointment`, so history badges stay correct by
+             adding one row instead of scanning the archive.
+    """
+    shop           = models.OneToOneField(Shop, on_delete=models.CASCADE, primary_key=True, related_name="archive_totals")
+    appointments   = models.PositiveBigIntegerField(default=0)
+    completed      = models.PositiveBigIntegerField(default=0)
+    cancelled      = models.PositiveBigIntegerField(default=0)
+    archived_until = models.DateTimeField(null=True, blank=True)    # latest end_time archived
+
+    def __str__(self):
+        """@brief Human-readable identifier used in admin and templates."""
+        return f"shop {self.shop_id}: {self.appointments} archived"
+
+
+class DailyRollup(models.Model):
+    """
+    @brief How many appointments of a shop fall on one day, per status and length (see `booking.rollups`).
+    @details Kept up to date on every appointment write and never touched by
+             archival, so the analytics page reads a few rows per day
+             whatever the shop's volume. `count` may dip below zero on a
+             shop that was never backfilled; `manage.py backfill_rollups`
+             recomputes it.
+    """
+    shop    = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name="rollups")
+    day     = models.DateField()
+    status  = models.CharField(max_length=10, choices=Appointment.STATUS_CHOICES)
+    minutes = models.PositiveIntegerField()
+    count   = models.IntegerField(default=0)
+
+    # the unique index also serves the analytics reads (shop = ?, day BETWEEN ? AND ?)
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["shop", "day", "status", "minutes"], name="rollup_shop_day_key"),
+        ]
 
     def __str__(self):
         """@brief Human-readable identifier used in admin and templates."""
-        return f"{self.client.name} @ {self.start_time}"
\ No newline at end of file
+        return f"shop {self.shop_id} {self.day} {self.status} {self.minutes}min: {self.count}"
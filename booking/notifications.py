@@ -0,0 +1,120 @@
+# booking/notifications.py
+from django.core import mail
+from django.utils import timezone
+
+from .jobs import enqueue, enqueue_many, handler
+from .models import Appointment
+
+CREATED = "appointment_created"
+STATUS_CHANGED = "appointment_status"
+
+
+def notify_created(appointment):
+    """
+    @brief Queue the "booked" emails for a new appointment (client + shop owner).
+    @details Called from the Appointment post_save signal, i.e. inside the
+             booking transaction, so a rolled back booking queues nothing.
+    """
+    enqueue(CREATED, {"appointment": appointment.pk}, key=f"appointment:{appointment.pk}:created")
+
+
+def notify_status_change(appointment, previous):
+    """
+    @brief Queue the client email for a status transition (Mark Completed/Confirmed/Cancelled).
+    @param appointment Appointment Already saved with its new status (and bumped `version`).
+    @param previous str Status before the change.
+    """
+    notify_status_changes([(appointment.pk, previous, appointment.version)], appointment.status)
+
+
+def notify_status_changes(changes, status):
+    """
+    @brief Queue the status emails of a bulk update in one INSERT.
+    @details Keyed on the appointment's `version` after the change: every
+             transition bumps it, so two transitions never share a key and
+             a replayed one (same pk, same version) is queued once.
+    @param changes list[tuple[int, str, int]] (appointment pk, previous status, new version).
+    @param status str The new status of all of them.
+    """
+    enqueue_many(STATUS_CHANGED, [
+        (
+            {"appointment": pk, "status": status, "previous": previous},
+            f"appointment:{pk}:v{version}:{status}",
+        )
+        for pk, previous, version in changes
+    ])
+
+
+def _when(appt):
+    return timezone.localtime(appt.start_time).strftime("%A %d %B %Y, %H:%M")
+
+
+def _created_messages(appt):
+    minutes = int(appt.duration.total_seconds() // 60)
+    messages = [mail.EmailMessage(
+        subject=f"Your appointment at {appt.shop.name} is booked",
+        body=(
+            f"Hi {appt.client.name},\n\n"
+            f"your {minutes}-minute appointment at {appt.shop.name} on {_when(appt)} "
+            f"is {appt.status.lower()}.\n\n{appt.shop.address}\n{appt.shop.phone}\n"
+        ),
+        to=[appt.client.email],
+    )]
+    if appt.shop.owner.email:
+        messages.append(mail.EmailMessage(
+            subject=f"New booking: {appt.client.name}, {_when(appt)}",
+            body=(
+                f"{appt.client.name} ({appt.client.email}, {appt.client.phone}) booked "
+                f"{minutes} minutes on {_when(appt)}.\n\nNote: {appt.note}\n"
+            ),
+            to=[appt.shop.owner.email],
+        ))
+    return messages
+
+
+def _status_messages(appt, status):
+    return [mail.EmailMessage(
+        subject=f"Your appointment at {appt.shop.name} was {status.lower()}",
+        body=(
+            f"Hi {appt.client.name},\n\n"
+            f"your appointment at {appt.shop.name} on {_when(appt)} is now {status.lower()}.\n"
+        ),
+        to=[appt.client.email],
+    )]
+
+
+def _deliver(jobs, build):
+    """
+    @brief Shared batch runner: one query for the appointments, one mail connection.
+    @param build callable(appointment, job) → list[EmailMessage]
+    @return generator of (job, error|None)
+    """
+    appointments = (
+        Appointment.objects
+        .select_related("client", "shop__owner")
+        .in_bulk([job.payload["appointment"] for job in jobs])
+    )
+    with mail.get_connection() as connection:
+        for job in jobs:
+            appt = appointments.get(job.payload["appointment"])
+            if appt is None or appt.shop is None:
+                yield job, None                 # deleted since: nothing to tell anyone
+                continue
+            try:
+                connection.send_messages(build(appt, job))
+            except Exception as exc:
+                yield job, exc
+            else:
+                yield job, None
+
+
+@handler(CREATED)
+def send_created(jobs):
+    """@brief Job handler: "booked" emails for a batch of new appointments."""
+    return _deliver(jobs, lambda appt, job: _created_messages(appt))
+
+
+@handler(STATUS_CHANGED)
+def send_status_changed(jobs):
+    """@brief Job handler: status-change emails for a batch of transitions."""
+    return _deliver(jobs, lambda appt, job: _status_messages(appt, job.payload["status"]))
@@ -0,0 +1,145 @@
+# booking/pagination.py
+import base64
+import binascii
+import json
+import operator
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    """
+    @brief One page of a keyset-paginated list.
+    @details `next_cursor` is an opaque token for the row after the last one
+             shown, or None on the last page.
+    """
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def has_next(self):
+        """@brief True if another page follows. @return bool"""
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(values):
+    """
+    @brief Pack the ordering values of a row into a URL-safe token.
+    @param values list Values of the ordering fields (datetimes become ISO strings).
+    @return str
+    """
+    raw = json.dumps(
+        [v.isoformat() if hasattr(v, "isoformat") else v for v in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    @brief Inverse of `encode_cursor`.
+    @return list|None The ordering values, or None if the token is missing/garbled.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def keyset_filter(ordering, values):
+    """
+    @brief Build "rows strictly after `values`" for a multi-column ordering.
+    @details For ordering (a, b, pk) this is
+             a > va OR (a = va AND b > vb) OR (a = va AND b = vb AND pk > vpk),
+             with `<` for descending columns, so the DB can seek on an index.
+    @param ordering list[str] order_by() terms, e.g. ["-start_time", "-pk"].
+    @param values list Cursor values, one per term.
+    @return Q
+    """
+    conds = []
+    equal = Q()
+    for term, value in zip(ordering, values):
+        field = term.lstrip("-")
+        lookup = "lt" if term.startswith("-") else "gt"
+        conds.append(equal & Q(**{f"{field}__{lookup}": value}))
+        equal &= Q(**{field: value})
+    return reduce(operator.or_, conds)
+
+
+def _value(obj, field):
+    # follow "client__name" style paths
+    for part in field.split("__"):
+        obj = getattr(obj, part)
+    return obj
+
+
+def keyset_ordering(ordering):
+    """@brief `ordering` with a pk tie breaker appended when missing. @return list[str]"""
+    ordering = list(ordering or ["pk"])
+    if not any(term.lstrip("-") in ("pk", "id") for term in ordering):
+        ordering.append("-pk" if ordering[0].startswith("-") else "pk")
+    return ordering
+
+
+def keyset_page(queryset, ordering, cursor, page_size):
+    """
+    @brief The page of `queryset` after `cursor`, in `ordering` (see `keyset_ordering`).
+    @details One query: an index seek past the cursor row, fetching one
+             extra row to know whether a next page exists. A tampered or
+             stale cursor falls back to the first page.
+    @param cursor str|None Token from a previous page's `next_cursor`.
+    @return KeysetPage
+    """
+    queryset = queryset.order_by(*ordering)
+
+    values = decode_cursor(cursor)
+    if values and len(values) == len(ordering):
+        try:
+            queryset = queryset.filter(keyset_filter(ordering, values))
+        except (ValueError, ValidationError):
+            pass                                # tampered cursor → first page
+
+    # fetch one extra row to know whether there is a next page
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor([_value(rows[-1], term.lstrip("-")) for term in ordering])
+    return KeysetPage(rows, next_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    @brief ListView mixin: paginate on the queryset ordering + pk instead of OFFSET.
+    @details
+      The queryset's `order_by()` is kept and `pk` is appended as a tie
+      breaker, so each page is one index seek no matter how deep the user
+      scrolls. Pass `?cursor=<token>` to get the page after a row.
+    """
+    paginate_by = 25
+    cursor_kwarg = "cursor"
+
+    def get_keyset(self, queryset):
+        """@brief Ordering terms used for the cursor. @return list[str]"""
+        return keyset_ordering(queryset.query.order_by or self.get_ordering())
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        @brief Return one keyset page.
+        @return tuple (paginator, page, object_list, is_paginated) like `MultipleObjectMixin`.
+        """
+        page = keyset_page(queryset, self.get_keyset(queryset), self.request.GET.get(self.cursor_kwarg), page_size)
+        return (None, page, page.object_list, page.has_next())
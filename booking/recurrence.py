@@ -0,0 +1,120 @@
+# booking/recurrence.py
+import bisect
+import calendar
+import datetime
+
+from django.utils import timezone
+
+WEEKLY = "weekly"
+BIWEEKLY = "biweekly"
+MONTHLY = "monthly"
+FREQUENCY_CHOICES = [
+    (WEEKLY,   "Every week"),
+    (BIWEEKLY, "Every 2 weeks"),
+    (MONTHLY,  "Every month"),
+]
+WEEKS = {WEEKLY: 1, BIWEEKLY: 2}
+
+# hard cap on one series: ten years of weekly visits
+MAX_OCCURRENCES = 520
+
+
+def _add_months(value, months):
+    """@brief Same day `months` later, clamped to the month's last day (Jan 31 → Feb 28)."""
+    year, month = divmod(value.month - 1 + months, 12)
+    year += value.year
+    month += 1
+    return value.replace(year=year, month=month, day=min(value.day, calendar.monthrange(year, month)[1]))
+
+
+def nth_start(start, frequency, n):
+    """
+    @brief Start of occurrence `n` (0 = `start` itself), computed directly.
+    @details Steps are taken on the local wall clock, so a 10:00 series
+             stays at 10:00 across DST changes. Monthly series keep the day
+             of month, or the month's last day when it is shorter.
+    @param start datetime Aware start of the first occurrence.
+    @param frequency str WEEKLY, BIWEEKLY or MONTHLY.
+    @param n int Occurrence index.
+    @return datetime Aware start.
+    """
+    tz = timezone.get_current_timezone()
+    local = timezone.localtime(start, tz).replace(tzinfo=None)
+    if frequency == MONTHLY:
+        local = _add_months(local, n)
+    else:
+        local += datetime.timedelta(weeks=WEEKS[frequency] * n)
+    return timezone.make_aware(local, tz)
+
+
+def last_index(start, frequency, count=None, until=None):
+    """
+    @brief Index of the final occurrence allowed by `count`, `until` and `MAX_OCCURRENCES`.
+    @param until datetime.date Last day (inclusive) an occurrence may fall on.
+    @return int -1 when `until` is before the first occurrence.
+    """
+    limits = [MAX_OCCURRENCES - 1]
+    if count:
+        limits.append(count - 1)
+    if until is not None:
+        first_day = timezone.localtime(start).date()
+        if frequency == MONTHLY:
+            n = (until.year - first_day.year) * 12 + until.month - first_day.month
+            if n >= 0 and _add_months(first_day, n) > until:
+                n -= 1
+        else:
+            n = (until - first_day).days // (7 * WEEKS[frequency])
+        limits.append(n)
+    return min(limits)
+
+
+def occurrences(start, duration, frequency, last, window_start, window_end):
+    """
+    @brief (start, end) of every occurrence overlapping a time window, and no others.
+    @details Jumps straight to the first candidate index instead of walking
+             the series from its start, so a window costs the same whether
+             the series began last week or years ago.
+    @param last int Index of the final occurrence (see `last_index`).
+    @return list[tuple[datetime, datetime]] Sorted by start.
+    """
+    if frequency == MONTHLY:
+        first = timezone.localtime(start)
+        probe = timezone.localtime(window_start - duration)
+        n = (probe.year - first.year) * 12 + probe.month - first.month - 1
+    else:
+        # one step of slack for DST shifts between UTC and wall-clock steps
+        n = (window_start - duration - start) // datetime.timedelta(weeks=WEEKS[frequency]) - 1
+    n = max(n, 0)
+
+    found = []
+    while n <= last:
+        occ_start = nth_start(start, frequency, n)
+        if occ_start >= window_end:
+            break
+        if occ_start + duration > window_start:
+            found.append((occ_start, occ_start + duration))
+        n += 1
+    return found
+
+
+def first_overlap(candidates, busy):
+    """
+    @brief First candidate interval that overlaps any busy interval.
+    @details Both lists sorted by start. A running maximum of the busy ends
+             lets each candidate be checked with one bisect, so a whole
+             series is checked in O((n + m) log m) instead of one query per
+             occurrence.
+    @param candidates list[tuple[datetime, datetime]]
+    @param busy list[tuple[datetime, datetime]]
+    @return tuple|None The clashing candidate.
+    """
+    starts = [start for start, _ in busy]
+    reach = []
+    for _, end in busy:
+        reach.append(max(end, reach[-1]) if reach else end)
+
+    for start, end in candidates:
+        i = bisect.bisect_left(starts, end)     # busy intervals starting before this one ends
+        if i and reach[i - 1] > start:
+            return start, end
+    return None
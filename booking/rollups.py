@@ -0,0 +1,160 @@
+# booking/rollups.py
+import datetime
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Appointment, ArchivedAppointment, DailyRollup
+from .services import is_open_day, write_transaction
+
+# statuses whose time counts as booked for utilization
+BOOKED_STATUSES = {"Pending", "Confirmed", "Completed"}
+
+
+def key(shop_id, start_time, status, duration):
+    """
+    @brief The rollup row an appointment is counted in.
+    @return tuple|None (shop_id, local day, status, minutes); None without a shop.
+    """
+    if shop_id is None:
+        return None
+    local = start_time if timezone.is_naive(start_time) else timezone.localtime(start_time)
+    return shop_id, local.date(), status, int(duration.total_seconds() // 60)
+
+
+def key_of(appt):
+    """@brief `key` of an Appointment instance. @return tuple|None"""
+    return key(appt.shop_id, appt.start_time, appt.status, appt.duration)
+
+
+def stored_key(pk):
+    """@brief `key` of an appointment as currently stored (before a save changes it). @return tuple|None"""
+    row = Appointment.objects.filter(pk=pk).values_list("shop_id", "start_time", "status", "duration").first()
+    return key(*row) if row else None
+
+
+def moved(old, new):
+    """@brief Count an appointment out of its old row and into its new one (either may be None)."""
+    if old != new:
+        apply(Counter({k: d for k, d in ((old, -1), (new, 1)) if k is not None}))
+
+
+def apply(deltas):
+    """
+    @brief Add `deltas` to the rollup counts.
+    @details One INSERT that makes sure every row exists, then one
+             `UPDATE ... SET count = count + delta` per row, so concurrent
+             writers never overwrite each other's counts. Call it inside the
+             transaction of the write.
+    @param deltas Counter {key: delta}
+    @return None
+    """
+    deltas = {k: d for k, d in deltas.items() if k is not None and d}
+    if not deltas:
+        return
+    DailyRollup.objects.bulk_create(
+        [DailyRollup(shop_id=s, day=day, status=status, minutes=minutes) for s, day, status, minutes in deltas],
+        ignore_conflicts=True,
+    )
+    for (shop_id, day, status, minutes), delta in deltas.items():
+        DailyRollup.objects.filter(shop_id=shop_id, day=day, status=status, minutes=minutes).update(
+            count=F("count") + delta,
+        )
+
+
+def rebuild(shop):
+    """
+    @brief Recompute a shop's rollups from its appointments, archived ones included.
+    @details One grouped query per table, then the shop's rows are replaced
+             in the same (write-locked) transaction, so bookings made
+             meanwhile are neither lost nor counted twice.
+    @return int Rollup rows written.
+    """
+    def run():
+        counts = Counter()
+        for model in (Appointment, ArchivedAppointment):
+            grouped = (
+                model.objects.filter(shop=shop)
+                .annotate(day=TruncDate("start_time"))
+                .values("day", "status", "duration")
+                .annotate(n=Count("pk"))
+                .order_by()
+            )
+            for row in grouped:
+                minutes = int(row["duration"].total_seconds() // 60)
+                counts[(row["day"], row["status"], minutes)] += row["n"]
+
+        DailyRollup.objects.filter(shop=shop).delete()
+        DailyRollup.objects.bulk_create(
+            [
+                DailyRollup(shop=shop, day=day, status=status, minutes=minutes, count=n)
+                for (day, status, minutes), n in counts.items()
+            ],
+            batch_size=500,
+        )
+        return len(counts)
+
+    return write_transaction(run)
+
+
+def open_minutes(shop, day):
+    """@brief Bookable minutes of a shop on a day, from its opening days and hours (no queries)."""
+    if not is_open_day(shop, day):
+        return 0
+    opening = shop.opening_hours.hour * 60 + shop.opening_hours.minute
+    closing = shop.closing_hours.hour * 60 + shop.closing_hours.minute
+    return max(closing - opening, 0)
+
+
+def weekly_summary(shop, first_day, last_day):
+    """
+    @brief Trends per week between two days, read from the rollups only.
+    @details One query over at most (days × statuses × lengths) rows; the
+             cost follows the number of days shown, not the number of
+             appointments.
+    @param first_day date A Monday.
+    @param last_day date Inclusive.
+    @return dict `weeks`: list of dicts (start, bookings, cancelled,
+            cancellation_rate, booked_minutes, open_minutes, utilization),
+            `durations`: list of (minutes, count) most booked first,
+            `totals`: bookings/cancelled/cancellation_rate over the range.
+    """
+    weeks = {}
+    day = first_day
+    while day <= last_day:
+        monday = day - datetime.timedelta(days=day.weekday())
+        week = weeks.setdefault(monday, {"start": monday, "bookings": 0, "cancelled": 0,
+                                         "booked_minutes": 0, "open_minutes": 0})
+        week["open_minutes"] += open_minutes(shop, day)
+        day += datetime.timedelta(days=1)
+
+    durations = defaultdict(int)
+    rows = DailyRollup.objects.filter(shop=shop, day__gte=first_day, day__lte=last_day).values_list(
+        "day", "status", "minutes", "count",
+    )
+    for day, status, minutes, count in rows:
+        week = weeks[day - datetime.timedelta(days=day.weekday())]
+        week["bookings"] += count
+        if status == "Cancelled":
+            week["cancelled"] += count
+        if status in BOOKED_STATUSES:
+            week["booked_minutes"] += minutes * count
+            durations[minutes] += count
+
+    for week in weeks.values():
+        week["cancellation_rate"] = _ratio(week["cancelled"], week["bookings"])
+        week["utilization"] = _ratio(week["booked_minutes"], week["open_minutes"])
+
+    bookings = sum(w["bookings"] for w in weeks.values())
+    cancelled = sum(w["cancelled"] for w in weeks.values())
+    return {
+        "weeks": [weeks[monday] for monday in sorted(weeks)],
+        "durations": sorted(((m, n) for m, n in durations.items() if n > 0), key=lambda d: (-d[1], d[0])),
+        "totals": {"bookings": bookings, "cancelled": cancelled, "cancellation_rate": _ratio(cancelled, bookings)},
+    }
+
+
+def _ratio(part, whole):
+    return round(100 * part / whole, 1) if whole > 0 else None
@@ -0,0 +1,106 @@
+# booking/routers.py
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# alias of the read-only copy in settings.DATABASES (optional)
+REPLICA_ALIAS = "replica"
+
+# after a write the same browser reads from the primary for this long,
+# so it never sees the replica's older copy of what it just changed
+STICKY_COOKIE = "easybook_primary"
+
+_read_alias = contextvars.ContextVar("booking_read_alias", default=None)
+
+
+def replica_configured():
+    """@brief True if a replica database alias is configured. @return bool"""
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def read_from_replica(enabled=True):
+    """
+    @brief Send `booking` model reads inside the block to the replica.
+    @param enabled bool False runs the block against the primary (e.g. right after a write).
+    """
+    token = _read_alias.set(REPLICA_ALIAS if enabled and replica_configured() else None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def pin_to_primary(response):
+    """
+    @brief Make the client's next reads go to the primary (read-your-writes).
+    @param response HttpResponse Response to the write request.
+    @return HttpResponse The same response, with the sticky cookie set.
+    """
+    response.set_cookie(
+        STICKY_COOKIE, "1",
+        max_age=getattr(settings, "REPLICA_STICKY_SECONDS", 5),
+        httponly=True, samesite="Lax",
+    )
+    return response
+
+
+def pinned_to_primary(request):
+    """@brief True if this client wrote recently and must read from the primary. @return bool"""
+    return STICKY_COOKIE in request.COOKIES
+
+
+class ReplicaReadMixin:
+    """
+    @brief View mixin: serve this view's `booking` reads from the replica.
+    @details The response is rendered inside the routing block so querysets
+             the template evaluates lazily are routed too. Clients holding the
+             sticky cookie read from the primary instead.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with read_from_replica(not pinned_to_primary(request)):
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+        return response
+
+
+class PrimaryAfterWriteMixin:
+    """@brief View mixin: pin the client to the primary after every successful POST."""
+
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
+        if response.status_code < 400:
+            pin_to_primary(response)
+        return response
+
+
+class PrimaryReplicaRouter:
+    """
+    @brief Writes always go to `default`; dashboard reads may go to the replica.
+    @details
+      Only views that opt in (see `ReplicaReadMixin`) read from the
+      replica, and only for `booking` models: sessions and users stay on the
+      primary so a fresh login is never missing on a lagging copy. Without a
+      `replica` alias every query goes to `default`.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == "booking":
+            return _read_alias.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # both aliases hold the same data
+        if {obj1._state.db, obj2._state.db} <= {"default", REPLICA_ALIAS}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica is a copy of the primary, never migrated on its own
+        return db != REPLICA_ALIAS
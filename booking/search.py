@@ -0,0 +1,95 @@
+# booking/search.py
+import re
+
+from .models import ClientSearchToken
+
+# phone fragments shorter than this only match at the start of a suffix token
+MIN_PHONE_SUFFIX = 3
+
+# sorts after every real character, so [term, term + TOKEN_END) is "starts with term"
+TOKEN_END = "\U0010ffff"
+
+WORD_SPLIT = re.compile(r"[\W_]+")
+PHONE_CHARS = re.compile(r"[\s\-\(\)\+\.]")
+
+
+def client_tokens(name, email, phone):
+    """
+    @brief Search tokens for one client.
+    @details
+      - every word of the name
+      - the full email, its local part, domain and their dotted pieces
+      - the phone's digits and each suffix of them, so "4567" finds "555-4567"
+    @return set[str] Lower-cased tokens.
+    """
+    tokens = {w for w in WORD_SPLIT.split(name.lower()) if w}
+
+    email = email.lower()
+    if email:
+        local, _, domain = email.partition("@")
+        tokens.update(t for t in (email, local, domain) if t)
+        tokens.update(w for w in WORD_SPLIT.split(email) if w)
+
+    digits = re.sub(r"\D", "", phone)
+    for i in range(max(1, len(digits) - MIN_PHONE_SUFFIX + 1)):
+        if digits[i:]:
+            tokens.add(digits[i:])
+
+    return {t[:254] for t in tokens}
+
+
+def index_clients(clients, created=False):
+    """
+    @brief Rebuild the search tokens of several clients.
+    @param clients iterable[Client] Saved clients (must have a pk).
+    @param created bool The clients were just inserted: there are no old tokens to delete.
+    @return None
+    """
+    clients = list(clients)
+    if not created:
+        ClientSearchToken.objects.filter(client__in=clients).delete()
+    ClientSearchToken.objects.bulk_create(
+        ClientSearchToken(client=c, token=token)
+        for c in clients
+        for token in client_tokens(c.name, c.email, c.phone)
+    )
+
+
+def index_client(client, created=False):
+    """@brief Rebuild the search tokens of one client. @return None"""
+    index_clients([client], created=created)
+
+
+def query_terms(q):
+    """
+    @brief Split a search box value into normalized prefix terms.
+    @details Email-looking terms are kept whole, phone-looking terms are
+             reduced to digits, anything else is split like names are.
+    @return list[str]
+    """
+    terms = []
+    for raw in q.lower().split():
+        if "@" in raw:
+            terms.append(raw)
+        elif PHONE_CHARS.sub("", raw).isdigit():
+            terms.append(re.sub(r"\D", "", raw))
+        else:
+            terms.extend(w for w in WORD_SPLIT.split(raw) if w)
+    return terms
+
+
+def filter_by_client(qs, q, field="client"):
+    """
+    @brief Narrow a queryset to rows whose client matches every term of `q`.
+    @param qs QuerySet Queryset with a FK (or pk, for Client itself) named `field`.
+    @param q str Raw search text.
+    @param field str Lookup path to the client id, e.g. "client" or "pk".
+    @return QuerySet
+    """
+    for term in query_terms(q):
+        matches = ClientSearchToken.objects.filter(
+            token__gte=term,
+            token__lt=term + TOKEN_END,
+        ).values("client_id")
+        qs = qs.filter(**{f"{field}__in": matches})
+    return qs
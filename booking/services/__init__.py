@@ -0,0 +1,38 @@
+# booking/services/__init__.py
+from .booking import (
+    BLOCKING_STATUSES,
+    DAY_INDEX,
+    BookingError,
+    SlotTaken,
+    aseries_intervals,
+    book_appointment,
+    claim_slot,
+    has_conflict,
+    immediate_transaction,
+    is_open_day,
+    lock_shop,
+    series_intervals,
+    upsert_client,
+    validate_booking,
+    write_transaction,
+)
+from .series import book_series
+
+__all__ = [
+    "BLOCKING_STATUSES",
+    "DAY_INDEX",
+    "BookingError",
+    "SlotTaken",
+    "aseries_intervals",
+    "book_appointment",
+    "book_series",
+    "claim_slot",
+    "has_conflict",
+    "immediate_transaction",
+    "is_open_day",
+    "lock_shop",
+    "series_intervals",
+    "upsert_client",
+    "validate_booking",
+    "write_transaction",
+]
@@ -0,0 +1,281 @@
+# booking/services/booking.py
+import random
+import time
+from contextlib import contextmanager
+
+from django.db import OperationalError, connection, transaction
+
+from ..models import Appointment, AppointmentSeries, Client, Shop, DAYS_OF_WEEK
+
+# bounded retry for "database is locked" under write bursts
+RETRY_ATTEMPTS = 6
+RETRY_BASE_DELAY = 0.02      # seconds, doubled each attempt (full jitter)
+
+# cancelled/completed appointments don't block a slot
+BLOCKING_STATUSES = ["Pending", "Confirmed"]
+
+# map codes (e.g. 'mon') → weekday ints (Mon=0 … Sun=6)
+DAY_INDEX = {code: idx for idx, (code, _) in enumerate(DAYS_OF_WEEK)}
+
+
+class BookingError(Exception):
+    """
+    @brief A booking request that can't be honoured.
+    @details `field` names the form field the message belongs to, or None for
+             a form-wide error.
+    """
+
+    def __init__(self, message, field=None):
+        super().__init__(message)
+        self.message = message
+        self.field = field
+
+
+class SlotTaken(BookingError):
+    """@brief The requested time overlaps a Pending/Confirmed appointment of the shop."""
+
+    def __init__(self, message="⚠ That time overlaps another booking, please pick another time.",
+                 field="start_time"):
+        super().__init__(message, field)
+
+
+def is_open_day(shop, day):
+    """
+    @brief Check whether `day` falls between the shop's opening and closing weekday.
+    @param shop Shop The shop whose opening_day/closing_day are used.
+    @param day datetime.date The calendar day to test.
+    @return bool True if the shop takes bookings on that weekday.
+    """
+    open_day = DAY_INDEX[shop.opening_day]
+    close_day = DAY_INDEX[shop.closing_day]
+    wd = day.weekday()
+
+    if open_day <= close_day:
+        return open_day <= wd <= close_day
+    # wraps around the weekend (e.g. fri → tue)
+    return wd >= open_day or wd <= close_day
+
+
+def validate_booking(shop, start_dt, duration=None):
+    """
+    @brief Opening-day and business-hours rules for a requested slot (no queries).
+    @param shop Shop The shop being booked.
+    @param start_dt datetime Requested start.
+    @param duration timedelta Requested length; the end-time checks are skipped when None.
+    @exception BookingError with the message shown to the customer.
+    """
+    if not is_open_day(shop, start_dt):
+        raise BookingError("⚠ The shop is closed on that day. Please pick another date.")
+
+    t = start_dt.time()
+    if t < shop.opening_hours or t > shop.closing_hours:
+        raise BookingError(
+            "⚠ The shop is closed at that time. Please pick a time between "
+            f"{shop.opening_hours:%H:%M} and {shop.closing_hours:%H:%M}."
+        )
+
+    if duration is not None:
+        end_dt = start_dt + duration
+        # keep appointment within business hours, on the same day
+        if end_dt.time() > shop.closing_hours or end_dt.date() != start_dt.date():
+            raise BookingError(
+                "⚠ Time must be within business hours "
+                f"({shop.opening_hours:%H:%M}–{shop.closing_hours:%H:%M})."
+            )
+
+
+@contextmanager
+def immediate_transaction():
+    """
+    @brief `transaction.atomic()` that takes the write lock when it starts.
+    @details On SQLite the outermost block begins with `BEGIN IMMEDIATE`
+             instead of the connection's (deferred) mode, so two writers
+             can't deadlock upgrading read locks. Nested blocks, and other
+             backends, are a plain `atomic()`.
+    """
+    if connection.vendor != "sqlite" or connection.in_atomic_block:
+        with transaction.atomic():
+            yield
+        return
+    connection.ensure_connection()
+    mode = connection.transaction_mode
+    connection.transaction_mode = "IMMEDIATE"
+    try:
+        with transaction.atomic():
+            connection.transaction_mode = mode
+            yield
+    finally:
+        connection.transaction_mode = mode
+
+
+def write_transaction(fn, attempts=RETRY_ATTEMPTS, base_delay=RETRY_BASE_DELAY):
+    """
+    @brief Run `fn()` in its own transaction, retrying lock timeouts.
+    @details
+      The transaction is an `immediate_transaction`, so on SQLite the write
+      lock is taken up front. A writer that still times out waiting is
+      retried with exponential backoff and full jitter. Inside an outer
+      atomic block nothing is retried, the error is raised to the owner of
+      that block.
+    @param fn callable Work to run; its return value is passed through.
+    @return Whatever `fn()` returns.
+    @exception OperationalError if the database is still locked after all attempts.
+    """
+    for attempt in range(attempts):
+        try:
+            with immediate_transaction():
+                return fn()
+        except OperationalError as exc:
+            if not _is_lock_error(exc) or connection.in_atomic_block or attempt == attempts - 1:
+                raise
+            time.sleep(random.uniform(0, base_delay * 2 ** attempt))
+
+
+def _is_lock_error(exc):
+    msg = str(exc).lower()
+    return "locked" in msg or "busy" in msg
+
+
+def _series_qs(shop, range_start, range_end):
+    return AppointmentSeries.objects.filter(
+        shop=shop,
+        status__in=BLOCKING_STATUSES,
+        start_time__lt=range_end,       # first visit before the window ends
+        last_end__gt=range_start,       # last visit ends after the window starts
+    )
+
+
+def series_intervals(shop, range_start, range_end):
+    """
+    @brief Occurrences of the shop's blocking series that touch a time range.
+    @details One query for the series whose span overlaps the range; only
+             the occurrences inside the range are expanded, in memory.
+    @return list[tuple[datetime, datetime]] (start, end) pairs sorted by start.
+    """
+    return sorted(
+        occ
+        for series in _series_qs(shop, range_start, range_end)
+        for occ in series.occurrences(range_start, range_end)
+    )
+
+
+async def aseries_intervals(shop, range_start, range_end):
+    """@brief Async `series_intervals` (async queryset iteration). @return list[tuple]"""
+    return sorted([
+        occ
+        async for series in _series_qs(shop, range_start, range_end)
+        for occ in series.occurrences(range_start, range_end)
+    ])
+
+
+def lock_shop(shop):
+    """
+    @brief Serialize bookings of one shop for the rest of the transaction.
+    @details `SELECT ... FOR UPDATE` on the shop row where the backend has
+             it; on SQLite the `immediate_transaction` (see
+             `write_transaction`) already holds the database write lock, so
+             no query is run.
+    """
+    if connection.features.has_select_for_update:
+        list(Shop.objects.select_for_update().filter(pk=shop.pk).values_list("pk", flat=True))
+
+
+def has_conflict(shop, start_dt, end_dt, exclude_pk=None):
+    """
+    @brief Does [start_dt, end_dt) overlap a blocking appointment or series occurrence?
+    @details One query for appointments; the series are only looked at
+             (one more query) when no appointment is in the way.
+    @param exclude_pk int Appointment to ignore (the one being re-confirmed).
+    @return bool
+    """
+    overlapping = Appointment.objects.filter(
+        shop=shop,
+        status__in=BLOCKING_STATUSES,
+        start_time__lt=end_dt,          # existing starts before new ends
+        end_time__gt=start_dt,          # existing ends after new starts
+    )
+    if exclude_pk is not None:
+        overlapping = overlapping.exclude(pk=exclude_pk)
+    return overlapping.exists() or bool(series_intervals(shop, start_dt, end_dt))
+
+
+def claim_slot(shop, start_dt, duration, create):
+    """
+    @brief Atomically check a slot for overlaps and, if free, create the booking.
+    @details
+      Claims for one shop are serialized (see `lock_shop`). The overlap
+      check, against appointments and recurring series alike, and
+      `create()` run under the lock, so two concurrent requests can't both
+      see the slot as free.
+    @param shop Shop Shop being booked.
+    @param start_dt datetime Aware start time.
+    @param duration timedelta Length of the booking.
+    @param create callable Called under the lock once the slot is free; returns the new Appointment.
+    @return Appointment The object returned by `create()`.
+    @exception SlotTaken if the slot overlaps a blocking appointment or series occurrence.
+    """
+    end_dt = start_dt + duration
+
+    def claim():
+        lock_shop(shop)
+        if has_conflict(shop, start_dt, end_dt):
+            raise SlotTaken()
+        return create()
+
+    return write_transaction(claim)
+
+
+def upsert_client(name, email, phone):
+    """
+    @brief Find the client by email (oldest record wins) or create it; keep name/phone current.
+    @return Client
+    """
+    client = Client.objects.filter(email=email).order_by("pk").first()
+    if client is None:
+        return Client.objects.create(name=name, email=email, phone=phone)
+    # keep name/phone in sync if returning client
+    if client.name != name or client.phone != phone:
+        client.name = name
+        client.phone = phone
+        client.save(update_fields=["name", "phone"])
+    return client
+
+
+def book_appointment(shop, client_data, start, duration, note="", status="Confirmed"):
+    """
+    @brief The one way to book: validate, check for conflicts and create in one transaction.
+    @details
+      Business rules are checked in memory first (no queries), then
+      `claim_slot` runs the overlap queries and the inserts under the
+      shop's booking lock. A booking by a returning client costs nine
+      queries on SQLite: overlap check (appointments, then series), client
+      lookup, appointment insert, and what the insert writes in the same
+      transaction (confirmation job, dashboard event, shop version bump,
+      daily rollup row + increment). A new client adds its insert and
+      search tokens (+2); one whose name or phone changed adds the update,
+      the token rebuild and a version bump of the shops they booked (+4).
+      With the shop lookup of a cold cache, that last case is the booking
+      views' `query_budget` (14).
+    @param shop Shop Shop being booked.
+    @param client_data dict `name`, `email` and `phone` of the customer.
+    @param start datetime Aware start time.
+    @param duration timedelta Length of the booking.
+    @param note str Free-text note from the customer.
+    @param status str Initial status (public bookings are "Confirmed").
+    @return Appointment
+    @exception BookingError if the shop is closed then; SlotTaken if the slot is taken.
+    """
+    validate_booking(shop, start, duration)
+
+    def create():
+        client = upsert_client(client_data["name"], client_data["email"], client_data["phone"])
+        return Appointment.objects.create(
+            client=client,
+            shop=shop,
+            start_time=start,
+            duration=duration,
+            note=note,
+            status=status,
+        )
+
+    return claim_slot(shop, start, duration, create)
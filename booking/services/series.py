@@ -0,0 +1,85 @@
+# booking/services/series.py
+from ..models import Appointment, AppointmentSeries
+from ..recurrence import first_overlap, last_index, nth_start
+from .booking import (
+    BLOCKING_STATUSES,
+    BookingError,
+    SlotTaken,
+    lock_shop,
+    series_intervals,
+    upsert_client,
+    validate_booking,
+    write_transaction,
+)
+
+
+def book_series(shop, client_data, start, duration, frequency, count=None, until=None, note=""):
+    """
+    @brief Book a recurring series: validate every visit, check them all for conflicts at once, store one row.
+    @details
+      The visits are expanded in memory and checked against the business
+      hours (no queries). Under the shop's booking lock two queries load
+      everything that blocks the series' whole span - appointments and the
+      other series' occurrences - and one sweep finds the first clash, so
+      a year of weekly visits costs the same two reads as a single one.
+    @param shop Shop Shop being booked.
+    @param client_data dict `name`, `email` and `phone` of the customer.
+    @param start datetime Aware start of the first visit.
+    @param duration timedelta Length of each visit.
+    @param frequency str `recurrence.WEEKLY`, `BIWEEKLY` or `MONTHLY`.
+    @param count int Number of visits (optional if `until` is given).
+    @param until datetime.date Last possible day of a visit (optional if `count` is given).
+    @param note str Free-text note.
+    @return AppointmentSeries
+    @exception BookingError if the rule is empty or a visit falls outside business hours;
+               SlotTaken naming the first visit that overlaps another booking.
+    """
+    if not count and until is None:
+        raise BookingError("⚠ Give the series a number of visits or an end date.", field="count")
+    last = last_index(start, frequency, count, until)
+    if last < 0:
+        raise BookingError("⚠ The end date is before the first visit.", field="until")
+
+    visits = [(s, s + duration) for s in (nth_start(start, frequency, n) for n in range(last + 1))]
+    for visit_start, _ in visits:
+        try:
+            validate_booking(shop, visit_start, duration)
+        except BookingError as exc:
+            raise BookingError(f"{exc.message} (visit on {visit_start:%a %d %b %Y})") from None
+
+    span_start, span_end = visits[0][0], visits[-1][1]
+
+    def claim():
+        lock_shop(shop)
+        busy = sorted(
+            list(
+                Appointment.objects
+                .filter(
+                    shop=shop,
+                    status__in=BLOCKING_STATUSES,
+                    start_time__lt=span_end,
+                    end_time__gt=span_start,
+                )
+                .values_list("start_time", "end_time")
+            )
+            + series_intervals(shop, span_start, span_end)
+        )
+        clash = first_overlap(visits, busy)
+        if clash:
+            raise SlotTaken(
+                f"⚠ The visit on {clash[0]:%a %d %b %Y, %H:%M} overlaps another booking, "
+                "please pick another time."
+            )
+        client = upsert_client(client_data["name"], client_data["email"], client_data["phone"])
+        return AppointmentSeries.objects.create(
+            client=client,
+            shop=shop,
+            start_time=start,
+            duration=duration,
+            frequency=frequency,
+            count=count,
+            until=until,
+            note=note,
+        )
+
+    return write_transaction(claim)
@@ -0,0 +1,89 @@
+# booking/shop_cache.py
+from django.core.cache import cache
+from django.http import Http404
+
+from .models import Shop
+
+# shops barely change and every write invalidates, so this is just a safety net
+SHOP_CACHE_TIMEOUT = 60 * 60
+
+
+def _pk_key(pk):
+    return f"booking:shop:pk:{pk}"
+
+
+def _slug_key(slug):
+    return f"booking:shop:slug:{slug}"
+
+
+def _remember(shop):
+    cache.set_many({_pk_key(shop.pk): shop, _slug_key(shop.slug): shop.pk}, SHOP_CACHE_TIMEOUT)
+
+
+def get_shop(pk):
+    """
+    @brief Read-through cached `Shop` lookup by primary key.
+    @param pk int Shop id.
+    @return Shop
+    @exception Http404 if no such shop exists.
+    """
+    shop = cache.get(_pk_key(pk))
+    if shop is None:
+        try:
+            shop = Shop.objects.get(pk=pk)
+        except Shop.DoesNotExist:
+            raise Http404("No Shop matches the given query.")
+        _remember(shop)
+    return shop
+
+
+def get_shop_by_slug(slug):
+    """
+    @brief Read-through cached `Shop` lookup by public slug (the booking page URL).
+    @details The slug key only stores the pk, so a renamed slug can never
+             serve a stale record: the cached shop must still carry that slug.
+    @param slug str Shop slug.
+    @return Shop
+    @exception Http404 if no such shop exists.
+    """
+    pk = cache.get(_slug_key(slug))
+    if pk is not None:
+        shop = cache.get(_pk_key(pk))
+        if shop is not None and shop.slug == slug:
+            return shop
+
+    try:
+        shop = Shop.objects.get(slug=slug)
+    except Shop.DoesNotExist:
+        raise Http404("No Shop matches the given query.")
+    _remember(shop)
+    return shop
+
+
+async def aget_shop_by_slug(slug):
+    """
+    @brief Async twin of `get_shop_by_slug` for ASGI views (async cache + `aget`).
+    @param slug str Shop slug.
+    @return Shop
+    @exception Http404 if no such shop exists.
+    """
+    pk = await cache.aget(_slug_key(slug))
+    if pk is not None:
+        shop = await cache.aget(_pk_key(pk))
+        if shop is not None and shop.slug == slug:
+            return shop
+
+    try:
+        shop = await Shop.objects.aget(slug=slug)
+    except Shop.DoesNotExist:
+        raise Http404("No Shop matches the given query.")
+    await cache.aset_many({_pk_key(shop.pk): shop, _slug_key(shop.slug): shop.pk}, SHOP_CACHE_TIMEOUT)
+    return shop
+
+
+def invalidate_shop(shop):
+    """
+    @brief Drop a shop's cached record (called from the Shop save/delete signals).
+    @return None
+    """
+    cache.delete_many([_pk_key(shop.pk), _slug_key(shop.slug)])
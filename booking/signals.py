@@ -0,0 +1,106 @@
+# booking/signals.py
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import instrumentation, rollups, versions
+from .events import publish
+from .models import Appointment, AppointmentSeries, Client, Shop, ShopEvent
+from .notifications import notify_created
+from .search import index_client
+from .shop_cache import invalidate_shop
+
+
+@receiver(post_save, sender=Client)
+def reindex_client(sender, instance, created, raw=False, **kwargs):
+    """@brief Keep the client search index in sync with every Client write."""
+    if raw:                                 # loaddata: tokens come from the fixture
+        return
+    index_client(instance, created=created)
+
+
+@receiver(post_save, sender=Client)
+def bump_client_shops(sender, instance, created, raw=False, **kwargs):
+    """@brief A renamed client changes the lists (and ETags) of every shop they booked."""
+    if not created and not raw:
+        versions.bump_for_client(instance.pk)
+
+
+@receiver(post_save, sender=Appointment)
+def queue_booking_emails(sender, instance, created, raw=False, **kwargs):
+    """@brief New bookings queue their confirmation emails in the same transaction."""
+    if created and not raw:
+        notify_created(instance)
+
+
+@receiver(post_save, sender=Appointment)
+def publish_new_appointment(sender, instance, created, raw=False, **kwargs):
+    """@brief Open dashboards of the shop get the new booking once it commits."""
+    if created and not raw:
+        publish(instance, ShopEvent.CREATED)
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_save, sender=AppointmentSeries)
+@receiver(post_delete, sender=AppointmentSeries)
+def bump_shop_version(sender, instance, raw=False, **kwargs):
+    """@brief Every booking write invalidates the shop's ETags (same transaction)."""
+    if not raw:
+        versions.bump(instance.shop_id)
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_rollup_key(sender, instance, raw=False, **kwargs):
+    """@brief An edited appointment is counted out of the rollup row it is stored in now."""
+    if not raw and not instance._state.adding:
+        instance._rollup_key = rollups.stored_key(instance.pk)
+
+
+@receiver(post_save, sender=Appointment)
+def update_rollups(sender, instance, created, raw=False, **kwargs):
+    """@brief Keep the daily rollups in step with every appointment save (same transaction)."""
+    if not raw:
+        rollups.moved(getattr(instance, "_rollup_key", None), rollups.key_of(instance))
+
+
+@receiver(post_delete, sender=Appointment)
+def drop_from_rollups(sender, instance, **kwargs):
+    """@brief A deleted appointment no longer counts (archival keeps its rollups: no signal)."""
+    rollups.moved(rollups.key_of(instance), None)
+
+
+@receiver(post_save, sender=Shop)
+@receiver(post_delete, sender=Shop)
+def forget_shop(sender, instance, **kwargs):
+    """@brief Settings edits must show up on the booking page immediately."""
+    invalidate_shop(instance)
+
+
+@receiver(post_save, sender=Shop)
+def version_shop(sender, instance, created, raw=False, **kwargs):
+    """@brief New shops start a change counter; settings edits bump it."""
+    if created:
+        versions.create(instance.pk)
+    elif not raw:
+        versions.bump(instance.pk)
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    """
+    @brief Apply `settings.SQLITE_PRAGMAS` (WAL, mmap, cache size, ...) to a new SQLite connection.
+    @details Runs on the raw DB-API connection so the pragmas never show up in
+             query logs or `assertNumQueries` counts.
+    """
+    if connection.vendor != "sqlite":
+        return
+    for name, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+        connection.connection.execute(f"PRAGMA {name} = {value}")
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """@brief Count and time this connection's queries for `RequestMetricsMiddleware`."""
+    instrumentation.install(connection)
@@ -1,29 +1,202 @@
+(() => {
+  // load the next page of rows when the "load more" sentinel scrolls into view
+  const observeLoadMore = (() => {
+    const observer = "IntersectionObserver" in window
+      ? new IntersectionObserver(entries => {
+          entries.forEach(entry => {
+            if (!entry.isIntersecting) return;
+            observer.unobserve(entry.target);
+            loadMore(entry.target);
+          });
+        }, { rootMargin: "200px" })
+      : null;
 
+    const loadMore = sentinel => {
+      fetch(sentinel.dataset.nextUrl, { headers: { "X-Requested-With": "XMLHttpRequest" } })
+        .then(r => r.text())
+        .then(html => {
+          const tmp = document.createElement("div");
+          tmp.innerHTML = html;
+          sentinel.replaceWith(...tmp.childNodes);  // rows + the next sentinel
+          observeLoadMore();
+        })
+        .catch(err => console.error("load-more error", err));
+    };
+
+    return () => {
+      if (!observer) return;                 // old browsers keep the plain link
+      document.querySelectorAll(".load-more").forEach(el => observer.observe(el));
+    };
+  })();
+
+  // set by startLiveFeed: fetch the latest events now; false when the feed
+  // can't deliver them (no feed, or a stream that never opened)
+  let refreshFeed = () => false;
 
-// live update when typing in search bar
-document.addEventListener("DOMContentLoaded", () => {
-  const input  = document.getElementById("searchInput");
-  if (!input) return;                    // stops here if not found
+  // live feed: created/status events come with the rendered row, which is
+  // patched into the list in place (no refetch of the filtered list). They are
+  // pushed over SSE under ASGI, polled as JSON otherwise.
+  const startLiveFeed = () => {
+    const feed = document.getElementById("appointmentsFeed");
+    if (!feed) return;
+    const stream = feed.dataset.eventsUrl && "EventSource" in window;
+    if (!stream && !feed.dataset.pollUrl) return;
 
-  const getList = () => document.getElementById("appointmentsList");
-  let timer;
+    const params = new URL(window.location.href).searchParams;
+    const sort   = params.get("sort") || "date_desc";
+    const status = (params.get("status") || "").toLowerCase();
+    const range  = params.get("range") || "all";
+    const total  = document.getElementById("appointmentsTotal");
 
-  input.addEventListener("input", () => {
-    clearTimeout(timer);
-    timer = setTimeout(() => {
-      const url = new URL(window.location.href);
-      url.searchParams.set("q", input.value);
+    const toNodes = html => {
+      const tmp = document.createElement("div");
+      tmp.innerHTML = html;
+      return [...tmp.childNodes];
+    };
 
+    // where a new row goes in the loaded page; null = not on this page
+    const insertionPoint = (list, start) => {
+      const rows = [...list.querySelectorAll(".appointment-item")];
+      if (sort !== "date_asc" && sort !== "date_desc") return rows[0] || list;
+      const t = Date.parse(start);
+      const next = rows.find(r => sort === "date_asc" ? Date.parse(r.dataset.start) > t
+                                                      : Date.parse(r.dataset.start) < t);
+      if (next) return next;
+      // past the last loaded row: "load more" brings it if there is a next page
+      return list.querySelector(".load-more") ? null : list;
+    };
+
+    const apply = (kind, data) => {
+      const row   = document.querySelector(`.appointment-item[data-id="${data.id}"]`);
+      const shown = !status || data.status.toLowerCase() === status;
+
+      if (row) {
+        document.querySelectorAll(`#viewModal${data.id}, #deleteModal${data.id}`).forEach(m => m.remove());
+        if (shown) row.replaceWith(...toNodes(data.html));
+        else row.remove();
+        return;
+      }
+      // a search or date range can't be matched here: those lists wait for a reload
+      const search = document.getElementById("searchInput");
+      if (kind !== "created" || !shown || range !== "all" || (search && search.value)) return;
+
+      let list = document.getElementById("appointmentsList");
+      if (!list) {                           // was the empty state
+        feed.innerHTML = '<div id="appointmentsList" class="appointments-list"></div>';
+        list = document.getElementById("appointmentsList");
+      }
+      const at = insertionPoint(list, data.start);
+      if (!at) return;
+      if (at === list) list.append(...toNodes(data.html));
+      else at.before(...toNodes(data.html));
+      if (total) total.textContent = Number(total.textContent) + 1;
+    };
+
+    if (stream) {
+      // EventSource reconnects by itself and resends Last-Event-ID
+      const source = new EventSource(feed.dataset.eventsUrl);
+      const push = event => apply(event.type, JSON.parse(event.data));
+      source.addEventListener("created", push);
+      source.addEventListener("status", push);
+      // the events arrive on their own, once the stream is actually open
+      refreshFeed = () => source.readyState === EventSource.OPEN;
+      return;
+    }
+
+    const url   = new URL(feed.dataset.pollUrl, window.location.href);
+    const every = 1000 * Number(feed.dataset.pollSeconds || 10);
+    let timer = null, busy = false, again = false;
+    const poll  = () => {
+      clearTimeout(timer);
+      if (busy) { again = true; return; }   // one request at a time; ask again when it's back
+      busy = true;
       fetch(url, { headers: { "X-Requested-With": "XMLHttpRequest" } })
-        .then(r => r.text())
-        .then(html => {
-          const tmp = document.createElement("div");
-          tmp.innerHTML = html;
-          const fresh = tmp.querySelector("#appointmentsList");
-          const old   = getList();
-          if (fresh && old) old.replaceWith(fresh);
+        .then(r => r.json())
+        .then(data => {
+          data.events.forEach(e => apply(e.kind, e.data));
+          url.searchParams.set("since", data.last);
+          return data.more;
         })
-        .catch(err => console.error("live-search error", err));
-    }, 300);
+        .catch(err => { console.error("live feed error", err); return false; })
+        .then(more => {
+          busy = false;
+          timer = setTimeout(poll, more || again ? 0 : every);
+          again = false;
+        });
+    };
+    timer = setTimeout(poll, every);
+    refreshFeed = () => { poll(); return true; };
+  };
+
+  // bulk status changes: one POST for all selected rows; the rows themselves
+  // are patched by the live feed's status events (or a reload when it can't)
+  const startBulkActions = () => {
+    const form = document.getElementById("bulkForm");
+    if (!form) return;
+    const count  = document.getElementById("bulkCount");
+    const result = document.getElementById("bulkResult");
+    const selected = () => [...document.querySelectorAll(".bulk-select:checked")];
+
+    const refresh = () => {
+      const n = selected().length;
+      count.textContent = n;
+      form.querySelectorAll(".bulk-action").forEach(btn => { btn.disabled = n === 0; });
+    };
+    document.addEventListener("change", event => {
+      if (event.target.classList.contains("bulk-select")) refresh();
+    });
+
+    form.addEventListener("submit", event => {
+      event.preventDefault();
+      const body = new FormData(form);        // includes the checked rows (form="bulkForm")
+      if (event.submitter) body.append(event.submitter.name, event.submitter.value);
+
+      fetch(form.action, { method: "POST", body, headers: { "X-Requested-With": "XMLHttpRequest" } })
+        .then(r => r.json())
+        .then(data => {
+          if (data.error) { result.textContent = data.error; return; }
+          const skipped = data.results.filter(r => r.message);
+          result.textContent = `${data.updated} marked ${data.status.toLowerCase()}` +
+            (skipped.length ? ` · ${skipped.length} skipped: ${skipped[0].message}` : "");
+          selected().forEach(box => { box.checked = false; });
+          refresh();
+          if (data.updated && !refreshFeed()) window.location.reload();
+        })
+        .catch(err => console.error("bulk status error", err));
+    });
+  };
+
+  // live update when typing in search bar
+  document.addEventListener("DOMContentLoaded", () => {
+    observeLoadMore();
+    startLiveFeed();
+    startBulkActions();
+
+    const input  = document.getElementById("searchInput");
+    if (!input) return;                    // stops here if not found
+
+    const getList = () => document.getElementById("appointmentsList");
+    let timer;
+
+    input.addEventListener("input", () => {
+      clearTimeout(timer);
+      timer = setTimeout(() => {
+        const url = new URL(window.location.href);
+        url.searchParams.set("q", input.value);
+        url.searchParams.delete("cursor");
+
+        fetch(url, { headers: { "X-Requested-With": "XMLHttpRequest" } })
+          .then(r => r.text())
+          .then(html => {
+            const tmp = document.createElement("div");
+            tmp.innerHTML = html;
+            const fresh = tmp.querySelector("#appointmentsList");
+            const old   = getList();
+            if (fresh && old) old.replaceWith(fresh);
+            observeLoadMore();
+          })
+          .catch(err => console.error("live-search error", err));
+      }, 300);
+    });
   });
-});
\ No newline at end of file
+})();
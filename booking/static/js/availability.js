@@ -0,0 +1,49 @@
+// show free slots on the booking page, click one to fill the start time
+document.addEventListener("DOMContentLoaded", () => {
+  const picker = document.getElementById("slotPicker");
+  if (!picker) return;                   // stops here if not found
+
+  const startInput    = document.getElementById("id_start_time");
+  const durationInput = document.getElementById("id_duration");
+  const list          = picker.querySelector(".slot-days");
+  let days = [];
+
+  const render = () => {
+    const minutes = durationInput ? durationInput.value : "30";
+    list.innerHTML = "";
+
+    const open = days.filter(d => (d.slots[minutes] || []).length);
+    if (!open.length) {
+      list.textContent = "No free times in the next days, please try another duration.";
+      return;
+    }
+
+    open.forEach(d => {
+      const row = document.createElement("div");
+      row.className = "mb-2";
+      const label = document.createElement("div");
+      label.className = "fw-bold";
+      label.textContent = d.date;
+      row.appendChild(label);
+
+      d.slots[minutes].forEach(time => {
+        const btn = document.createElement("button");
+        btn.type = "button";
+        btn.className = "btn btn-outline-primary btn-sm me-1 mb-1";
+        btn.textContent = time;
+        btn.addEventListener("click", () => {
+          if (startInput) startInput.value = `${d.date}T${time}`;
+        });
+        row.appendChild(btn);
+      });
+      list.appendChild(row);
+    });
+  };
+
+  fetch(picker.dataset.url)
+    .then(r => r.json())
+    .then(data => { days = data.days; render(); })
+    .catch(err => console.error("availability error", err));
+
+  if (durationInput) durationInput.addEventListener("change", render);
+});
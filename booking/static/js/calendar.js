@@ -0,0 +1,152 @@
+// Shop calendar: day/week/month grid drawn from week windows of calendar-data.
+// Every week is fetched once and then only revalidated (If-None-Match → 304).
+(() => {
+  const root = document.getElementById("calendar");
+  if (!root) return;
+
+  const weeks = new Map();                 // "YYYY-MM-DD" of the Monday → { etag, rows }
+  const pad = n => String(n).padStart(2, "0");
+  const iso = d => `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())}`;
+  const addDays = (d, n) => new Date(d.getFullYear(), d.getMonth(), d.getDate() + n);
+  const monday = d => addDays(d, -((d.getDay() + 6) % 7));
+  const parseDay = s => new Date(+s.slice(0, 4), +s.slice(5, 7) - 1, +s.slice(8, 10));
+  // the shop's wall clock, as sent by the server (ignore the browser's time zone)
+  const wall = s => new Date(+s.slice(0, 4), +s.slice(5, 7) - 1, +s.slice(8, 10), +s.slice(11, 13), +s.slice(14, 16));
+  const minutesOf = hhmm => +hhmm.slice(0, 2) * 60 + +hhmm.slice(3, 5);
+  const escape = s => s.replace(/[&<>"']/g, c => `&#${c.charCodeAt(0)};`);
+
+  const STATUS_CLASS = { Confirmed: "bg-success", Pending: "bg-warning", Completed: "bg-info", Cancelled: "bg-danger" };
+
+  let view = "week";
+  let anchor = parseDay(root.dataset.today);
+
+  const toEvents = data => {
+    const idx = Object.fromEntries(data.fields.map((f, i) => [f, i]));
+    const read = series => row => {
+      const start = wall(row[idx.start]);
+      return {
+        id: row[idx.id], start, end: new Date(start.getTime() + row[idx.minutes] * 60000),
+        status: row[idx.status], client: row[idx.client], series,
+      };
+    };
+    return [...data.appointments.map(read(false)), ...data.series.map(read(true))];
+  };
+
+  const fetchWeek = async start => {
+    const key = iso(start);
+    const cached = weeks.get(key);
+    const resp = await fetch(`${root.dataset.url}?start=${key}&days=7`, {
+      headers: cached ? { "If-None-Match": cached.etag } : {},
+      cache: "no-store",                   // the ETag is handled here, not by the HTTP cache
+    });
+    if (resp.status === 304 && cached) return cached.rows;
+    if (!resp.ok) throw new Error(`calendar window ${key}: ${resp.status}`);
+    const rows = toEvents(await resp.json());
+    weeks.set(key, { etag: resp.headers.get("ETag"), rows });
+    return rows;
+  };
+
+  // visible days for the current view (always whole weeks are fetched)
+  const visibleRange = () => {
+    if (view === "day") return [anchor, addDays(anchor, 1)];
+    if (view === "week") return [monday(anchor), addDays(monday(anchor), 7)];
+    const first = new Date(anchor.getFullYear(), anchor.getMonth(), 1);
+    const next = new Date(anchor.getFullYear(), anchor.getMonth() + 1, 1);
+    return [monday(first), addDays(monday(addDays(next, -1)), 7)];
+  };
+
+  const chip = ev => `
+    <div class="calendar-chip ${STATUS_CLASS[ev.status] || "bg-secondary"}${ev.series ? " calendar-series" : ""}"
+         title="${escape(ev.client)} – ${ev.status}">
+      ${pad(ev.start.getHours())}:${pad(ev.start.getMinutes())} ${escape(ev.client)}
+    </div>`;
+
+  const drawMonth = (from, to, events) => {
+    const cells = [];
+    for (let d = from; d < to; d = addDays(d, 1)) {
+      const today = iso(d) === root.dataset.today ? " calendar-today" : "";
+      const other = d.getMonth() !== anchor.getMonth() ? " calendar-other" : "";
+      const mine = events.filter(ev => iso(ev.start) === iso(d));
+      cells.push(`<div class="calendar-cell${today}${other}">
+        <div class="calendar-date">${d.getDate()}</div>${mine.map(chip).join("")}</div>`);
+    }
+    root.innerHTML = `<div class="calendar-month">${cells.join("")}</div>`;
+  };
+
+  const drawDays = (from, to, events) => {
+    // hour rows span the opening hours, stretched to fit anything booked outside them
+    let open = minutesOf(root.dataset.open), close = minutesOf(root.dataset.close);
+    if (close <= open) { open = 0; close = 24 * 60; }
+    events.forEach(ev => {
+      open = Math.min(open, ev.start.getHours() * 60);
+      close = Math.max(close, Math.min(24 * 60, ev.end.getHours() * 60 + ev.end.getMinutes()));
+    });
+    open -= open % 60;
+    const span = close - open;
+
+    const hours = [];
+    for (let m = open; m < close; m += 60) hours.push(`<div class="calendar-hour">${pad(m / 60)}:00</div>`);
+
+    const columns = [];
+    for (let d = from; d < to; d = addDays(d, 1)) {
+      const blocks = events.filter(ev => iso(ev.start) === iso(d)).map(ev => {
+        const top = (ev.start.getHours() * 60 + ev.start.getMinutes() - open) / span * 100;
+        const height = (ev.end - ev.start) / 60000 / span * 100;
+        return `<div class="calendar-event" style="top:${top}%;height:${height}%">${chip(ev)}</div>`;
+      });
+      const today = iso(d) === root.dataset.today ? " calendar-today" : "";
+      columns.push(`<div class="calendar-day${today}">
+        <div class="calendar-day-head">${d.toLocaleDateString(undefined, { weekday: "short", day: "numeric", month: "short" })}</div>
+        <div class="calendar-day-body" style="height:${span / 60 * 3}rem">${blocks.join("")}</div>
+      </div>`);
+    }
+    root.innerHTML = `<div class="calendar-days">
+      <div class="calendar-hours"><div class="calendar-day-head"></div>${hours.join("")}</div>
+      ${columns.join("")}</div>`;
+  };
+
+  const title = (from, to) => {
+    if (view === "month") return anchor.toLocaleDateString(undefined, { month: "long", year: "numeric" });
+    if (view === "day") return anchor.toLocaleDateString(undefined, { weekday: "long", day: "numeric", month: "long", year: "numeric" });
+    return `${from.toLocaleDateString(undefined, { day: "numeric", month: "short" })} – ${addDays(to, -1).toLocaleDateString(undefined, { day: "numeric", month: "short", year: "numeric" })}`;
+  };
+
+  const draw = async () => {
+    const [from, to] = visibleRange();
+    document.getElementById("calendarTitle").textContent = title(from, to);
+    const starts = [];
+    for (let w = monday(from); w < to; w = addDays(w, 7)) starts.push(w);
+    try {
+      const events = (await Promise.all(starts.map(fetchWeek))).flat()
+        .filter(ev => ev.start < to && ev.end > from)
+        .sort((a, b) => a.start - b.start);
+      if (view === "month") drawMonth(from, to, events);
+      else drawDays(from, to, events);
+    } catch (err) {
+      console.error("calendar error", err);
+    }
+  };
+
+  const step = dir => {
+    if (view === "day") anchor = addDays(anchor, dir);
+    else if (view === "week") anchor = addDays(anchor, 7 * dir);
+    else anchor = new Date(anchor.getFullYear(), anchor.getMonth() + dir, 1);
+    draw();
+  };
+
+  document.getElementById("calendarPrev").addEventListener("click", () => step(-1));
+  document.getElementById("calendarNext").addEventListener("click", () => step(1));
+  document.getElementById("calendarToday").addEventListener("click", () => {
+    anchor = parseDay(root.dataset.today);
+    draw();
+  });
+  document.querySelectorAll("#calendarViews [data-view]").forEach(btn => {
+    btn.addEventListener("click", () => {
+      document.querySelectorAll("#calendarViews [data-view]").forEach(b => b.classList.toggle("active", b === btn));
+      view = btn.dataset.view;
+      draw();
+    });
+  });
+
+  draw();
+})();
@@ -0,0 +1,160 @@
+# booking/statuses.py
+from collections import Counter
+
+from django.db.models import F
+from django.utils import timezone
+
+from . import events, rollups, versions
+from .models import Appointment, ShopEvent
+from .notifications import notify_status_changes
+from .recurrence import first_overlap
+from .services import BLOCKING_STATUSES, lock_shop, series_intervals, write_transaction
+
+# status → statuses the dashboard may move it to
+ALLOWED_TRANSITIONS = {
+    "Pending":   {"Confirmed", "Cancelled", "Completed"},
+    "Confirmed": {"Completed", "Cancelled"},
+    "Cancelled": {"Confirmed"},
+    "Completed": {"Confirmed"},          # undo a mistaken "Mark Completed"
+}
+STATUSES = sorted(ALLOWED_TRANSITIONS)
+# ids accepted by one bulk request (keeps the `IN (...)` list within SQLite's variable limit)
+MAX_BATCH = 500
+
+# per-item results of `update_statuses`
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+NOT_FOUND = "not_found"
+NOT_ALLOWED = "not_allowed"
+CONFLICT = "conflict"
+
+
+def update_statuses(shop, pks, status):
+    """
+    @brief Move many appointments of a shop to one status in a single `UPDATE`.
+    @details
+      One transaction: a read of the requested rows, the overlap check for
+      the ones coming back to a blocking status (one query for the
+      appointments in their span, one for the series), then
+      `UPDATE ... WHERE shop = ... AND pk IN (...)` for the rows that pass.
+      `update()` sends no signals, so the status emails, dashboard events
+      and rollup counts are written here in bulk and the shop's version
+      bumped once.
+    @param shop Shop The logged-in owner's shop; other shops' ids are `not_found`.
+    @param pks iterable[int] Appointment ids, in the order results are wanted.
+    @param status str Target status (a key of `ALLOWED_TRANSITIONS`).
+    @return list[dict] One `{"id", "result", "status"}` per distinct id, plus
+            `"message"` when it wasn't updated.
+    @exception ValueError if `status` is unknown.
+    """
+    if status not in ALLOWED_TRANSITIONS:
+        raise ValueError(f"unknown status {status!r}")
+    pks = list(dict.fromkeys(int(pk) for pk in pks))
+    return write_transaction(lambda: _update(shop, pks, status))
+
+
+def complete_past(shop, now=None):
+    """
+    @brief Mark every confirmed appointment of a shop that has ended as Completed.
+    @details The end-of-day close-out as one server-side operation: the ids
+             are read and updated in the same transaction.
+    @return list[dict] Per-item results, as `update_statuses`.
+    """
+    now = now or timezone.now()
+
+    def run():
+        pks = list(
+            Appointment.objects
+            .filter(shop=shop, status="Confirmed", end_time__lte=now)
+            .order_by("start_time", "pk")
+            .values_list("pk", flat=True)
+        )
+        return _update(shop, pks, "Completed")
+
+    return write_transaction(run)
+
+
+def _update(shop, pks, status):
+    if not pks:
+        return []
+    lock_shop(shop)
+    rows = {
+        pk: (current, start, end, version)
+        for pk, current, start, end, version in Appointment.objects
+        .filter(shop=shop, pk__in=pks)
+        .values_list("pk", "status", "start_time", "end_time", "version")
+    }
+
+    results = {}
+    reinstated = []
+    for pk in pks:
+        if pk not in rows:
+            results[pk] = {"id": pk, "result": NOT_FOUND, "message": "Appointment not found."}
+            continue
+        current = rows[pk][0]
+        if current == status:
+            results[pk] = {"id": pk, "result": UNCHANGED, "status": current}
+        elif status not in ALLOWED_TRANSITIONS.get(current, ()):
+            results[pk] = {
+                "id": pk, "result": NOT_ALLOWED, "status": current,
+                "message": f"A {current.lower()} appointment can't be marked {status.lower()}.",
+            }
+        elif status in BLOCKING_STATUSES and current not in BLOCKING_STATUSES:
+            reinstated.append(pk)
+        else:
+            results[pk] = {"id": pk, "result": UPDATED, "status": status}
+
+    for pk in _clashing(shop, reinstated, rows):
+        results[pk] = {
+            "id": pk, "result": CONFLICT, "status": rows[pk][0],
+            "message": "That slot has been taken in the meantime.",
+        }
+    for pk in reinstated:
+        results.setdefault(pk, {"id": pk, "result": UPDATED, "status": status})
+
+    changed = [pk for pk in pks if results[pk]["result"] == UPDATED]
+    if changed:
+        Appointment.objects.filter(shop=shop, pk__in=changed).update(status=status, version=F("version") + 1)
+        notify_status_changes([(pk, rows[pk][0], rows[pk][3] + 1) for pk in changed], status)
+        deltas = Counter()
+        for pk in changed:
+            previous, start, end, _ = rows[pk]
+            deltas[rollups.key(shop.pk, start, previous, end - start)] -= 1
+            deltas[rollups.key(shop.pk, start, status, end - start)] += 1
+        rollups.apply(deltas)
+        events.publish_many(shop.pk, changed, ShopEvent.STATUS)
+        versions.bump(shop.pk)
+    return [results[pk] for pk in pks]
+
+
+def _clashing(shop, pks, rows):
+    """
+    @brief Which of the appointments coming back to a blocking status would overlap another booking?
+    @details They're checked against the blocking appointments and series
+             occurrences in their overall span, and against each other
+             (earlier ones win).
+    @return set[int]
+    """
+    if not pks:
+        return set()
+    candidates = sorted((rows[pk][1], rows[pk][2], pk) for pk in pks)
+    span_start = candidates[0][0]
+    span_end = max(end for _, end, _ in candidates)
+    busy = sorted(
+        list(
+            Appointment.objects
+            .filter(shop=shop, status__in=BLOCKING_STATUSES, start_time__lt=span_end, end_time__gt=span_start)
+            .exclude(pk__in=pks)
+            .values_list("start_time", "end_time")
+        )
+        + series_intervals(shop, span_start, span_end)
+    )
+
+    clashing = set()
+    reach = None                                # latest end among the ones let through
+    for start, end, pk in candidates:
+        if first_overlap([(start, end)], busy) or (reach is not None and reach > start):
+            clashing.add(pk)
+        else:
+            reach = end if reach is None else max(reach, end)
+    return clashing
@@ -0,0 +1,11 @@
+from django import template
+
+from booking.fragments import render_rows
+
+
+register = template.Library()
+
+@register.simple_tag(takes_context=True)
+def appointment_rows(context, appointments):
+    """@brief `{% appointment_rows appointments %}`: the cached dashboard rows (see `booking.fragments`)."""
+    return render_rows(appointments, context.get("csrf_token", ""))
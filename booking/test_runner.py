@@ -0,0 +1,23 @@
+# booking/test_runner.py
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class BudgetRunner(DiscoverRunner):
+    """
+    @brief `manage.py test` runner that turns query budget overruns into failures.
+    @details Live deployments keep `QUERY_BUDGET_MODE` "log" (the default);
+             under the test runner an overrun raises `QueryBudgetExceeded`
+             in the test that made the request. Set `TEST_RUNNER` to it.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        """@brief Switch budgets to "raise" for the run (restored on teardown)."""
+        super().setup_test_environment(**kwargs)
+        self._budget_mode = getattr(settings, "QUERY_BUDGET_MODE", "log")
+        settings.QUERY_BUDGET_MODE = "raise"
+
+    def teardown_test_environment(self, **kwargs):
+        """@brief Put the configured budget mode back."""
+        settings.QUERY_BUDGET_MODE = self._budget_mode
+        super().teardown_test_environment(**kwargs)
@@ -1,10 +1,12 @@
 import datetime
 
-from django.test import TestCase, Client as DjangoClient
+from asgiref.sync import sync_to_async
+from django.test import TestCase, TransactionTestCase, Client as DjangoClient, override_settings
+from django.utils import timezone
 from django.urls import reverse
 from django.contrib.auth.models import User
 
-from booking.models import Shop, Client, Appointment, DAYS_OF_WEEK
+from booking.models import Shop, Client, Appointment, ShopEvent, DAYS_OF_WEEK
 from booking.forms import AppointmentForm, ShopRegisterForm
 
 
@@ -170,3 +172,1167 @@ class BookingAppTest(TestCase):
         self.assertEqual(resp.status_code, 200)
         # check that the form error appears on page
         self.assertContains(resp, "This field is required.")
+
+
+class AvailabilityTest(TestCase):
+    def setUp(self):
+        self.shop = Shop.objects.create(
+            owner=User.objects.create_user("avail", "avail@example.com", "pass"),
+            name="Slot Shop",
+            address="1 Slot St",
+            opening_hours=datetime.time(9, 0),
+            closing_hours=datetime.time(11, 0),
+            opening_day="mon",
+            closing_day="fri"
+        )
+        self.client_obj = Client.objects.create(name="Ann", email="ann@a.com", phone="1")
+        self.monday = datetime.date(2025, 8, 4)
+        self.past = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def book(self, hour, minute, minutes, status="Confirmed"):
+        return Appointment.objects.create(
+            client=self.client_obj,
+            shop=self.shop,
+            start_time=datetime.datetime(2025, 8, 4, hour, minute, tzinfo=datetime.timezone.utc),
+            duration=datetime.timedelta(minutes=minutes),
+            status=status,
+        )
+
+    def test_free_slots_skip_blocking_appointments(self):
+        from booking.availability import free_slots
+
+        self.book(9, 30, 30)
+        self.book(10, 0, 60, status="Cancelled")   # doesn't block
+        with self.assertNumQueries(2):                  # appointments, recurring series
+            slots = free_slots(self.shop, self.monday, self.monday, now=self.past)
+
+        times = [t.strftime("%H:%M") for t in slots[self.monday][30]]
+        self.assertEqual(times, ["09:00", "10:00", "10:15", "10:30"])
+        self.assertEqual(slots[self.monday][120], [])
+
+    def test_free_slots_only_open_days(self):
+        from booking.availability import free_slots
+
+        sunday = self.monday + datetime.timedelta(days=6)
+        slots = free_slots(self.shop, self.monday, sunday, now=self.past)
+        self.assertEqual(len(slots), 5)
+        self.assertNotIn(sunday, slots)
+
+    def test_availability_endpoint(self):
+        resp = self.client.get(
+            reverse("booking:book-shop-availability", args=[self.shop.slug]),
+            {"start": "2999-08-05", "days": 1},
+        )
+        self.assertEqual(resp.status_code, 200)
+        day = resp.json()["days"][0]
+        self.assertEqual(day["date"], "2999-08-05")
+        self.assertEqual(day["slots"]["120"], ["09:00"])
+
+    async def test_async_views_under_asgi_client(self):
+        resp = await self.async_client.get(
+            reverse("booking:book-shop-availability", args=[self.shop.slug]),
+            {"start": "2999-08-05", "days": 1},
+        )
+        self.assertEqual(resp.json()["days"][0]["slots"]["120"], ["09:00"])
+        resp = await self.async_client.get(reverse("booking:book-shop", args=[self.shop.slug]))
+        self.assertContains(resp, "Slot Shop")
+
+    def test_end_time_kept_in_sync(self):
+        appt = self.book(9, 0, 30)
+        self.assertEqual(appt.end_time, appt.start_time + datetime.timedelta(minutes=30))
+
+        appt.duration = datetime.timedelta(minutes=60)
+        appt.save(update_fields=["duration"])
+        appt.refresh_from_db()
+        self.assertEqual(appt.end_time, appt.start_time + datetime.timedelta(minutes=60))
+
+
+class DashboardTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("dash", "dash@example.com", "pass")
+        self.shop = Shop.objects.create(
+            owner=self.owner,
+            name="Dash Shop",
+            address="2 Dash Rd",
+            opening_hours=datetime.time(9, 0),
+            closing_hours=datetime.time(17, 0),
+        )
+        client = Client.objects.create(name="Cat", email="cat@c.com", phone="2")
+        now = timezone.now()
+        for delta, status in [(1, "Confirmed"), (2, "Confirmed"), (3, "Cancelled"), (-30, "Completed")]:
+            Appointment.objects.create(
+                client=client,
+                shop=self.shop,
+                start_time=now + datetime.timedelta(days=delta),
+                status=status,
+            )
+        self.client.force_login(self.owner)
+
+    def test_shop_homepage_badges(self):
+        resp = self.client.get(reverse("booking:shop_homepage"))
+        self.assertEqual(resp.context["total_count"], 4)
+        self.assertEqual(resp.context["future_count"], 3)
+        self.assertEqual(resp.context["completed_count"], 1)
+        self.assertEqual(resp.context["future_confirmed_count"], 2)
+        self.assertEqual(len(resp.context["future_confirmed_appointments"]), 2)
+
+    def test_shop_homepage_query_count(self):
+        # session + user + shop + version, one aggregate for every badge, archive totals, the list
+        with self.assertNumQueries(7):
+            resp = self.client.get(reverse("booking:shop_homepage"))
+        self.assertEqual(resp.status_code, 200)
+
+    def test_unchanged_pages_are_304_or_served_from_cache(self):
+        url = reverse("booking:appointments_manage")
+        self.client.get(url)                            # sets the CSRF cookie (part of the ETag)
+        first = self.client.get(url, {"status": "confirmed"})
+        self.assertIn("no-cache", first["Cache-Control"])
+        with self.assertNumQueries(4):                  # session + user + shop + version
+            again = self.client.get(url, {"status": "confirmed"}, headers={"If-None-Match": first["ETag"]})
+        self.assertEqual(again.status_code, 304)
+
+        with self.assertNumQueries(4):
+            cached = self.client.get(url, {"status": "confirmed"})
+        self.assertContains(cached, "Cat")
+        self.assertNotEqual(self.client.get(url, {"status": "cancelled"})["ETag"], cached["ETag"])
+
+        appt = Appointment.objects.filter(shop=self.shop, status="Confirmed").first()
+        self.client.post(reverse("booking:appointment-cancelled", args=[appt.pk]))
+        changed = self.client.get(url, {"status": "confirmed"}, headers={"If-None-Match": first["ETag"]})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(len(changed.context["appointments"]), 1)
+
+    def test_rows_cached_per_version_without_csrf_token(self):
+        from django.core.cache import cache
+        from booking.fragments import CSRF_PLACEHOLDER, row_key
+        appt = Appointment.objects.select_related("client").filter(status="Confirmed").first()
+        resp = self.client.get(reverse("booking:appointments_manage"))
+        cached = cache.get(row_key(appt))
+        self.assertIn(CSRF_PLACEHOLDER, cached)
+        self.assertNotContains(resp, CSRF_PLACEHOLDER)
+        self.assertContains(resp, f'value="{resp.context["csrf_token"]}"')
+
+        version = appt.version
+        self.client.post(reverse("booking:appointment-cancelled", args=[appt.pk]))
+        appt = Appointment.objects.select_related("client").get(pk=appt.pk)
+        self.assertEqual(appt.version, version + 1)
+        self.assertIsNone(cache.get(row_key(appt)))
+        self.client.get(reverse("booking:appointments_manage"))
+        self.assertIn('data-status="Cancelled"', cache.get(row_key(appt)))
+
+
+class ReplicaRouterTest(TestCase):
+    setUp = DashboardTest.setUp
+
+    def routed_reads(self, send):
+        """Run `send()` as if a replica were configured; return the aliases booking reads asked for."""
+        from unittest import mock
+        from booking.routers import PrimaryReplicaRouter
+        seen = []
+        original = PrimaryReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            alias = original(router, model, **hints)
+            if model._meta.app_label == "booking":
+                seen.append(alias)
+            return None                                 # the test DB has no replica
+
+        with mock.patch("booking.routers.replica_configured", return_value=True), \
+                mock.patch.object(PrimaryReplicaRouter, "db_for_read", spy):
+            send()
+        return seen
+
+    def test_dashboard_reads_use_replica(self):
+        seen = self.routed_reads(lambda: self.client.get(reverse("booking:appointments_manage")))
+        self.assertTrue(seen)
+        self.assertEqual(set(seen), {"replica"})
+
+    def test_writes_and_auth_stay_on_primary(self):
+        from unittest import mock
+        from booking.routers import PrimaryReplicaRouter, read_from_replica
+        router = PrimaryReplicaRouter()
+        with mock.patch("booking.routers.replica_configured", return_value=True), read_from_replica():
+            self.assertEqual(router.db_for_read(Appointment), "replica")
+            self.assertIsNone(router.db_for_read(User))
+            self.assertEqual(router.db_for_write(Appointment), "default")
+        self.assertIsNone(router.db_for_read(Appointment))
+
+    def test_status_change_pins_next_read_to_primary(self):
+        appt = Appointment.objects.filter(status="Confirmed").first()
+        resp = self.client.post(reverse("booking:appointment-complete", args=[appt.pk]))
+        self.assertIn("easybook_primary", resp.cookies)
+        seen = self.routed_reads(lambda: self.client.get(reverse("booking:appointments_manage")))
+        self.assertEqual(set(seen), {None})
+
+
+class PaginationTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("page", "page@example.com", "pass")
+        self.shop = Shop.objects.create(owner=self.owner, name="Page Shop")
+        start = timezone.now().replace(microsecond=0)
+        for i in range(30):
+            client = Client.objects.create(name=f"C{i % 7}", email=f"c{i}@p.com", phone=str(i))
+            Appointment.objects.create(
+                client=client,
+                shop=self.shop,
+                # pairs share a start time to exercise the pk tie breaker
+                start_time=start + datetime.timedelta(hours=i // 2),
+                status=["Confirmed", "Pending", "Completed"][i % 3],
+            )
+        self.client.force_login(self.owner)
+
+    def walk(self, **params):
+        url = reverse("booking:appointments_manage")
+        seen, cursor = [], None
+        while True:
+            resp = self.client.get(url, dict(params, **({"cursor": cursor} if cursor else {})))
+            seen += [a.pk for a in resp.context["appointments"]]
+            cursor = resp.context["page_obj"].next_cursor
+            if not cursor:
+                return seen
+
+    def test_every_sort_walks_all_rows_once(self):
+        for sort in ["date_asc", "date_desc", "customer", "status"]:
+            seen = self.walk(sort=sort)
+            self.assertEqual(len(seen), 30, sort)
+            self.assertEqual(len(set(seen)), 30, sort)
+
+    def test_pages_follow_sort_order(self):
+        seen = self.walk(sort="customer")
+        expected = list(
+            Appointment.objects.order_by("client__name", "start_time", "pk").values_list("pk", flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_xhr_cursor_returns_only_rows(self):
+        first = self.client.get(reverse("booking:appointments_manage"))
+        self.assertEqual(len(first.context["appointments"]), 25)
+        resp = self.client.get(
+            reverse("booking:appointments_manage"),
+            {"cursor": first.context["page_obj"].next_cursor},
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+        self.assertTemplateUsed(resp, "shops/_appointment_rows.html")
+        self.assertTemplateNotUsed(resp, "shops/_appointments_list.html")
+        self.assertEqual(len(resp.context["appointments"]), 5)
+        self.assertNotContains(resp, "load-more")
+
+
+class ClientSearchTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("find", "find@example.com", "pass")
+        self.shop = Shop.objects.create(owner=self.owner, name="Find Shop")
+        self.mary = Client.objects.create(name="Mary Jane Watson", email="mj.watson@daily.com", phone="(402) 555-1234")
+        self.pete = Client.objects.create(name="Peter Parker", email="pete@bugle.com", phone="402-555-9876")
+        for client in (self.mary, self.pete):
+            Appointment.objects.create(client=client, shop=self.shop, start_time=timezone.now())
+        self.client.force_login(self.owner)
+
+    def search(self, q):
+        from booking.search import filter_by_client
+        return set(filter_by_client(Client.objects.all(), q, field="pk"))
+
+    def test_prefix_matches(self):
+        self.assertEqual(self.search("wat"), {self.mary})
+        self.assertEqual(self.search("mary par"), set())
+        self.assertEqual(self.search("mj.watson@dai"), {self.mary})
+        self.assertEqual(self.search("bugle"), {self.pete})
+        self.assertEqual(self.search("555-98"), {self.pete})
+        self.assertEqual(self.search("1234"), {self.mary})
+        self.assertEqual(self.search("402"), {self.mary, self.pete})
+
+    def test_index_follows_client_updates(self):
+        self.pete.name = "Spider Man"
+        self.pete.save(update_fields=["name"])
+        self.assertEqual(self.search("spider"), {self.pete})
+        self.assertEqual(self.search("peter"), set())
+
+    def test_manage_page_search(self):
+        resp = self.client.get(reverse("booking:appointments_manage"), {"q": "Parker"})
+        self.assertEqual([a.client for a in resp.context["appointments"]], [self.pete])
+
+
+class ShopCacheTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.owner = User.objects.create_user("cache", "cache@example.com", "pass")
+        self.shop = Shop.objects.create(
+            owner=self.owner,
+            name="Cache Shop",
+            opening_hours=datetime.time(9, 0),
+            closing_hours=datetime.time(17, 0),
+        )
+
+    def test_booking_page_served_from_cache(self):
+        url = reverse("booking:book-shop", args=[self.shop.slug])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            resp = self.client.get(url)
+        self.assertContains(resp, "Cache Shop")
+
+    def test_settings_edit_invalidates(self):
+        url = reverse("booking:book-shop", args=[self.shop.slug])
+        self.client.get(url)
+        self.client.force_login(self.owner)
+        self.client.post(reverse("booking:shop_settings"), {"shop_name": "Renamed Shop"})
+        self.assertContains(self.client.get(url), "Renamed Shop")
+
+    def test_unknown_slug_is_404(self):
+        resp = self.client.get(reverse("booking:book-shop", args=["nope"]))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_booking_post_uses_url_shop(self):
+        resp = self.client.post(reverse("booking:book-shop", args=[self.shop.slug]), {
+            "name": "Dee",
+            "email": "dee@d.com",
+            "phone": "4",
+            "start_time": "2999-08-05T10:00",
+            "duration": 30,
+            "note": "hi",
+        })
+        self.assertRedirects(resp, reverse("booking:confirm"))
+        self.assertEqual(Appointment.objects.get(client__email="dee@d.com").shop, self.shop)
+
+
+class ClaimSlotTest(TestCase):
+    def setUp(self):
+        self.shop = Shop.objects.create(
+            owner=User.objects.create_user("claim", "claim@example.com", "pass"),
+            name="Claim Shop",
+            opening_hours=datetime.time(9, 0),
+            closing_hours=datetime.time(17, 0),
+        )
+        self.client_obj = Client.objects.create(name="Cy", email="cy@c.com", phone="1")
+        self.start = datetime.datetime(2999, 8, 5, 10, 0, tzinfo=datetime.timezone.utc)
+
+    def claim(self, start, minutes=30):
+        from booking.services import claim_slot
+        duration = datetime.timedelta(minutes=minutes)
+        return claim_slot(self.shop, start, duration, lambda: Appointment.objects.create(
+            client=self.client_obj, shop=self.shop, start_time=start, duration=duration, status="Confirmed",
+        ))
+
+    def test_overlap_raises_and_creates_nothing(self):
+        from booking.services import SlotTaken
+        self.claim(self.start, 60)
+        with self.assertRaises(SlotTaken):
+            self.claim(self.start + datetime.timedelta(minutes=30))
+        self.claim(self.start + datetime.timedelta(minutes=60))     # back-to-back is fine
+        self.assertEqual(Appointment.objects.filter(shop=self.shop).count(), 2)
+
+    def test_cancelled_does_not_block(self):
+        self.claim(self.start)
+        Appointment.objects.update(status="Cancelled")
+        self.claim(self.start)
+        self.assertEqual(Appointment.objects.filter(status="Confirmed").count(), 1)
+
+    def test_book_appointment_rules(self):
+        from booking.services import BookingError, SlotTaken, book_appointment
+        data = {"name": "Cy", "email": "cy@c.com", "phone": "2"}
+        appt = book_appointment(self.shop, data, self.start, datetime.timedelta(minutes=30))
+        self.assertEqual(appt.client, self.client_obj)
+        self.client_obj.refresh_from_db()
+        self.assertEqual(self.client_obj.phone, "2")
+        with self.assertRaises(SlotTaken):
+            book_appointment(self.shop, data, self.start, datetime.timedelta(minutes=45))
+        with self.assertRaisesMessage(BookingError, "closed on that day"):
+            book_appointment(self.shop, data, self.start + datetime.timedelta(days=5), datetime.timedelta(minutes=30))
+        with self.assertRaisesMessage(BookingError, "within business hours"):
+            book_appointment(self.shop, data, self.start.replace(hour=16, minute=30), datetime.timedelta(minutes=60))
+
+    def test_booking_post_query_budget(self):
+        import json
+        from django.core.cache import cache
+        url = reverse("booking:book-shop", args=[self.shop.slug])
+
+        def post(hour, email, name="Cy", phone="1"):
+            return self.client.post(url, {
+                "name": name, "email": email, "phone": phone,
+                "start_time": f"2999-08-05T{hour}", "duration": 30, "note": "hi",
+            })
+
+        # overlap checks (appointments, series), client lookup, appointment insert,
+        # notification job, dashboard event, rollup row + increment, shop version
+        # bump; a new client adds its insert + search tokens, a renamed one the
+        # update, the reindex and a bump of its shops; a cold cache the shop
+        # lookup (+ the test's savepoint pair around the booking)
+        cases = [
+            ("returning client", True, 11, "10:00", "cy@c.com"),
+            ("new client", True, 13, "10:30", "new@c.com"),
+            ("renamed client", True, 15, "11:00", "cy@c.com", "Cyril", "2"),
+            ("new client, cold cache", False, 14, "11:30", "other@c.com", "Ot", "3"),
+            ("renamed client, cold cache", False, 16, "12:00", "cy@c.com", "Cy", "4"),
+        ]
+        for label, warm, queries, *args in cases:
+            cache.clear()
+            if warm:
+                self.client.get(url)                    # the shop cache
+            with self.subTest(label), self.assertNumQueries(queries):
+                resp = post(*args)                      # over the view's budget would raise here
+            self.assertRedirects(resp, reverse("booking:confirm"), fetch_redirect_response=False)
+
+        cache.clear()
+        resp = self.client.post(                        # the API's budget is the same worst case
+            reverse("booking:api-shop-book", args=[self.shop.slug]),
+            json.dumps({"name": "Cy", "email": "cy@c.com", "phone": "5",
+                        "start_time": "2999-08-05T12:30", "duration": 30}),
+            content_type="application/json",
+        )
+        self.assertEqual(resp.status_code, 201)
+
+        self.client.get(url)
+        with self.assertNumQueries(4):                  # conflict: just the overlap check, rolled back
+            resp = post("10:00", "cy@c.com", phone="5")
+        self.assertContains(resp, "overlaps another booking")
+
+    def test_lock_errors_not_retried_inside_outer_transaction(self):
+        from django.db import OperationalError
+        from booking.services import write_transaction
+        calls = []
+
+        def locked():
+            calls.append(1)
+            raise OperationalError("database is locked")
+
+        with self.assertRaises(OperationalError):
+            write_transaction(locked, base_delay=0)
+        self.assertEqual(len(calls), 1)
+
+
+class WriteTransactionModeTest(TransactionTestCase):
+    def begins(self, block):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            block()
+        return [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("BEGIN")]
+
+    def test_only_write_transactions_take_the_lock_up_front(self):
+        from django.db import transaction
+        from booking.services import write_transaction
+
+        def plain():
+            with transaction.atomic():
+                Shop.objects.exists()
+
+        self.assertEqual(self.begins(lambda: write_transaction(Shop.objects.exists)), ["BEGIN IMMEDIATE"])
+        self.assertEqual(self.begins(plain), ["BEGIN"])
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("jobs", "owner@jobs.com", "pass")
+        self.shop = Shop.objects.create(owner=self.owner, name="Job Shop")
+        self.appt = Appointment.objects.create(
+            client=Client.objects.create(name="Jo", email="jo@j.com", phone="1"),
+            shop=self.shop,
+            start_time=datetime.datetime(2999, 8, 5, 10, 0, tzinfo=datetime.timezone.utc),
+        )
+
+    def test_booking_emails_sent_in_one_batch(self):
+        from django.core import mail
+        from booking.jobs import run_batch
+        from booking.models import Job
+        from booking.notifications import notify_created
+        notify_created(self.appt)                       # same key as the signal: ignored
+        self.assertEqual(Job.objects.count(), 1)
+
+        self.assertEqual(run_batch(), (1, 0))
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["jo@j.com", "owner@jobs.com"])
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+        self.assertEqual(run_batch(), (0, 0))
+
+    def test_status_change_queues_email(self):
+        from django.core import mail
+        from booking.jobs import run_batch
+        self.client.force_login(self.owner)
+        self.client.post(reverse("booking:appointment-cancelled", args=[self.appt.pk]))
+        run_batch()
+        self.assertIn("was cancelled", mail.outbox[-1].subject)
+
+    def test_failures_back_off_then_give_up(self):
+        from unittest import mock
+        from booking import jobs
+        from booking.models import Job
+
+        def broken(batch):
+            for job in batch:
+                yield job, RuntimeError("smtp down")
+
+        Job.objects.all().delete()
+        jobs.enqueue("test_broken", {}, key="broken")
+        later = timezone.now() + datetime.timedelta(days=1)
+        with self.settings(JOB_MAX_ATTEMPTS=2), mock.patch.dict(jobs.HANDLERS, {"test_broken": broken}):
+            self.assertEqual(jobs.run_batch(), (0, 1))
+            job = Job.objects.get()
+            self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+            self.assertGreater(job.run_after, timezone.now())
+            self.assertIn("smtp down", job.last_error)
+            self.assertEqual(jobs.run_batch(), (0, 0))  # not due yet
+            jobs.run_batch(now=later)
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+
+
+class ShopEventStreamTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("live", "owner@live.com", "pass")
+        self.shop = Shop.objects.create(owner=self.owner, name="Live Shop")
+        self.client.force_login(self.owner)
+        self.async_client.force_login(self.owner)
+
+    def book(self):
+        return Appointment.objects.create(
+            client=Client.objects.create(name="Li", email="li@l.com", phone="1"),
+            shop=self.shop,
+            start_time=datetime.datetime(2999, 8, 5, 10, 0, tzinfo=datetime.timezone.utc),
+        )
+
+    async def read_stream(self, data=None, headers=None):
+        resp = await self.async_client.get(reverse("booking:appointments_events"), data, headers=headers)
+        self.assertEqual(resp["Content-Type"], "text/event-stream")
+        return "".join([chunk.decode() async for chunk in resp.streaming_content])
+
+    def test_manage_page_starts_feed_after_existing_events(self):
+        self.book()
+        resp = self.client.get(reverse("booking:appointments_manage"))
+        self.assertEqual(resp.context["last_event_id"], ShopEvent.objects.get().pk)
+        self.assertContains(resp, f"?since={ShopEvent.objects.get().pk}")
+
+    def test_wsgi_pages_poll_instead_of_streaming(self):
+        resp = self.client.get(reverse("booking:appointments_manage"))
+        self.assertContains(resp, "data-poll-url=")
+        self.assertNotContains(resp, "data-events-url=")
+        with override_settings(EVENT_STREAM_SSE=True):
+            resp = self.client.get(reverse("booking:appointments_manage"))
+        self.assertContains(resp, "data-events-url=")
+
+        # a WSGI request for the stream is told not to reconnect
+        resp = self.client.get(reverse("booking:appointments_events"))
+        self.assertEqual(resp.status_code, 204)
+
+    def test_poll_returns_events_after_since(self):
+        appt = self.book()
+        self.client.post(reverse("booking:appointment-cancelled", args=[appt.pk]))
+        first = ShopEvent.objects.order_by("pk").first()
+
+        data = self.client.get(reverse("booking:appointments_events_poll"), {"since": first.pk}).json()
+        self.assertEqual([e["kind"] for e in data["events"]], [ShopEvent.STATUS])
+        self.assertEqual(data["events"][0]["data"]["status"], "Cancelled")
+        self.assertIn(f'data-id="{appt.pk}"', data["events"][0]["data"]["html"])
+        self.assertEqual(data["last"], data["events"][0]["id"])
+        self.assertFalse(data["more"])
+
+        data = self.client.get(reverse("booking:appointments_events_poll"), {"since": data["last"]}).json()
+        self.assertEqual(data["events"], [])
+
+    @override_settings(EVENT_STREAM_SECONDS=0)
+    async def test_stream_pushes_committed_changes_with_rows(self):
+        appt = await sync_to_async(self.book)()
+        await sync_to_async(self.client.post)(reverse("booking:appointment-cancelled", args=[appt.pk]))
+        first = await ShopEvent.objects.order_by("pk").afirst()
+
+        body = await self.read_stream({"since": first.pk - 1})
+        self.assertIn(f"id: {first.pk}\nevent: created\n", body)
+        self.assertIn("event: status\n", body)
+        self.assertIn(f'data-id=\\"{appt.pk}\\"', body)     # the rendered row, JSON-escaped
+        self.assertIn('\"status\": \"Cancelled\"', body)
+
+        # reconnect: only what came after Last-Event-ID
+        body = await self.read_stream(headers={"Last-Event-ID": str(first.pk)})
+        self.assertNotIn("event: created", body)
+        self.assertIn("event: status", body)
+
+    @override_settings(EVENT_STREAM_SECONDS=0)
+    async def test_fresh_stream_skips_history(self):
+        await sync_to_async(self.book)()
+        self.assertNotIn("event:", await self.read_stream())
+
+    def test_prune_drops_old_events(self):
+        from booking.events import prune
+        self.book()
+        self.assertEqual(prune(now=timezone.now()), 0)
+        self.assertEqual(prune(now=timezone.now() + datetime.timedelta(days=1)), 1)
+
+    def test_prune_uses_the_created_at_index(self):
+        plan = ShopEvent.objects.filter(created_at__lt=timezone.now()).explain()
+        self.assertIn("shop_event_created_idx", plan)
+
+
+class RecurringSeriesTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("rec", "owner@rec.com", "pass")
+        self.shop = Shop.objects.create(
+            owner=self.owner, name="Rec Shop", opening_day="mon", closing_day="fri",
+            opening_hours=datetime.time(9, 0), closing_hours=datetime.time(17, 0),
+        )
+        self.start = datetime.datetime(2999, 8, 5, 10, 0, tzinfo=datetime.timezone.utc)    # a Monday
+        self.data = {"name": "Reg", "email": "reg@r.com", "phone": "1"}
+        self.half_hour = datetime.timedelta(minutes=30)
+
+    def series(self, **rule):
+        from booking.services import book_series
+        rule.setdefault("count", 520)
+        return book_series(self.shop, self.data, self.start, self.half_hour, rule.pop("frequency", "weekly"), **rule)
+
+    def test_rules_expand_lazily(self):
+        from booking import recurrence
+        weekly = self.series()
+        self.assertEqual(weekly.last_end, self.start + datetime.timedelta(weeks=519) + self.half_hour)
+        year_9 = self.start + datetime.timedelta(weeks=9 * 52)
+        self.assertEqual(weekly.occurrences(year_9, year_9 + datetime.timedelta(days=7)),
+                         [(year_9, year_9 + self.half_hour)])
+
+        jan31 = datetime.datetime(2999, 1, 31, 10, 0, tzinfo=datetime.timezone.utc)
+        self.assertEqual(recurrence.nth_start(jan31, "monthly", 1).date(), datetime.date(2999, 2, 28))
+        self.assertEqual(recurrence.last_index(self.start, "biweekly", until=datetime.date(2999, 9, 2)), 2)
+        self.assertEqual(recurrence.last_index(self.start, "weekly", count=3, until=datetime.date(3001, 1, 1)), 2)
+
+    def test_occurrences_block_bookings_and_slots(self):
+        from booking.availability import free_slots
+        from booking.services import SlotTaken, book_appointment
+        self.series()
+        later = self.start + datetime.timedelta(weeks=100)
+        with self.assertRaises(SlotTaken):
+            book_appointment(self.shop, self.data, later + datetime.timedelta(minutes=15), self.half_hour)
+        slots = free_slots(self.shop, later.date(), later.date(), durations=[30], now=self.start)
+        times = [t.strftime("%H:%M") for t in slots[later.date()][30]]
+        self.assertNotIn("10:00", times)
+        self.assertIn("10:30", times)
+
+    def test_new_series_checked_in_one_pass(self):
+        from booking.services import SlotTaken, book_series
+        from booking.models import AppointmentSeries
+        clash = self.start + datetime.timedelta(weeks=40)
+        Appointment.objects.create(client=Client.objects.create(name="X", email="x@x.com", phone="2"),
+                                   shop=self.shop, start_time=clash)
+        # appointments + series in the span, no matter how many visits (+ the test's savepoint statements)
+        with self.assertNumQueries(5):
+            with self.assertRaisesMessage(SlotTaken, clash.strftime("%a %d %b %Y")):
+                book_series(self.shop, self.data, self.start, self.half_hour, "weekly", count=520)
+        self.series(count=40)                           # stops the week before
+        with self.assertRaises(SlotTaken):
+            self.series(frequency="biweekly", count=3)  # occupied by the weekly series now
+        self.assertEqual(AppointmentSeries.objects.count(), 1)
+
+    def test_manage_views(self):
+        self.client.force_login(self.owner)
+        resp = self.client.post(reverse("booking:series-create"), {
+            **self.data, "start_time": "2999-08-05T10:00", "duration": 30,
+            "frequency": "biweekly", "until": "2999-09-30",
+        })
+        self.assertRedirects(resp, reverse("booking:appointments_manage"), fetch_redirect_response=False)
+        resp = self.client.get(reverse("booking:appointments_manage"))
+        [series] = resp.context["series"]
+        self.assertEqual(series.occurrence_count, 5)
+        self.assertContains(resp, "Next visit")
+
+        # a cancelled one-off can't be confirmed again on top of a visit
+        appt = Appointment.objects.create(client=series.client, shop=self.shop, status="Cancelled",
+                                          start_time=self.start + datetime.timedelta(weeks=4))
+        self.client.post(reverse("booking:appointment-confirmed", args=[appt.pk]))
+        appt.refresh_from_db()
+        self.assertEqual(appt.status, "Cancelled")
+
+        self.client.post(reverse("booking:series-cancel", args=[series.pk]))
+        self.client.post(reverse("booking:appointment-confirmed", args=[appt.pk]))
+        appt.refresh_from_db()
+        self.assertEqual(appt.status, "Confirmed")
+
+
+class CalendarTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("cal", "owner@cal.com", "pass")
+        self.shop = Shop.objects.create(owner=self.owner, name="Cal Shop")
+        self.client.force_login(self.owner)
+        self.appt = Appointment.objects.create(
+            client=Client.objects.create(name="Cy", email="cy@c.com", phone="1"),
+            shop=self.shop,
+            start_time=datetime.datetime(2999, 8, 6, 9, 30, tzinfo=datetime.timezone.utc),
+            duration=datetime.timedelta(minutes=45),
+        )
+        self.url = reverse("booking:calendar-data") + "?start=2999-08-05&days=7"
+
+    def test_page(self):
+        resp = self.client.get(reverse("booking:calendar"))
+        self.assertContains(resp, reverse("booking:calendar-data"))
+
+    def test_window_is_compact_rows(self):
+        from booking.models import AppointmentSeries
+        AppointmentSeries.objects.create(
+            client=self.appt.client, shop=self.shop, frequency="weekly", count=10,
+            start_time=datetime.datetime(2999, 7, 1, 12, 0, tzinfo=datetime.timezone.utc),
+        )
+        # session + user + shop + version, then the window: appointments, series
+        with self.assertNumQueries(6):
+            data = self.client.get(self.url).json()
+        self.assertEqual(data["fields"], ["id", "start", "minutes", "status", "client"])
+        self.assertEqual(data["appointments"], [[self.appt.pk, "2999-08-06T09:30:00+00:00", 45, "Confirmed", "Cy"]])
+        self.assertEqual([row[1] for row in data["series"]], ["2999-08-05T12:00:00+00:00"])
+
+        next_week = self.client.get(reverse("booking:calendar-data") + "?start=2999-08-12&days=7").json()
+        self.assertEqual(next_week["appointments"], [])
+
+    def test_unchanged_window_is_304(self):
+        first = self.client.get(self.url)
+        self.assertIn("no-cache", first["Cache-Control"])
+        with self.assertNumQueries(4):                  # the version is compared before the window is read
+            again = self.client.get(self.url, headers={"If-None-Match": first["ETag"]})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b"")
+
+        self.client.post(reverse("booking:appointment-cancelled", args=[self.appt.pk]))
+        changed = self.client.get(self.url, headers={"If-None-Match": first["ETag"]})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+
+
+class ApiTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("api", "owner@api.com", "pass")
+        self.shop = Shop.objects.create(
+            owner=self.owner, name="Api Shop", opening_day="mon", closing_day="fri",
+            opening_hours=datetime.time(9, 0), closing_hours=datetime.time(17, 0),
+        )
+        self.booking = {"name": "Cy", "email": "cy@c.com", "phone": "1",
+                        "start_time": "2999-08-05T10:00", "duration": 30}
+
+    def book(self, **changes):
+        return self.client.post(reverse("booking:api-shop-book", args=[self.shop.slug]),
+                                {**self.booking, **changes}, content_type="application/json")
+
+    def test_shop_and_availability_revalidate_with_304(self):
+        url = reverse("booking:api-shop", args=[self.shop.slug])
+        first = self.client.get(url)
+        self.assertEqual(first.json()["shop"]["opening_hours"], "09:00")
+        self.assertNotIn(b" ", first.content.replace(b"Api Shop", b""))     # compact
+        again = self.client.get(url, headers={"If-None-Match": first["ETag"]})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again["ETag"], first["ETag"])
+
+        slots_url = reverse("booking:api-shop-availability", args=[self.shop.slug]) + "?start=2999-08-05&days=1"
+        slots = self.client.get(slots_url)
+        self.assertIn("10:00", slots.json()["days"][0]["slots"]["30"])
+        self.assertEqual(self.client.get(slots_url, headers={"If-None-Match": slots["ETag"]}).status_code, 304)
+
+        self.assertEqual(self.book().status_code, 201)  # a write bumps the shop's counter
+        fresh = self.client.get(slots_url, headers={"If-None-Match": slots["ETag"]})
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotIn("10:00", fresh.json()["days"][0]["slots"]["30"])
+
+    def test_booking_errors(self):
+        self.assertEqual(self.book().json()["appointment"]["status"], "Confirmed")
+        self.assertEqual(self.book().status_code, 409)
+        resp = self.book(start_time="2999-08-10T10:00", email="nope")     # a Saturday, bad email
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(set(resp.json()["errors"]), {"email", "__all__"})
+
+    def test_listing_matches_dashboard_and_pages(self):
+        for day in range(5, 10):
+            self.book(start_time=f"2999-08-0{day}T11:00")
+        url = reverse("booking:api-appointments")
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        self.client.force_login(self.owner)
+        page = self.client.get(url, {"sort": "date_asc", "limit": 3})
+        data = page.json()
+        self.assertEqual(data["fields"][:4], ["id", "start", "minutes", "status"])
+        self.assertEqual([row[1][:10] for row in data["results"]], ["2999-08-05", "2999-08-06", "2999-08-07"])
+        rest = self.client.get(url, {"sort": "date_asc", "limit": 3, "cursor": data["next"]}).json()
+        self.assertEqual(len(rest["results"]), 2)
+        self.assertIsNone(rest["next"])
+
+        # an unchanged shop answers before running the list query: session, user, shop, counter
+        with self.assertNumQueries(4):
+            again = self.client.get(url, {"sort": "date_asc", "limit": 3},
+                                    headers={"If-None-Match": page["ETag"]})
+        self.assertEqual(again.status_code, 304)
+        dashboard = self.client.get(reverse("booking:appointments_manage"), {"q": "cy", "status": "confirmed"})
+        api = self.client.get(url, {"q": "cy", "status": "confirmed"}).json()
+        self.assertEqual([row[0] for row in api["results"]], [a.pk for a in dashboard.context["appointments"]])
+
+class SqliteProfileTest(TestCase):
+    def test_pragmas_applied_to_new_connections(self):
+        from django.db import connection
+        from django.test import override_settings
+        from booking.signals import tune_sqlite
+        with override_settings(SQLITE_PRAGMAS={"cache_size": -1234, "busy_timeout": 4321}):
+            tune_sqlite(sender=connection.__class__, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA cache_size")
+            self.assertEqual(cursor.fetchone()[0], -1234)
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 4321)
+
+
+class TransferCommandTest(TestCase):
+    def setUp(self):
+        self.shop = Shop.objects.create(
+            owner=User.objects.create_user("move", "move@example.com", "pass"),
+            name="Move Shop",
+        )
+        self.ann = Client.objects.create(name="Ann", email="ann@m.com", phone="1")
+        Appointment.objects.create(
+            client=self.ann,
+            shop=self.shop,
+            start_time=datetime.datetime(2025, 8, 4, 9, 0, tzinfo=datetime.timezone.utc),
+        )
+
+    def run_import(self, text, suffix=".csv"):
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+
+        with tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False) as f:
+            f.write(text)
+        rejects = f.name + ".rejects.csv"
+        out = StringIO()
+        try:
+            call_command("import_appointments", self.shop.slug, f.name, batch_size=2,
+                         rejects=rejects, stdout=out)
+            with open(rejects) as r:
+                reasons = [line.split(",")[:2] for line in r.read().splitlines()[1:]]
+        finally:
+            os.unlink(f.name)
+            if os.path.exists(rejects):
+                os.unlink(rejects)
+        return out.getvalue(), reasons
+
+    def test_import_csv_batches_dedupes_and_rejects(self):
+        text = (
+            "client_name,client_email,client_phone,start_time,duration_minutes,status,note\n"
+            "Ann,ann@m.com,1,2025-08-04T09:15:00+00:00,30,Confirmed,clash with existing\n"
+            "Bob,bob@m.com,2,2025-08-04T10:00:00+00:00,60,Confirmed,ok\n"
+            "Bob,bob@m.com,2,2025-08-04T10:30:00+00:00,30,Pending,clash in batch\n"
+            "Cy,not-an-email,3,2025-08-04T12:00:00+00:00,30,Confirmed,bad\n"
+            "Ann,ann@m.com,1,2025-08-04T09:00:00+00:00,30,Completed,history\n"
+        )
+        out, reasons = self.run_import(text)
+        self.assertIn("imported 2", out)
+        self.assertIn("rejected 3", out)
+        self.assertEqual([line for line, _ in reasons], ["2", "5", "4"])
+        self.assertEqual(Client.objects.filter(email="ann@m.com").count(), 1)
+        self.assertEqual(Client.objects.filter(email="bob@m.com").count(), 1)
+        self.assertEqual(Appointment.objects.filter(shop=self.shop).count(), 3)
+
+    def test_export_jsonl_round_trip(self):
+        import json
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command("export_appointments", self.shop.slug, format="jsonl", stdout=out, stderr=StringIO())
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(rows[0]["client_email"], "ann@m.com")
+        self.assertEqual(rows[0]["duration_minutes"], 30)
+
+        Appointment.objects.all().delete()
+        result, reasons = self.run_import(out.getvalue(), suffix=".jsonl")
+        self.assertIn("imported 1", result)
+        self.assertEqual(reasons, [])
+
+
+    def test_jsonl_numbers_are_text(self):
+        from booking.transfer import parse_row
+        row = {"client_name": "Num", "client_email": "num@m.com", "client_phone": 5551234,
+               "start_time": "2025-08-05T09:00:00+00:00", "duration_minutes": 30}
+        self.assertEqual(parse_row(row)["phone"], "5551234")
+
+        text = (
+            '{"client_name": "Num", "client_email": "num@m.com", "client_phone": 5551234,'
+            ' "start_time": "2025-08-05T09:00:00+00:00"}\n'
+            '{"client_name": 7, "client_email": 8, "start_time": "2025-08-05T10:00:00+00:00"}\n'
+        )
+        out, reasons = self.run_import(text, suffix=".jsonl")
+        self.assertIn("imported 1", out)
+        self.assertEqual([line for line, _ in reasons], ["2"])         # bad email, not an abort
+        self.assertEqual(Client.objects.get(email="num@m.com").phone, "5551234")
+
+    def test_unsorted_batch_checks_overlaps_one_window_at_a_time(self):
+        from unittest import mock
+        from booking import transfer
+        rows = [
+            {"client_name": "Bob", "client_email": "bob@m.com", "start_time": start, "duration_minutes": 30}
+            for start in ["2026-03-01T09:00:00+00:00", "2025-08-04T09:10:00+00:00",  # clashes with Ann
+                          "2026-03-01T09:15:00+00:00", "2025-01-01T09:00:00+00:00"]  # clashes in batch
+        ]
+        batch = [(i, transfer.parse_row(row)) for i, row in enumerate(rows, start=2)]
+        with mock.patch.object(transfer, "blocking_intervals", wraps=transfer.blocking_intervals) as query:
+            self.assertEqual(transfer._find_conflicts(self.shop, batch), {3, 4})
+        self.assertEqual(query.call_count, 3)
+        for (_, start, end), _ in query.call_args_list:
+            self.assertLess(end - start, transfer.CONFLICT_WINDOW + datetime.timedelta(hours=2))
+
+
+class ExportViewTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("exp", "exp@example.com", "pass")
+        self.shop = Shop.objects.create(owner=self.owner, name="Export Shop")
+        for i, status in enumerate(["Confirmed", "Cancelled", "Confirmed"]):
+            Appointment.objects.create(
+                client=Client.objects.create(name=f"Eve {i}", email=f"eve{i}@x.com", phone="9"),
+                shop=self.shop,
+                start_time=datetime.datetime(2025, 8, 4, 9 + i, tzinfo=datetime.timezone.utc),
+                status=status,
+                note="line one\nline, two",
+            )
+        self.client.force_login(self.owner)
+
+    def test_csv_uses_manage_filters(self):
+        resp = self.client.get(reverse("booking:appointments_export"), {"status": "confirmed", "sort": "date_asc"})
+        self.assertTrue(resp.streaming)
+        lines = b"".join(resp.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith("client_name,client_email"))
+        self.assertEqual([l.split(",")[0] for l in lines[1:] if l.startswith("Eve")], ["Eve 0", "Eve 2"])
+
+    def test_ics(self):
+        resp = self.client.get(reverse("booking:appointments_export"), {"format": "ics"})
+        body = b"".join(resp.streaming_content).decode()
+        self.assertEqual(resp["Content-Type"], "text/calendar; charset=utf-8")
+        self.assertEqual(body.count("BEGIN:VEVENT"), 3)
+        self.assertIn("DTSTART:20250804T090000Z\r\n", body)
+        self.assertIn("STATUS:CANCELLED", body)
+        self.assertIn("line one\\nline\\, two", body)
+
+    def test_login_required(self):
+        self.client.logout()
+        resp = self.client.get(reverse("booking:appointments_export"))
+        self.assertEqual(resp.status_code, 302)
+
+
+class BulkStatusTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("bulk", "owner@bulk.com", "pass")
+        self.shop = Shop.objects.create(owner=self.owner, name="Bulk Shop")
+        self.client_obj = Client.objects.create(name="Bo", email="bo@b.com", phone="1")
+        self.now = timezone.now().replace(microsecond=0)
+        self.client.force_login(self.owner)
+
+    def book(self, hours, status="Confirmed", shop=None):
+        return Appointment.objects.create(
+            client=self.client_obj, shop=shop or self.shop, status=status,
+            start_time=self.now + datetime.timedelta(hours=hours),
+        )
+
+    def post(self, **data):
+        return self.client.post(reverse("booking:appointments_bulk_status"), data,
+                                HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+
+    def test_one_update_with_per_item_results(self):
+        from booking.models import Job, ShopVersion
+        done = [self.book(-h) for h in (2, 3, 4)]
+        cancelled = self.book(-5, status="Cancelled")
+        other = self.book(-6, shop=Shop.objects.create(owner=User.objects.create_user("o"), name="Other"))
+        version = ShopVersion.objects.get(shop=self.shop).version
+
+        # session+user+shop, savepoints, read, UPDATE, jobs, events, rollups (rows + 2 updates), bump
+        with self.assertNumQueries(13):
+            resp = self.post(status="Completed", ids=[a.pk for a in done] + [cancelled.pk, other.pk])
+        data = resp.json()
+        self.assertEqual(data["updated"], 3)
+        self.assertEqual([r["result"] for r in data["results"]],
+                         ["updated", "updated", "updated", "not_allowed", "not_found"])
+        self.assertEqual(Appointment.objects.filter(shop=self.shop, status="Completed").count(), 3)
+        self.assertEqual(Job.objects.filter(kind="appointment_status").count(), 3)
+        self.assertEqual(ShopEvent.objects.filter(kind=ShopEvent.STATUS).count(), 3)
+        self.assertEqual(ShopVersion.objects.get(shop=self.shop).version, version + 1)
+        self.assertEqual(Appointment.objects.get(pk=other.pk).status, "Confirmed")
+
+    def test_reinstating_checks_overlaps(self):
+        self.book(24)
+        first, second = self.book(24, status="Cancelled"), self.book(48, status="Cancelled")
+        third = self.book(48, status="Completed")           # same slot as `second`: first one wins
+        results = self.post(status="Confirmed", ids=[first.pk, second.pk, third.pk]).json()["results"]
+        self.assertEqual([r["result"] for r in results], ["conflict", "updated", "conflict"])
+
+    def test_complete_all_past_confirmed(self):
+        past = [self.book(-h) for h in (2, 26)]
+        self.book(-2, status="Pending")
+        upcoming = self.book(2)
+        resp = self.client.post(reverse("booking:appointments_bulk_status"), {"action": "complete_past"})
+        self.assertRedirects(resp, reverse("booking:appointments_manage"), fetch_redirect_response=False)
+        self.assertEqual(set(Appointment.objects.filter(status="Completed").values_list("pk", flat=True)),
+                         {a.pk for a in past})
+        self.assertEqual(Appointment.objects.get(pk=upcoming.pk).status, "Confirmed")
+
+    def test_each_transition_queues_one_email(self):
+        from booking.models import Job
+        appt = self.book(-2)
+        Job.objects.all().delete()
+        for status in ("Cancelled", "Confirmed", "Cancelled", "Cancelled"):   # back and forth in one second
+            self.post(status=status, ids=[appt.pk])
+        self.assertEqual(list(Job.objects.filter(kind="appointment_status")
+                              .order_by("pk").values_list("payload__status", flat=True)),
+                         ["Cancelled", "Confirmed", "Cancelled"])
+
+    def test_single_action_follows_transitions(self):
+        appt = self.book(-2, status="Cancelled")
+        self.client.post(reverse("booking:appointment-complete", args=[appt.pk]))
+        self.assertEqual(Appointment.objects.get(pk=appt.pk).status, "Cancelled")
+        self.assertEqual(self.post(status="Nope", ids=[appt.pk]).status_code, 400)
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("arch", "owner@arch.com", "pass")
+        self.shop = Shop.objects.create(owner=self.owner, name="Archive Shop")
+        self.client_obj = Client.objects.create(name="Al", email="al@a.com", phone="1")
+        now = timezone.now()
+        for days, status in [(-400, "Completed"), (-400, "Cancelled"), (-390, "Completed"),
+                             (-400, "Confirmed"), (-10, "Completed"), (5, "Confirmed")]:
+            Appointment.objects.create(client=self.client_obj, shop=self.shop, status=status,
+                                       start_time=now + datetime.timedelta(days=days))
+
+    def test_batches_move_finished_history_and_keep_badges(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from booking.models import ArchivedAppointment, ArchiveTotals
+        self.client.force_login(self.owner)
+        before = self.client.get(reverse("booking:shop_homepage")).context
+
+        out = StringIO()
+        call_command("archive_appointments", batch_size=2, max_batches=1, stdout=out)
+        self.assertEqual(ArchivedAppointment.objects.count(), 2)
+        call_command("archive_appointments", batch_size=2, stdout=out)     # resumes
+        self.assertIn("1 appointments archived", out.getvalue())
+
+        self.assertEqual(ArchivedAppointment.objects.count(), 3)
+        self.assertEqual(Appointment.objects.count(), 3)                    # confirmed + recent stay hot
+        totals = ArchiveTotals.objects.get(shop=self.shop)
+        self.assertEqual((totals.appointments, totals.completed, totals.cancelled), (3, 2, 1))
+
+        after = self.client.get(reverse("booking:shop_homepage")).context
+        for badge in ["total_count", "completed_count", "future_count", "completedThisWeek_count"]:
+            self.assertEqual(after[badge], before[badge])
+
+    def test_manage_page_counts_only_the_rows_it_lists(self):
+        from io import StringIO
+        from django.core.management import call_command
+        call_command("archive_appointments", stdout=StringIO())
+        self.client.force_login(self.owner)
+        url = reverse("booking:appointments_manage")
+
+        resp = self.client.get(url, {"status": "Confirmed"})
+        self.assertEqual(resp.context["total_count"], 2)
+        self.assertEqual(len(resp.context["appointments"]), 2)
+        self.assertEqual(self.client.get(url, {"q": "nobody"}).context["total_count"], 0)
+        self.assertEqual(self.client.get(reverse("booking:shop_homepage")).context["total_count"], 6)
+
+    def test_export_leaves_archive_out_unless_asked(self):
+        from io import StringIO
+        from django.core.management import call_command
+        call_command("archive_appointments", stdout=StringIO())
+        for flags, rows in [([], 3), (["--include-archived"], 6)]:
+            out = StringIO()
+            call_command("export_appointments", self.shop.slug, *flags, stdout=out, stderr=StringIO())
+            self.assertEqual(len(out.getvalue().splitlines()), rows + 1)     # + header
+
+    def test_raw_delete_clears_every_reference(self):
+        # archive._delete_appointments bypasses the collector: it only knows about ShopEvent
+        refs = [f.related_model for f in Appointment._meta.get_fields(include_hidden=True)
+                if f.auto_created and not f.concrete]
+        self.assertEqual(refs, [ShopEvent])
+
+    def test_horizon_must_cover_dashboard_ranges(self):
+        from django.core.management import CommandError, call_command
+        with self.assertRaises(CommandError):
+            call_command("archive_appointments", days=7)
+
+
+class RollupTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("roll", "owner@roll.com", "pass")
+        self.shop = Shop.objects.create(owner=self.owner, name="Rollup Shop", opening_day="mon", closing_day="sun",
+                                        opening_hours=datetime.time(9, 0), closing_hours=datetime.time(17, 0))
+        self.client_obj = Client.objects.create(name="Ro", email="ro@r.com", phone="1")
+        monday = timezone.localdate() - datetime.timedelta(days=timezone.localdate().weekday())
+        self.start = timezone.make_aware(datetime.datetime.combine(monday, datetime.time(10, 0)))
+
+    def book(self, days, minutes=30, status="Confirmed"):
+        return Appointment.objects.create(
+            client=self.client_obj, shop=self.shop, status=status,
+            start_time=self.start + datetime.timedelta(days=days), duration=datetime.timedelta(minutes=minutes),
+        )
+
+    def counts(self):
+        from booking.models import DailyRollup
+        return {
+            (r.day, r.status, r.minutes): r.count
+            for r in DailyRollup.objects.filter(shop=self.shop).exclude(count=0)
+        }
+
+    def test_writes_keep_rollups_equal_to_a_rebuild(self):
+        from booking import rollups
+        from booking.statuses import update_statuses
+        a, b = self.book(0), self.book(1, minutes=60)
+        c = self.book(-7, status="Pending")
+        a.start_time += datetime.timedelta(days=2)
+        a.save()
+        update_statuses(self.shop, [b.pk, c.pk], "Cancelled")
+        self.book(1).delete()
+
+        incremental = self.counts()
+        self.assertEqual(sum(incremental.values()), 3)
+        rollups.rebuild(self.shop)
+        self.assertEqual(self.counts(), incremental)
+
+    def test_analytics_page_reads_only_rollups(self):
+        for day in range(3):
+            self.book(day, minutes=60)
+        self.book(0, minutes=30, status="Cancelled")
+        self.book(-7, minutes=30)
+        self.client.force_login(self.owner)
+        with self.assertNumQueries(5):                 # session + user + shop + version + rollups
+            resp = self.client.get(reverse("booking:analytics"), {"weeks": 4})
+        last, this = resp.context["weeks"][-2:]
+        self.assertEqual((this["bookings"], this["cancelled"], this["cancellation_rate"]), (4, 1, 25.0))
+        self.assertEqual(this["utilization"], round(100 * 180 / (7 * 8 * 60), 1))
+        self.assertEqual(last["bookings"], 1)
+        self.assertEqual(resp.context["durations"], [(60, 3), (30, 1)])
+
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("perf", "owner@perf.com", "pass")
+        self.shop = Shop.objects.create(owner=self.owner, name="Perf Shop")
+        self.client.force_login(self.owner)
+
+    def test_server_timing_and_log_line(self):
+        import json
+        with self.assertLogs("booking.perf", level="INFO") as logs:
+            resp = self.client.get(reverse("booking:shop_homepage"))
+        self.assertRegex(resp["Server-Timing"], r'^db;dur=[\d.]+;desc="7 queries", tpl;dur=[\d.]+, app;dur=[\d.]+$')
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line["view"], line["status"], line["queries"]), ("booking.views.shopHomePage", 200, 7))
+        self.assertGreater(line["template_ms"], 0)
+
+    def test_budget_overrun_fails_the_test_and_is_logged_live(self):
+        from unittest import mock
+        from booking.instrumentation import QueryBudgetExceeded
+        from booking.views import shopHomePage
+        with mock.patch.object(shopHomePage, "query_budget", 6):   # e.g. an extra .count() crept in
+            with self.assertRaisesMessage(QueryBudgetExceeded, "ran 7 queries, budget is 6"):
+                self.client.get(reverse("booking:shop_homepage"))
+
+            with override_settings(QUERY_BUDGET_MODE="log"), \
+                    self.assertLogs("booking.perf", level="WARNING") as logs:
+                resp = self.client.get(reverse("booking:shop_homepage"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('"event": "query_budget_exceeded"', logs.output[0])
+
+    def test_repeated_statement_logged_as_n_plus_one(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from booking.instrumentation import RequestMetricsMiddleware
+
+        def view(request):
+            for _ in range(5):
+                Client.objects.filter(pk=0).exists()
+            return HttpResponse()
+
+        with self.assertLogs("booking.perf", level="WARNING") as logs:
+            RequestMetricsMiddleware(view)(RequestFactory().get("/"))
+        self.assertIn('"event": "duplicate_queries"', logs.output[0])
+        self.assertIn('"count": 5', logs.output[0])
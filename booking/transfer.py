@@ -0,0 +1,401 @@
+# booking/transfer.py
+import bisect
+import csv
+import datetime
+import json
+from collections import Counter
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .availability import blocking_intervals
+from .models import Appointment, Client
+from .search import index_clients
+from .services import BLOCKING_STATUSES, immediate_transaction, lock_shop
+from . import rollups, versions
+
+# column order for CSV, key order for JSONL
+FIELDS = ["client_name", "client_email", "client_phone", "start_time", "duration_minutes", "status", "note"]
+
+STATUSES = {code for code, _ in Appointment.STATUS_CHOICES}
+# time span of an import batch checked for overlaps with one query (bounds the rows loaded)
+CONFLICT_WINDOW = datetime.timedelta(days=7)
+
+
+# ---------------------------------------------------------------------------
+# export
+# ---------------------------------------------------------------------------
+def appointment_rows(queryset, chunk_size=2000):
+    """
+    @brief Stream appointments as plain dicts keyed by `FIELDS`.
+    @details Uses `.iterator()` so rows are fetched `chunk_size` at a time and
+             never cached on the queryset.
+    @param queryset QuerySet Appointments (or `ArchivedAppointment`s) to export.
+    @return generator of dict
+    """
+    qs = queryset.select_related("client")
+    for appt in qs.iterator(chunk_size=chunk_size):
+        yield {
+            "client_name": appt.client.name,
+            "client_email": appt.client.email,
+            "client_phone": appt.client.phone,
+            "start_time": appt.start_time.isoformat(),
+            "duration_minutes": int(appt.duration.total_seconds() // 60),
+            "status": appt.status,
+            "note": appt.note,
+        }
+
+
+def write_csv(rows, out):
+    """@brief Write rows as CSV with a header line. @return int Rows written."""
+    writer = csv.DictWriter(out, fieldnames=FIELDS)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl(rows, out):
+    """@brief Write rows as one JSON object per line. @return int Rows written."""
+    count = 0
+    for row in rows:
+        out.write(json.dumps(row, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+class _Echo:
+    """@brief File-like object whose write() hands the line back (for streaming csv)."""
+
+    def write(self, value):
+        return value
+
+
+def _batched(lines, size=500):
+    # join small lines so the response isn't flushed once per row
+    buf = []
+    for line in lines:
+        buf.append(line)
+        if len(buf) >= size:
+            yield "".join(buf)
+            buf = []
+    if buf:
+        yield "".join(buf)
+
+
+def csv_stream(rows):
+    """
+    @brief CSV text chunks for a `StreamingHttpResponse`.
+    @param rows iterable of dict from `appointment_rows`.
+    @return generator of str
+    """
+    writer = csv.DictWriter(_Echo(), fieldnames=FIELDS)
+
+    def lines():
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow(row)
+
+    return _batched(lines())
+
+
+ICS_STATUS = {
+    "Pending": "TENTATIVE",
+    "Confirmed": "CONFIRMED",
+    "Completed": "CONFIRMED",
+    "Cancelled": "CANCELLED",
+}
+
+
+def _ics_text(value):
+    return (
+        str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _ics_fold(line):
+    # RFC 5545: lines longer than 75 octets continue on a line starting with a space
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line + "\r\n"
+    parts, chunk = [], b""
+    for ch in line:
+        enc = ch.encode("utf-8")
+        if len(chunk) + len(enc) > (75 if not parts else 74):
+            parts.append(chunk.decode("utf-8"))
+            chunk = b""
+        chunk += enc
+    parts.append(chunk.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def ics_stream(queryset, host="easybook", chunk_size=2000):
+    """
+    @brief iCalendar (.ics) text chunks for a `StreamingHttpResponse`.
+    @param queryset QuerySet Appointments to export (streamed with `.iterator()`).
+    @param host str Domain used to build stable event UIDs.
+    @return generator of str
+    """
+    fmt = "%Y%m%dT%H%M%SZ"
+    stamp = timezone.now().astimezone(datetime.timezone.utc).strftime(fmt)
+
+    def lines():
+        yield "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//EasyBook//Appointments//EN\r\n"
+        for appt in queryset.select_related("client").iterator(chunk_size=chunk_size):
+            start = appt.start_time.astimezone(datetime.timezone.utc)
+            end = appt.end_time.astimezone(datetime.timezone.utc)
+            yield "".join(_ics_fold(line) for line in (
+                "BEGIN:VEVENT",
+                f"UID:appointment-{appt.pk}@{host}",
+                f"DTSTAMP:{stamp}",
+                f"DTSTART:{start.strftime(fmt)}",
+                f"DTEND:{end.strftime(fmt)}",
+                f"SUMMARY:{_ics_text(appt.client.name)}",
+                "DESCRIPTION:" + _ics_text(
+                    f"{appt.client.email} / {appt.client.phone}\n{appt.note}"
+                ),
+                f"STATUS:{ICS_STATUS.get(appt.status, 'CONFIRMED')}",
+                "END:VEVENT",
+            ))
+        yield "END:VCALENDAR\r\n"
+
+    return _batched(lines())
+
+
+# ---------------------------------------------------------------------------
+# import
+# ---------------------------------------------------------------------------
+def read_rows(stream, fmt):
+    """
+    @brief Lazily parse an import file.
+    @param stream file Text stream opened by the caller.
+    @param fmt str "csv" or "jsonl".
+    @return generator of (line_no, dict|None, error|None)
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_no, None, f"bad JSON: {exc}"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, "expected a JSON object"
+            continue
+        yield line_no, row, None
+
+
+def _text(row, field):
+    # JSONL values may be numbers (a phone) or null: compare and store them as text
+    value = row.get(field)
+    return "" if value is None else str(value).strip()
+
+
+def parse_row(row):
+    """
+    @brief Validate one raw row.
+    @return dict Normalized values (start_time aware, duration timedelta).
+    @exception ValueError with a human-readable reason.
+    """
+    name = _text(row, "client_name")
+    email = _text(row, "client_email")
+    phone = _text(row, "client_phone")
+    if not name:
+        raise ValueError("client_name is required")
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise ValueError(f"invalid client_email {email!r}")
+
+    start = parse_datetime(str(row.get("start_time") or ""))
+    if start is None:
+        raise ValueError(f"invalid start_time {row.get('start_time')!r}")
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start)
+
+    try:
+        minutes = int(row.get("duration_minutes") or 30)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid duration_minutes {row.get('duration_minutes')!r}")
+    if minutes <= 0:
+        raise ValueError("duration_minutes must be positive")
+
+    status = (_text(row, "status") or "Confirmed").capitalize()
+    if status not in STATUSES:
+        raise ValueError(f"unknown status {row.get('status')!r}")
+
+    return {
+        "name": name[:100],
+        "email": email,
+        "phone": phone[:20],
+        "start_time": start,
+        "duration": datetime.timedelta(minutes=minutes),
+        "status": status,
+        "note": str(row.get("note") or "-")[:666],
+    }
+
+
+def _clients_for(batch):
+    """
+    @brief Resolve the clients of a batch in two queries (lookup + bulk insert).
+    @details Same rule as `Client.objects.get_or_create(email=...)` in the
+             views: an existing client with that email is reused, otherwise
+             one is created from the first row that mentions it.
+    @return dict email → Client
+    """
+    emails = {item["email"] for _, item in batch}
+    clients = {}
+    for client in Client.objects.filter(email__in=emails).order_by("-pk"):
+        clients[client.email] = client            # lowest pk wins, like .get()
+
+    new = {}
+    for _, item in batch:
+        if item["email"] not in clients and item["email"] not in new:
+            new[item["email"]] = Client(name=item["name"], email=item["email"], phone=item["phone"])
+    if new:
+        created = Client.objects.bulk_create(new.values())
+        index_clients(created, created=True)     # bulk_create skips the post_save signal
+        clients.update((c.email, c) for c in created)
+    return clients
+
+
+def _windows(blocking, span=None):
+    """
+    @brief Split rows sorted by start into runs that start within `span` of the run's first row.
+    @return generator of list[(line_no, item)]
+    """
+    span = span or CONFLICT_WINDOW
+    run = []
+    for pair in blocking:
+        if run and pair[1]["start_time"] - run[0][1]["start_time"] >= span:
+            yield run
+            run = []
+        run.append(pair)
+    if run:
+        yield run
+
+
+def _find_conflicts(shop, batch):
+    """
+    @brief Overlap check for a whole batch: one query per `CONFLICT_WINDOW` of rows, plus a sweep.
+    @details
+      Only Pending/Confirmed rows block or get blocked, like
+      `AppointmentForm.clean`. The batch's blocking rows are sorted by start
+      and split into runs spanning at most `CONFLICT_WINDOW`; the existing
+      intervals of each run's window are loaded once, and a prefix maximum
+      of their end times answers "does anything that starts before my end
+      also end after my start" with one bisect. Rows inside the batch are
+      swept in start order across runs.
+      Memory stays bounded by the batch plus one window of the shop's
+      bookings whatever the order of the file; an unsorted file only costs
+      more queries (at most one per row).
+    @return set[int] Line numbers of rows that overlap.
+    """
+    blocking = sorted(
+        ((line_no, item) for line_no, item in batch if item["status"] in BLOCKING_STATUSES),
+        key=lambda pair: pair[1]["start_time"],
+    )
+
+    conflicts = set()
+    accepted_end = None
+    for run in _windows(blocking):
+        window_start = run[0][1]["start_time"]
+        window_end = max(item["start_time"] + item["duration"] for _, item in run)
+        existing = blocking_intervals(shop, window_start, window_end)
+
+        starts = [start for start, _ in existing]
+        max_end = []
+        for _, end in existing:
+            max_end.append(max(end, max_end[-1]) if max_end else end)
+
+        for line_no, item in run:
+            start = item["start_time"]
+            end = start + item["duration"]
+            idx = bisect.bisect_left(starts, end)      # existing rows starting before our end
+            if (idx and max_end[idx - 1] > start) or (accepted_end and accepted_end > start):
+                conflicts.add(line_no)
+                continue
+            accepted_end = max(end, accepted_end) if accepted_end else end
+    return conflicts
+
+
+def import_appointments(shop, rows, batch_size=1000, on_reject=None):
+    """
+    @brief Import parsed rows for a shop in batches.
+    @details Rows are read lazily and held one batch at a time; the overlap
+             check loads the shop's bookings one `CONFLICT_WINDOW` at a time
+             (see `_find_conflicts`), so an unsorted file doesn't pull in the
+             shop's whole history either.
+    @param shop Shop Shop every appointment is attached to.
+    @param rows iterable of (line_no, dict|None, error|None) from `read_rows`.
+    @param batch_size int Rows per transaction / `bulk_create`.
+    @param on_reject callable(line_no, row, reason) Called for every rejected row.
+    @return tuple[int, int] (imported, rejected)
+    """
+    on_reject = on_reject or (lambda *args: None)
+    imported = rejected = 0
+    rows = iter(rows)
+
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+
+        raws = {line_no: raw for line_no, raw, _ in chunk}
+        batch = []
+        for line_no, raw, error in chunk:
+            if error is None:
+                try:
+                    batch.append((line_no, parse_row(raw)))
+                    continue
+                except ValueError as exc:
+                    error = str(exc)
+            on_reject(line_no, raw, error)
+            rejected += 1
+
+        with immediate_transaction():
+            lock_shop(shop)
+            conflicts = _find_conflicts(shop, batch)
+            keep = []
+            for line_no, item in batch:
+                if line_no in conflicts:
+                    on_reject(line_no, raws[line_no], "overlaps another booking for this shop")
+                    rejected += 1
+                else:
+                    keep.append(item)
+
+            if keep:
+                clients = _clients_for([(None, item) for item in keep])
+                Appointment.objects.bulk_create(
+                    Appointment(
+                        client=clients[item["email"]],
+                        shop=shop,
+                        start_time=item["start_time"],
+                        duration=item["duration"],
+                        end_time=item["start_time"] + item["duration"],
+                        status=item["status"],
+                        note=item["note"],
+                    )
+                    for item in keep
+                )
+                # bulk_create skips the post_save signals
+                rollups.apply(Counter(
+                    rollups.key(shop.pk, item["start_time"], item["status"], item["duration"]) for item in keep
+                ))
+                versions.bump(shop.pk)
+                imported += len(keep)
+
+    return imported, rejected
@@ -1,7 +1,7 @@
 # booking/urls.py
 from django.contrib.auth import views as auth_views
 from django.urls import path, include
-from . import views
+from . import api, views
 
 app_name = 'booking'
 
@@ -21,11 +21,27 @@ urlpatterns = [
     # Shop Management
     path('shop_homepage/', views.shopHomePage.as_view(), name='shop_homepage'),
     path('appointments_manage/', views.shopAppointmentsManage.as_view(), name='appointments_manage'),
+    path('calendar/', views.ShopCalendar.as_view(), name='calendar'),
+    path('calendar/data/', views.ShopCalendarData.as_view(), name='calendar-data'),
+    path('analytics/', views.ShopAnalytics.as_view(), name='analytics'),
+    path('appointments_manage/events/', views.ShopEventStream.as_view(), name='appointments_events'),
+    path('appointments_manage/events/poll/', views.ShopEventPoll.as_view(), name='appointments_events_poll'),
+    path('appointments_manage/status/', views.BulkStatusUpdate.as_view(), name='appointments_bulk_status'),
+    path('appointments_manage/export/', views.shopAppointmentsExport.as_view(), name='appointments_export'),
     path('appointments_manage/<int:pk>/delete/', views.shopsAppointmentDelete.as_view(), name='shops-appointment-delete'),
     path("appointments_manage/<int:pk>/complete/", views.MarkCompleted.as_view(),name="appointment-complete"),
     path("appointments_manage/<int:pk>/confirmed/", views.MarkConfirmed.as_view(),name="appointment-confirmed"),
     path("appointments_manage/<int:pk>/cancelled/", views.MarkCancelled.as_view(),name="appointment-cancelled"),
+    path('appointments_manage/series/new/', views.SeriesCreate.as_view(), name='series-create'),
+    path('appointments_manage/series/<int:pk>/cancel/', views.SeriesCancel.as_view(), name='series-cancel'),
 
     path('book/<slug:slug>/', views.ShopAppointment.as_view(), name='book-shop'),
+    path('book/<slug:slug>/availability/', views.ShopAvailability.as_view(), name='book-shop-availability'),
+
+    # JSON API (v1)
+    path('api/v1/shops/<slug:slug>/', api.ShopDetailAPI.as_view(), name='api-shop'),
+    path('api/v1/shops/<slug:slug>/availability/', api.ShopAvailabilityAPI.as_view(), name='api-shop-availability'),
+    path('api/v1/shops/<slug:slug>/appointments/', api.ShopBookingAPI.as_view(), name='api-shop-book'),
+    path('api/v1/appointments/', api.AppointmentListAPI.as_view(), name='api-appointments'),
 
 ]
@@ -0,0 +1,125 @@
+# booking/versions.py
+import hashlib
+
+from django.contrib import messages
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import Appointment, ShopVersion
+
+
+def bump(shop_id):
+    """
+    @brief Advance a shop's change counter: everything cached or validated for it is now stale.
+    @details One `UPDATE`; call it inside the transaction of the write (the
+             signals in `booking.signals` do for single saves/deletes; bulk
+             writes call it themselves).
+    @param shop_id int|None Appointments without a shop are ignored.
+    @return None
+    """
+    if shop_id is not None:
+        ShopVersion.objects.filter(shop_id=shop_id).update(version=F("version") + 1, changed_at=timezone.now())
+
+
+def bump_for_client(client_id):
+    """
+    @brief Bump every shop that lists a client (its name/phone changed).
+    @details One `UPDATE ... WHERE shop_id IN (subquery)`; clients rarely change.
+    """
+    ShopVersion.objects.filter(
+        shop_id__in=Appointment.objects.filter(client_id=client_id).values("shop_id"),
+    ).update(version=F("version") + 1, changed_at=timezone.now())
+
+
+def create(shop_id):
+    """@brief Start the counter of a new shop (Shop post_save)."""
+    ShopVersion.objects.get_or_create(shop_id=shop_id)
+
+
+def current(shop_id):
+    """@brief (version, changed_at) of a shop; (0, None) if it has no counter. @return tuple"""
+    row = ShopVersion.objects.filter(shop_id=shop_id).values_list("version", "changed_at").first()
+    return row or (0, None)
+
+
+async def acurrent(shop_id):
+    """@brief Async `current`. @return tuple"""
+    row = await ShopVersion.objects.filter(shop_id=shop_id).values_list("version", "changed_at").afirst()
+    return row or (0, None)
+
+
+def validators(shop_id, state, *params):
+    """
+    @brief ETag and Last-Modified for a response that depends on a shop's state and `params`.
+    @details The ETag is the shop, its counter and a digest of the request
+             parameters, so it can be compared before any queryset runs.
+    @param state tuple (version, changed_at) from `current`/`acurrent`.
+    @return tuple[str, float|None] (etag, last-modified timestamp)
+    """
+    version, changed_at = state
+    digest = hashlib.md5(repr(params).encode()).hexdigest()[:12]
+    return f'"s{shop_id}v{version}-{digest}"', (changed_at.timestamp() if changed_at else None)
+
+
+def not_modified(request, etag, last_modified):
+    """@brief The 304 response when the client's copy is current, else None (`If-None-Match` first)."""
+    return get_conditional_response(request, etag=etag, last_modified=last_modified and int(last_modified))
+
+
+def set_validators(response, etag, last_modified):
+    """@brief Put ETag/Last-Modified on a response. @return HttpResponse The same response."""
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+class VersionedPageMixin:
+    """
+    @brief View mixin: ETag/304 and a whole-page cache for a shop dashboard page, keyed on the shop's counter.
+    @details
+      On GET, before any queryset of the view runs, the ETag is built from
+      the shop's counter, the query string, the XHR flag, the user's CSRF
+      secret (pages embed forms) and `page_clock()`. A matching
+      `If-None-Match` is answered with an empty 304. Otherwise the
+      rendered page is cached under that ETag, so a reload of an unchanged
+      shop costs four small queries (session, user, shop, counter).
+      Requests with flash messages to show bypass both.
+    """
+    page_cache_timeout = 5 * 60
+
+    def page_clock(self):
+        """@brief Part of the validator that moves with time (pages show "upcoming", "this week", ...)."""
+        return timezone.now().replace(second=0, microsecond=0)
+
+    def get(self, request, *args, **kwargs):
+        shop = getattr(request.user, "shop", None)
+        if shop is None or len(messages.get_messages(request)):
+            return super().get(request, *args, **kwargs)
+
+        etag, last_modified = validators(
+            shop.pk, current(shop.pk),
+            request.path,
+            sorted((key, tuple(values)) for key, values in request.GET.lists()),
+            request.headers.get("x-requested-with"),
+            request.user.pk,
+            hashlib.md5(request.META.get("CSRF_COOKIE", "").encode()).hexdigest(),
+            self.page_clock(),
+        )
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            key = f"booking:page:{etag}:{last_modified}"
+            response = cache.get(key)
+            if response is None:
+                # without a CSRF cookie the page embeds a fresh token: good for this request only
+                cacheable = "CSRF_COOKIE" in request.META
+                response = super().get(request, *args, **kwargs)
+                if hasattr(response, "render"):
+                    response.render()
+                if cacheable and response.status_code == 200 and not response.cookies:
+                    cache.set(key, response, self.page_cache_timeout)
+        patch_cache_control(response, private=True, no_cache=True)
+        return set_validators(response, etag, last_modified)
@@ -1,21 +1,35 @@
 # booking/views.py
 import datetime
-from datetime import date, timedelta
+import json
+from datetime import timedelta
+from asgiref.sync import sync_to_async
 from django.utils import timezone
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
 from django.shortcuts import render, redirect
 from django.views import View
 from django.views.generic import ListView, DeleteView, TemplateView
 from django.urls import reverse_lazy
-from django.http import HttpResponseNotAllowed
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
 from django.shortcuts import get_object_or_404, redirect
-from django.db.models import Q
-from django.db import transaction
-from django.db.models import F, ExpressionWrapper, DateTimeField
-from django import forms
-from .forms import AppointmentForm, ShopRegisterForm
-from .models import Client, Appointment, Shop, DAYS_OF_WEEK
+from django.db.models import Count, Q
+from .forms import AppointmentForm, RecurringAppointmentForm, ShopRegisterForm
+from .models import Appointment, AppointmentSeries, Shop, DAYS_OF_WEEK
+from .availability import afree_slots, parse_window, slots_payload
+from .calendar_data import MAX_DAYS, calendar_window
+from .filters import filter_appointments
+from .pagination import KeysetPaginationMixin
+from .routers import PrimaryAfterWriteMixin, ReplicaReadMixin, pin_to_primary
+from . import archive, events, rollups, transfer, versions
+from .services import BLOCKING_STATUSES
+from . import statuses
+from .statuses import complete_past, update_statuses
+from .shop_cache import aget_shop_by_slug
+from .versions import VersionedPageMixin
 
 def home(request):
     return render(request, 'home.html')
@@ -47,64 +61,10 @@ class ScheduleAppointment(View):
         if not form.is_valid():
             return render(request, self.template_name, {'form': form})
 
-        shop     = form.cleaned_data.get('shop')
-        start_dt = form.cleaned_data['start_time']
-        duration = form.cleaned_data['duration']
-        end_dt   = start_dt + duration
-
-        if not shop:
-            form.add_error('shop', "Please choose a shop.")
-            return render(request, self.template_name, {'form': form})
-
-        # Optional defensive check (form may already enforce this)
-        if (start_dt.time() < shop.opening_hours
-            or end_dt.time() > shop.closing_hours
-            or start_dt.date() != end_dt.date()):
-            form.add_error('start_time', "⚠ Appointment must fit within business hours and not span days.")
+        # validation, overlap check, client upsert and insert in one transaction
+        if form.book() is None:
             return render(request, self.template_name, {'form': form})
 
-        blocking_statuses = ["Pending", "Confirmed"]
-
-        from django.db import transaction
-        from django.db.models import F, ExpressionWrapper, DateTimeField
-
-        with transaction.atomic():
-            conflict = (
-                Appointment.objects
-                .filter(shop=shop, status__in=blocking_statuses)
-                .annotate(existing_end=ExpressionWrapper(
-                    F("start_time") + F("duration"),
-                    output_field=DateTimeField()
-                ))
-                .filter(
-                    start_time__lt=end_dt,     # existing starts before new ends
-                    existing_end__gt=start_dt  # existing ends after new starts
-                )
-                .exists()
-            )
-            if conflict:
-                form.add_error('start_time', "⚠ That time overlaps another booking, please pick another time.")
-                return render(request, self.template_name, {'form': form})
-
-            # create/update client then create appt
-            client, _ = Client.objects.get_or_create(
-                email=form.cleaned_data['email'],
-                defaults={'name': form.cleaned_data['name'], 'phone': form.cleaned_data['phone']}
-            )
-            if client.name != form.cleaned_data['name'] or client.phone != form.cleaned_data['phone']:
-                client.name  = form.cleaned_data['name']
-                client.phone = form.cleaned_data['phone']
-                client.save(update_fields=['name', 'phone'])
-
-            Appointment.objects.create(
-                client=client,
-                shop=shop,
-                start_time=start_dt,
-                duration=duration,
-                note=form.cleaned_data['note'],
-                status="Confirmed",
-            )
-
         return redirect('booking:confirm')
 def confirm(request):
     return render(request, 'confirm.html')
@@ -161,13 +121,18 @@ def shop_settings_view(request):
         "days_of_week": DAYS_OF_WEEK
     })
 
-class AppointmentList(ListView):
+class AppointmentList(ReplicaReadMixin, KeysetPaginationMixin, ListView):
     model = Appointment
     template_name = 'appointments.html'      # your template
     context_object_name = 'appointments'     # in template use “appointments”
     ordering = ['start_time']               # optional: sort by time
+    paginate_by = 50
+
+    def get_queryset(self):
+        """@brief All appointments with client/shop fetched in the same query. @return QuerySet"""
+        return super().get_queryset().select_related("client", "shop")
 
-class AppointmentDelete(DeleteView):
+class AppointmentDelete(PrimaryAfterWriteMixin, DeleteView):
     model = Appointment
     template_name = 'appointment_confirm_delete.html'
     success_url = reverse_lazy('booking:appointments')
@@ -198,11 +163,13 @@ def shopRegConfirmed(request):
 
 
 
-class shopHomePage(LoginRequiredMixin, ListView):
+class shopHomePage(LoginRequiredMixin, ReplicaReadMixin, VersionedPageMixin, ListView):
     model = Appointment
     template_name = 'shops/shop_homepage.html'      
+    query_budget = 7                        # session, user, shop, version, badges, archive totals, list
     context_object_name = 'appointments'    # in template use “appointments”
     ordering = ['start_time']               # optional: sort by time
+    counts_archive = True                   # badges include the archived history
 
     def get_queryset(self):
         """@brief Return appointments for the logged-in shop owner. @return QuerySet"""
@@ -220,97 +187,91 @@ class shopHomePage(LoginRequiredMixin, ListView):
         )
 
     def get_context_data(self, **kwargs):
+        """
+        @brief Quick-stat badges plus the upcoming confirmed list.
+        @details All badge counts come from one conditional-aggregation query
+                 over the (filtered) queryset instead of one `.count()` each.
+        @return dict Template context.
+        """
         ctx = super().get_context_data(**kwargs)
-        # only future/ongoing appointments
-        ctx["future_appointments"] = ctx["appointments"].filter(
-            start_time__gte=timezone.now()
-        )
-        # future confirmed appointment
-        ctx["future_confirmed_appointments"] = ctx["future_appointments"].filter(
-            status__iexact="confirmed"
-        )
-
-        # completed appointments
-        completed = ctx["completed_appointments"]  = ctx["appointments"].filter(
-            status__iexact="completed"
-        )
+        now = timezone.now()
 
-        today          = timezone.localdate()                 
+        today          = timezone.localdate()
         start_of_week  = today - timedelta(days=today.weekday())  # Monday
         start_dt       = timezone.make_aware(datetime.datetime.combine(start_of_week, datetime.time.min))
         end_dt         = start_dt + timedelta(days=7)         # next Monday 00:00
 
-        # completed appointment in current week
-        ctx["completed_this_week"] = completed.filter(
-            start_time__gte=start_dt,
-            start_time__lt=end_dt
-        )
-
-
-        # quick‐stat badges
-        ctx["total_count"]  = ctx["appointments"].count()
-        ctx["future_count"] = ctx["future_appointments"].count()
-        ctx["completed_count"] = ctx["completed_appointments"].count()
-        ctx["completedThisWeek_count"] = ctx["completed_this_week"].count()
-        ctx["future_confirmed_count"] = ctx["future_confirmed_appointments"].count()
+        future    = Q(start_time__gte=now)                    # future/ongoing appointments
+        confirmed = Q(status__iexact="confirmed")
+        completed = Q(status__iexact="completed")
+        this_week = Q(start_time__gte=start_dt, start_time__lt=end_dt)
+
+        # quick‐stat badges, one query
+        ctx.update(self.object_list.aggregate(
+            total_count=Count("pk"),
+            future_count=Count("pk", filter=future),
+            completed_count=Count("pk", filter=completed),
+            completedThisWeek_count=Count("pk", filter=completed & this_week),
+            future_confirmed_count=Count("pk", filter=future & confirmed),
+        ))
+
+        # archived history (finished, older than ARCHIVE_AFTER_DAYS) comes from its rollup row
+        shop = getattr(self.request.user, "shop", None)
+        if shop is not None and self.counts_archive:
+            archived, archived_completed, _ = archive.totals(shop)
+            ctx["total_count"] += archived
+            ctx["completed_count"] += archived_completed
+
+        # future confirmed appointment (evaluated once by the template)
+        ctx["future_confirmed_appointments"] = self.object_list.filter(future & confirmed)
         return ctx
 
 # subclass of shophomepage
-class shopAppointmentsManage(shopHomePage):
+class shopAppointmentsManage(KeysetPaginationMixin, shopHomePage):
     """
     @brief Staff dashboard for viewing and managing appointments.
     @details Filters by status and date; supports mark-complete/confirm/cancel actions.
+             Rows come one keyset page at a time (`?cursor=`), see `KeysetPaginationMixin`.
     """
     template_name = "shops/appointments_manage.html"
+    query_budget = 9                        # + live feed start and recurring series
+    counts_archive = False                  # the total counts the (filtered) rows listed
 
     def get_queryset(self):
         """@brief Return appointments for the logged-in shop owner. @return QuerySet"""
-        qs = super().get_queryset()              # all of this shop’s appts
-        g  = self.request.GET
-
-        # --- search text ---
-        q = g.get("q")
-        if q:
-            qs = qs.filter(
-                Q(client__name__icontains=q) |
-                Q(client__email__icontains=q) |
-                Q(client__phone__icontains=q)
-            )
+        # all of this shop’s appts, through the filters the JSON API shares
+        return filter_appointments(super().get_queryset(), self.request.GET)
 
-        # --- status filter ---
-        status = g.get("status")
-        if status:
-            qs = qs.filter(status__iexact=status)
-
-        # --- date range filter ---
-        rng = g.get("range")
-        if rng == "today":
-            qs = qs.filter(start_time__date=date.today())
-        elif rng == "week":
-            start = date.today() - timedelta(days=date.today().weekday())
-            end   = start + timedelta(days=7)
-            qs = qs.filter(start_time__date__gte=start, start_time__date__lt=end)
-        elif rng == "month":
-            start = date.today().replace(day=1)
-            end   = (start + timedelta(days=32)).replace(day=1)
-            qs = qs.filter(start_time__date__gte=start, start_time__date__lt=end)
-        elif rng == "upcoming":
-            qs = qs.filter(start_time__gte=timezone.now())
-
-        # --- sorting ---
-        sort = g.get("sort", "date_desc")
-        sort_map = {
-            "date_asc":  "start_time",
-            "date_desc": "-start_time",
-            "customer":  "client__name",
-            "status":    "status",
-        }
-        qs = qs.order_by(sort_map.get(sort, "-start_time"))
-
-        return qs
+    def get_context_data(self, **kwargs):
+        """
+        @brief Add the live feed's start point and the running recurring series.
+        @details `last_event_id`: the feed resumes after the events this page
+                 already reflects; `event_stream` tells whether it is pushed
+                 (SSE) or polled. `series`: one query; each series' next
+                 visit is expanded in memory.
+        """
+        ctx = super().get_context_data(**kwargs)
+        if hasattr(self.request.user, "shop") and not self.request.GET.get(self.cursor_kwarg):
+            shop = self.request.user.shop
+            ctx["last_event_id"] = events.last_event_id(shop.pk)
+            ctx["event_stream"] = events.streams(self.request)
+            ctx["event_poll_seconds"] = getattr(settings, "EVENT_CLIENT_POLL_SECONDS", 10)
+            now = timezone.now()
+            ctx["series"] = list(
+                AppointmentSeries.objects
+                .filter(shop=shop, status__in=BLOCKING_STATUSES, last_end__gt=now)
+                .select_related("client")
+                .order_by("start_time")
+            )
+            for series in ctx["series"]:
+                series.next_visit = series.next_occurrence(now)
+        return ctx
     
     def render_to_response(self, context, **response_kwargs):
         if self.request.headers.get("x-requested-with") == "XMLHttpRequest":
+            # infinite scroll: only the next page of rows (+ the next sentinel)
+            if self.request.GET.get(self.cursor_kwarg):
+                return render(self.request, "shops/_appointment_rows.html", context)
             return render(
                 self.request,
                 "shops/_appointments_list.html",   # partial containing only the list div
@@ -320,6 +281,169 @@ class shopAppointmentsManage(shopHomePage):
 
 
 
+class shopAppointmentsExport(shopAppointmentsManage):
+    """
+    @brief Download the manage page's current selection as CSV or iCalendar.
+    @details Accepts the same q/status/range/sort filters plus `format=csv|ics`.
+             Rows are streamed off `.iterator()`, so memory and time to first
+             byte don't grow with the shop's history. Like the page, it
+             covers the appointments table only: archived ones are exported
+             with `manage.py export_appointments --include-archived`.
+    """
+    chunk_size = 2000
+
+    def get(self, request, *args, **kwargs):
+        """@brief Stream the filtered appointments. @return StreamingHttpResponse"""
+        qs = self.get_queryset()
+        shop = getattr(request.user, "shop", None)
+        slug = shop.slug if shop else "appointments"
+
+        if request.GET.get("format") == "ics":
+            response = StreamingHttpResponse(
+                transfer.ics_stream(qs, host=request.get_host(), chunk_size=self.chunk_size),
+                content_type="text/calendar; charset=utf-8",
+            )
+            response["Content-Disposition"] = f'attachment; filename="{slug}-appointments.ics"'
+        else:
+            response = StreamingHttpResponse(
+                transfer.csv_stream(transfer.appointment_rows(qs, chunk_size=self.chunk_size)),
+                content_type="text/csv; charset=utf-8",
+            )
+            response["Content-Disposition"] = f'attachment; filename="{slug}-appointments.csv"'
+        return response
+
+
+class ShopEventStream(View):
+    """
+    @brief Server-Sent Events feed of the logged-in shop's appointment changes (async).
+    @details Pushes `created` and `status` events, each with the freshly
+             rendered dashboard row, so the manage page patches its list in
+             place instead of re-running its filtered query. Resumes after
+             `Last-Event-ID` (browser reconnect) or `?since=` (page load).
+             Only served where `events.streams` allows it (ASGI, or
+             `EVENT_STREAM_SSE`); elsewhere the page polls `ShopEventPoll`.
+    """
+
+    async def get(self, request):
+        """@brief Open the event stream. @return StreamingHttpResponse"""
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        shop = await Shop.objects.filter(owner=request.user).afirst()
+        if shop is None or not events.streams(request):
+            return HttpResponse(status=204)     # tells EventSource not to reconnect
+
+        try:
+            since = int(request.headers.get("Last-Event-ID") or request.GET["since"])
+        except (KeyError, ValueError):
+            since = await events.alast_event_id(shop.pk)
+
+        response = StreamingHttpResponse(
+            events.stream(request, shop.pk, since),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"    # nginx: don't buffer the stream
+        return response
+
+
+class ShopEventPoll(LoginRequiredMixin, View):
+    """
+    @brief The live feed for WSGI deployments: JSON of the shop's events after `?since=`.
+    @details The manage page asks every `EVENT_CLIENT_POLL_SECONDS`, and
+             right away while `more` is set. Same events and rows as
+             `ShopEventStream`, see `events.poll`.
+    """
+    query_budget = 5
+
+    def get(self, request):
+        """@brief Return the events after `since`. @return JsonResponse"""
+        shop = getattr(request.user, "shop", None)
+        if shop is None:
+            raise Http404("No shop linked to this account.")
+        try:
+            since = int(request.GET["since"])
+        except (KeyError, ValueError):
+            since = events.last_event_id(shop.pk)
+        response = JsonResponse(events.poll(request, shop.pk, since))
+        response["Cache-Control"] = "no-cache"
+        return response
+
+
+class ShopCalendar(LoginRequiredMixin, TemplateView):
+    """@brief Day/week/month calendar of the shop's bookings; `calendar.js` draws the grid from `ShopCalendarData`."""
+    template_name = "shops/calendar.html"
+
+
+class ShopCalendarData(LoginRequiredMixin, ReplicaReadMixin, View):
+    """
+    @brief Compact JSON of one calendar window (see `calendar_data.calendar_window`).
+    @details Query params: `start` (YYYY-MM-DD, defaults to today) and `days`
+             (1-42, defaults to 7). The front end asks week by week, so
+             navigating fetches only the new week. The ETag is the shop's
+             change counter plus the window, so a revalidation
+             (`If-None-Match`) of an unchanged week is answered with an
+             empty 304 before the window is queried; bodies are cached
+             under the same key.
+    """
+    cache_timeout = 5 * 60
+    query_budget = 6
+
+    def get(self, request):
+        """@brief Return the window's bookings. @return HttpResponse JSON, or 304 Not Modified"""
+        shop = getattr(request.user, "shop", None)
+        if shop is None:
+            raise Http404("No shop linked to this account.")
+        start, days = parse_window(request.GET, max_days=MAX_DAYS)
+
+        etag, last_modified = versions.validators(shop.pk, versions.current(shop.pk), "calendar", start, days)
+        response = versions.not_modified(request, etag, last_modified)
+        if response is None:
+            key = f"booking:calendar:{etag}:{last_modified}"
+            body = cache.get(key)
+            if body is None:
+                body = json.dumps(calendar_window(shop, start, days), separators=(",", ":"))
+                cache.set(key, body, self.cache_timeout)
+            response = HttpResponse(body, content_type="application/json")
+        patch_cache_control(response, private=True, no_cache=True)    # always revalidate
+        return versions.set_validators(response, etag, last_modified)
+
+
+class ShopAnalytics(LoginRequiredMixin, ReplicaReadMixin, VersionedPageMixin, TemplateView):
+    """
+    @brief Weekly trends of the logged-in shop: bookings, cancellation rate, utilization, popular lengths.
+    @details Reads only the daily rollups (`rollups.weekly_summary`), so a
+             page costs one query over the weeks shown (`?weeks=4|12|26|52`,
+             default 12, ending with the current week).
+    """
+    template_name = "shops/analytics.html"
+    week_choices = (4, 12, 26, 52)
+    default_weeks = 12
+    query_budget = 5                        # session, user, shop, version, rollups
+
+    def get_context_data(self, **kwargs):
+        """@brief The summary of the selected weeks. @return dict Template context."""
+        ctx = super().get_context_data(**kwargs)
+        shop = getattr(self.request.user, "shop", None)
+        if shop is None:
+            raise Http404("No shop linked to this account.")
+        try:
+            weeks = int(self.request.GET.get("weeks", self.default_weeks))
+        except ValueError:
+            weeks = self.default_weeks
+        if weeks not in self.week_choices:
+            weeks = self.default_weeks
+
+        today = timezone.localdate()
+        this_monday = today - timedelta(days=today.weekday())
+        first_day = this_monday - timedelta(weeks=weeks - 1)
+        ctx.update(rollups.weekly_summary(shop, first_day, this_monday + timedelta(days=6)))
+        ctx["weeks_shown"] = weeks
+        ctx["week_choices"] = self.week_choices
+        ctx["max_bookings"] = max([w["bookings"] for w in ctx["weeks"]] + [1])
+        return ctx
+
+
 # parent class for update appointment status
 class UpdateShopAppointmentStatus(LoginRequiredMixin, View):
     status_value: str = None                # override
@@ -334,14 +458,13 @@ class UpdateShopAppointmentStatus(LoginRequiredMixin, View):
         if self.status_value is None:
             return HttpResponseNotAllowed(["POST"])
 
-        appt = get_object_or_404(
-            Appointment,
-            pk=pk,
-            shop=request.user.shop,         # safety check
-        )
-        appt.status = self.status_value
-        appt.save(update_fields=["status"])
-        return redirect(self.success_url)
+        [result] = update_statuses(request.user.shop, [pk], self.status_value)
+        if result["result"] == statuses.NOT_FOUND:
+            raise Http404("No appointment matches the given query.")
+        if result["result"] in (statuses.NOT_ALLOWED, statuses.CONFLICT):
+            messages.error(request, result["message"])
+        # the manage page loaded next must show the new status, not the replica's copy
+        return pin_to_primary(redirect(self.success_url))
 
     # block GET for safety
     def get(self, *args, **kwargs):
@@ -358,90 +481,156 @@ class MarkCancelled(UpdateShopAppointmentStatus):
     status_value = "Cancelled"
 
 
+class BulkStatusUpdate(LoginRequiredMixin, View):
+    """
+    @brief `POST appointments_manage/status/`: many status changes in one request.
+    @details
+      Form fields: `status` and the selected `ids`, or `action=complete_past`
+      to mark every confirmed appointment that has ended as Completed.
+      Fetch requests get JSON (`status`, `updated` count and per-item
+      `results`, see `statuses.update_statuses`); a plain form post
+      redirects back to the dashboard with a summary message.
+    """
+    success_url = reverse_lazy("booking:appointments_manage")
+
+    def post(self, request, *args, **kwargs):
+        """@brief Apply the bulk change. @return HttpResponse JSON or redirect."""
+        shop = getattr(request.user, "shop", None)
+        if shop is None:
+            raise Http404("No shop linked to this account.")
+
+        if request.POST.get("action") == "complete_past":
+            status = "Completed"
+            results = complete_past(shop)
+        else:
+            status = request.POST.get("status")
+            if status not in statuses.ALLOWED_TRANSITIONS:
+                return self.respond(request, {"error": "Unknown status."}, status=400)
+            try:
+                ids = [int(pk) for pk in request.POST.getlist("ids")]
+            except ValueError:
+                return self.respond(request, {"error": "Invalid appointment id."}, status=400)
+            if len(ids) > statuses.MAX_BATCH:
+                return self.respond(request, {"error": f"At most {statuses.MAX_BATCH} appointments at once."}, status=400)
+            results = update_statuses(shop, ids, status)
+
+        updated = sum(r["result"] == statuses.UPDATED for r in results)
+        return pin_to_primary(self.respond(request, {"status": status, "updated": updated, "results": results}))
+
+    def respond(self, request, data, status=200):
+        if request.headers.get("x-requested-with") == "XMLHttpRequest" or "json" in request.headers.get("accept", ""):
+            return JsonResponse(data, status=status)
+        if "error" in data:
+            messages.error(request, data["error"])
+        else:
+            skipped = [r for r in data["results"] if r["result"] in (statuses.NOT_ALLOWED, statuses.CONFLICT)]
+            messages.success(request, f"{data['updated']} appointment(s) marked {data['status'].lower()}.")
+            if skipped:
+                messages.warning(request, f"{len(skipped)} skipped: {skipped[0]['message']}")
+        return redirect(self.success_url)
+
+    def get(self, *args, **kwargs):
+        return HttpResponseNotAllowed(["POST"])
+
+
+class SeriesCreate(LoginRequiredMixin, View):
+    """
+    @brief Dashboard page to book a recurring series (weekly/biweekly/monthly) for a regular.
+    @details Stores one `AppointmentSeries` row; its visits block the
+             calendar like appointments (see `services.book_series`).
+    """
+    template_name = "shops/series_form.html"
+
+    def get(self, request):
+        """@brief Render the empty series form. @return HttpResponse"""
+        form = RecurringAppointmentForm(shop=request.user.shop)
+        return render(request, self.template_name, {"form": form})
+
+    def post(self, request):
+        """
+        @brief Book the series from POSTed data.
+        @return HttpResponse Redirect to the manage page on success; re-render with errors otherwise.
+        """
+        form = RecurringAppointmentForm(request.POST, shop=request.user.shop)
+        if form.is_valid() and form.book() is not None:
+            return pin_to_primary(redirect("booking:appointments_manage"))
+        return render(request, self.template_name, {"form": form})
+
+
+class SeriesCancel(LoginRequiredMixin, View):
+    """@brief Cancel a recurring series of the logged-in shop: its visits stop blocking (POST only)."""
+
+    def post(self, request, pk):
+        """@brief Mark the series cancelled. @return HttpResponse Redirect to the manage page."""
+        series = get_object_or_404(AppointmentSeries, pk=pk, shop=request.user.shop)
+        if series.status != "Cancelled":
+            series.status = "Cancelled"
+            series.save(update_fields=["status"])
+        return pin_to_primary(redirect("booking:appointments_manage"))
+
+
 # Shop Appointment Schedule Page
 class ShopAppointment(View):
+    """
+    @brief Public booking page of one shop (async).
+    @details Shop lookup and availability use the async cache/ORM, so under
+             ASGI a slow client never holds a worker thread. The booking
+             itself still runs in the sync transactional path
+             (`AppointmentForm.book`): Django's async ORM can't run inside
+             `transaction.atomic`, which the race-free slot claim needs.
+             This only pays off under ASGI (`uvicorn config.asgi:application`):
+             under the WSGI server each request is run through
+             `async_to_sync` (~0.5ms, more per `sync_to_async` hop), so a
+             plain WSGI deployment is slightly slower than a sync view
+             would be. `manage.py bench_asgi` measures both.
+    """
     template_name = 'book_shop.html'
+    query_budget = 14                       # worst booking, see services.book_appointment
 
-    def get(self, request, slug):
+    async def get(self, request, slug):
         """@brief Render available slots and the booking form. @return HttpResponse"""
-        shop = get_object_or_404(Shop, slug=slug)
-        form = AppointmentForm(initial={'shop': shop})
-        form.fields['shop'].queryset = Shop.objects.filter(pk=shop.pk)
-        form.fields['shop'].widget = forms.HiddenInput()
-        return render(request, self.template_name, {'form': form, 'shop': shop})
+        shop = await aget_shop_by_slug(slug)
+        form = AppointmentForm(shop=shop)
+        return await _arender(request, self.template_name, {'form': form, 'shop': shop})
 
-    def post(self, request, slug):
+    async def post(self, request, slug):
         """
         @brief Create an appointment from POSTed data.
         @param request HttpRequest Incoming request with form fields.
         @return HttpResponse Redirect on success; re-render with errors otherwise.
         """
-        shop = get_object_or_404(Shop, slug=slug)
-        form = AppointmentForm(request.POST)
-
-        # keep it tied to this shop & hidden on re-render
-        form.fields['shop'].queryset = Shop.objects.filter(pk=shop.pk)
-        form.fields['shop'].widget = forms.HiddenInput()
+        shop = await aget_shop_by_slug(slug)
+        # keep it tied to this shop (the URL decides, not a hidden field)
+        form = AppointmentForm(request.POST, shop=shop)
 
-        if form.is_valid():
-            
-            # cleaned data
-            start_dt  = form.cleaned_data['start_time']
-            duration  = form.cleaned_data['duration']
-            end_dt    = start_dt + duration
-
-            # keep inside business hours & same day
-            if start_dt.time() < shop.opening_hours or end_dt.time() > shop.closing_hours or start_dt.date() != end_dt.date():
-                form.add_error('start_time',
-                    "⚠ Appointment must fit within business hours and not span days.")
-                return render(request, self.template_name, {'form': form, 'shop': shop})
-
-            blocking_statuses = ["Pending", "Confirmed"]
-
-            # Do the overlap check + create atomically to avoid races
-            with transaction.atomic():
-                conflict_exists = (
-                    Appointment.objects
-                    .filter(shop=shop, status__in=blocking_statuses)
-                    .annotate(existing_end=ExpressionWrapper(
-                        F("start_time") + F("duration"),
-                        output_field=DateTimeField()
-                    ))
-                    .filter(
-                        start_time__lt=end_dt,      # existing starts before new ends
-                        existing_end__gt=start_dt   # existing ends after new starts
-                    )
-                    .exists()
-                )
-                if conflict_exists:
-                    form.add_error('start_time', "⚠ That time overlaps another booking, please pick another time.")
-                    return render(request, self.template_name, {'form': form, 'shop': shop})
-            
-            
-            # get or create client
-            client, _ = Client.objects.get_or_create(
-                email=form.cleaned_data['email'],
-                defaults={
-                    'name':  form.cleaned_data['name'],
-                    'phone': form.cleaned_data['phone'],
-                }
-            )
-            # keep name/phone in sync if returning client
-            if client.name != form.cleaned_data['name'] or client.phone != form.cleaned_data['phone']:
-                client.name  = form.cleaned_data['name']
-                client.phone = form.cleaned_data['phone']
-                client.save(update_fields=['name', 'phone'])
-
-            # create appointment bound to THIS shop
-            Appointment.objects.create(
-                client=client,
-                shop=shop, 
-                start_time=form.cleaned_data['start_time'],
-                duration=form.cleaned_data['duration'],
-                note=form.cleaned_data['note'],
-                status="Confirmed",
-            )
+        # overlap check + client + appointment in one transaction, serialized per shop
+        if form.is_valid() and await sync_to_async(form.book)() is not None:
             return redirect('booking:confirm')
 
         # not valid: show errors (incl. your day/hour checks)
-        return render(request, self.template_name, {'form': form, 'shop': shop})
\ No newline at end of file
+        return await _arender(request, self.template_name, {'form': form, 'shop': shop})
+
+
+async def _arender(request, template_name, context):
+    # base.html reads `user`: resolve the lazy user (and session) on the async ORM first
+    request.user = await request.auser()
+    return render(request, template_name, context)
+
+
+# Free slots for the public booking page
+class ShopAvailability(View):
+    """
+    @brief JSON list of bookable start times for a shop, per duration.
+    @details Query params: `start` (YYYY-MM-DD, defaults to today) and `days` (1-31, defaults to 7).
+             Async for the same reason as `ShopAppointment`, with the same
+             caveat: under WSGI it costs an `async_to_sync` hop per request.
+    """
+    max_days = 31
+    query_budget = 3
+
+    async def get(self, request, slug):
+        """@brief Return free slots for the requested window. @return JsonResponse"""
+        shop = await aget_shop_by_slug(slug)
+        start, days = parse_window(request.GET, max_days=self.max_days)
+        slots = await afree_slots(shop, start, start + timedelta(days=days - 1))
+        return JsonResponse(slots_payload(shop, slots))
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so everything below (session, user lookups) is measured
+    'booking.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,15 +60,23 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with render time recorded for the request metrics
+        'BACKEND': 'booking.instrumentation.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # templates are parsed once per process, not on every render
+            # (runserver's autoreloader clears the cache when one is edited)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -76,13 +87,131 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuning, applied to every new connection by booking.signals.tune_sqlite.
+# The default profile keeps SQLite's stock settings (rollback journal, a new
+# connection per request). DJANGO_SQLITE_PROFILE=production also keeps
+# connections open across requests: use it behind a WSGI server only, Django
+# advises against persistent connections under ASGI.
+SQLITE_PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',       # readers and the writer don't block each other
+        'synchronous': 'NORMAL',     # fsync at checkpoints only, still safe with WAL
+        'busy_timeout': 20000,       # ms to wait for the write lock
+        'mmap_size': 268435456,      # 256 MiB of memory-mapped reads
+        'cache_size': -65536,        # 64 MiB page cache (negative = KiB)
+        'temp_store': 'MEMORY',
+    },
+}
+SQLITE_PROFILE = os.environ.get('DJANGO_SQLITE_PROFILE', 'default')
+SQLITE_PRAGMAS = SQLITE_PROFILES[SQLITE_PROFILE]
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # transactions stay deferred; booking writes take the write lock
+            # up front (booking.services.write_transaction)
+            'timeout': 20,
+        },
+        # keep connections (and their pragmas) open across requests
+        'CONN_MAX_AGE': 600 if SQLITE_PRAGMAS else 0,
+        'CONN_HEALTH_CHECKS': bool(SQLITE_PRAGMAS),
     }
 }
 
+# Optional read replica for the dashboards (booking.routers). Locally, point
+# DJANGO_REPLICA_DB at a second SQLite file and refresh it from the primary
+# with `manage.py sync_replica`.
+if os.environ.get("DJANGO_REPLICA_DB"):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ["DJANGO_REPLICA_DB"],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['booking.routers.PrimaryReplicaRouter']
+
+# seconds a client keeps reading from the primary after it wrote
+REPLICA_STICKY_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# local memory is per process; with several workers set DJANGO_CACHE_DIR so
+# they share one file-based cache (and see each other's invalidations)
+
+if os.environ.get("DJANGO_CACHE_DIR"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ["DJANGO_CACHE_DIR"],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'easybook',
+        }
+    }
+
+
+# Email
+# Booking/status emails are sent by the job worker (`manage.py run_jobs`).
+# Until a real SMTP backend is configured they are written to EMAIL_FILE_PATH;
+# tests swap in the locmem backend automatically.
+EMAIL_BACKEND = os.environ.get('DJANGO_EMAIL_BACKEND', 'django.core.mail.backends.filebased.EmailBackend')
+EMAIL_FILE_PATH = os.environ.get('DJANGO_EMAIL_FILE_PATH', BASE_DIR / 'sent_emails')
+DEFAULT_FROM_EMAIL = 'EasyBook <no-reply@easybook.local>'
+
+# Background job queue (booking.jobs)
+JOB_MAX_ATTEMPTS = 5            # then the job is marked failed
+JOB_RETRY_BASE_SECONDS = 30     # backoff: 30s, 60s, 120s, ... (capped at 1h)
+JOB_LOCK_TIMEOUT = 300          # a claim older than this is considered abandoned
+
+# Live dashboard feed (booking.events): the SSE view tails the ShopEvent table.
+# It is pushed under ASGI only; under WSGI the page polls instead, unless
+# DJANGO_EVENT_STREAM_SSE=1 (each open tab then holds a worker thread).
+EVENT_STREAM_SSE = os.environ.get('DJANGO_EVENT_STREAM_SSE') == '1'
+EVENT_CLIENT_POLL_SECONDS = 10  # how often a polling page asks for new events
+EVENT_POLL_SECONDS = 1.0        # how often an open stream checks for new events
+EVENT_STREAM_SECONDS = 300      # then the stream ends and the browser reconnects (Last-Event-ID)
+EVENT_RETENTION_SECONDS = 3600  # run_jobs prunes older events
+
+# Request metrics (booking.instrumentation): Server-Timing header and one
+# JSON line per request on the "booking.perf" logger, shown with
+# DJANGO_PERF_LOG_LEVEL=INFO (by default only budget overruns and N+1 warnings)
+PERF_DUPLICATE_THRESHOLD = 5    # same statement this often in one request: logged as a likely N+1
+# over a view's query_budget: "log" warns; "raise" fails the request after the
+# view has run, so it is only for tests (booking.test_runner sets it)
+QUERY_BUDGET_MODE = os.environ.get('DJANGO_QUERY_BUDGET_MODE', 'log')
+TEST_RUNNER = 'booking.test_runner.BudgetRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'perf': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'perf'},
+    },
+    'loggers': {
+        'booking.perf': {
+            'handlers': ['console'],
+            'level': os.environ.get('DJANGO_PERF_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Archival (booking.archive, `manage.py archive_appointments`): finished
+# appointments older than this move to the archive table in batches
+ARCHIVE_AFTER_DAYS = 365        # at least 32: dashboard ranges ("this month") never reach the archive
+ARCHIVE_BATCH_SIZE = 500        # rows per transaction; each batch commits on its own
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators